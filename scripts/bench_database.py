@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+实盘记录库写入压测: 每次调用新建连接 (旧实现) vs 连接池 + 批量写入队列 (DBManager)
+
+多个线程并发写入 log_equity / log_operation，同时若干线程模拟 Web 面板不停读取，
+统计写入吞吐、单次调用延迟 (p50 / p99)、入队到提交的延迟 (commit p50 / p99) 以及全部落盘所需时间。
+旧实现同步提交，两种延迟相同；批量写入的调用只是入队，数据真正落盘要等写入线程提交。
+
+用法:
+    python scripts/bench_database.py --writers 4 --writes 500 --readers 4
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src'))
+
+from database import DBManager
+
+
+class LegacyDBManager(DBManager):
+    """旧实现: 每次调用新建连接并执行 PRAGMA journal_mode=WAL，同步提交"""
+
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL;')
+        return conn
+
+    def connection(self):
+        return self.get_connection()
+
+    def log_equity(self, equity, unrealized=0.0):
+        try:
+            with self.get_connection() as conn:
+                timestamp = datetime.datetime.now().isoformat()
+                conn.execute(
+                    'INSERT INTO equity_snapshots (timestamp, total_equity, unrealized_pnl, ts) VALUES (?, ?, ?, ?)',
+                    (timestamp, equity, unrealized, int(time.time()))
+                )
+                conn.commit()
+        except Exception as e:
+            print(f"DB Error (log_equity): {e}")
+
+    def log_operation(self, symbol, side, action, price, quantity, status="FILLED", details=""):
+        try:
+            with self.get_connection() as conn:
+                timestamp = datetime.datetime.now().isoformat()
+                conn.execute(
+                    '''INSERT INTO trade_operations
+                       (timestamp, symbol, side, action, price, quantity, status, details)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                    (timestamp, symbol, side, action, price, quantity, status, str(details))
+                )
+                conn.commit()
+        except Exception as e:
+            print(f"DB Error (log_operation): {e}")
+
+    def flush(self, timeout=None):
+        return True
+
+
+class TimedDBManager(DBManager):
+    """记录每条写入从入队到所在批次提交的耗时"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enqueued = []          # 入队时刻，顺序与 _pending 一致
+        self.commit_latencies = []
+
+    def _enqueue(self, sql, params):
+        with self._cond:
+            self.enqueued.append(time.perf_counter())
+            super()._enqueue(sql, params)
+
+    def _write_batch(self, conn, batch):
+        DBManager._write_batch(conn, batch)
+        committed = time.perf_counter()
+        # 批次总是 _pending 中最早的 len(batch) 条
+        done = len(self.commit_latencies)
+        self.commit_latencies.extend((committed - t) * 1000 for t in self.enqueued[done:done + len(batch)])
+
+
+def run(db, writers, writes, readers):
+    latencies = [[] for _ in range(writers)]
+    stop = threading.Event()
+    reads = [0] * readers
+
+    def writer(k):
+        for i in range(writes):
+            started = time.perf_counter()
+            if i % 2:
+                db.log_operation('BTC/USDT', 'LONG', 'ENTRY', 40000.0 + i, 0.01, details=f"writer {k}")
+            else:
+                db.log_equity(1000.0 + i)
+            latencies[k].append((time.perf_counter() - started) * 1000)
+
+    def reader(k):
+        while not stop.is_set():
+            db.get_equity_history()
+            db.get_recent_operations()
+            reads[k] += 1
+
+    reader_threads = [threading.Thread(target=reader, args=(k,)) for k in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(k,)) for k in range(writers)]
+    for t in reader_threads:
+        t.start()
+    started = time.perf_counter()
+    for t in writer_threads:
+        t.start()
+    for t in writer_threads:
+        t.join()
+    calls_done = time.perf_counter() - started
+    db.flush()
+    durable = time.perf_counter() - started
+    stop.set()
+    for t in reader_threads:
+        t.join()
+
+    all_latencies = np.concatenate([np.array(l) for l in latencies])
+    # 同步提交时调用返回即已落盘
+    commit_latencies = np.array(getattr(db, 'commit_latencies', all_latencies))
+    total = writers * writes
+    return {
+        'writes/s': total / durable,
+        'p50 ms': np.percentile(all_latencies, 50),
+        'p99 ms': np.percentile(all_latencies, 99),
+        'commit p50': np.percentile(commit_latencies, 50),
+        'commit p99': np.percentile(commit_latencies, 99),
+        'calls s': calls_done,
+        'durable s': durable,
+        'reads/s': sum(reads) / durable,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite trade log write benchmark")
+    parser.add_argument('--writers', type=int, default=4, help='Concurrent writer threads')
+    parser.add_argument('--writes', type=int, default=500, help='Writes per writer thread')
+    parser.add_argument('--readers', type=int, default=4, help='Concurrent dashboard reader threads')
+    args = parser.parse_args()
+
+    print(f"--- SQLite Write Benchmark: {args.writers} writers x {args.writes} writes, {args.readers} readers ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            'per-call connect': run(LegacyDBManager('bench', db_file=os.path.join(tmp, 'legacy.db')),
+                                    args.writers, args.writes, args.readers),
+            'pool + batch': run(TimedDBManager('bench', db_file=os.path.join(tmp, 'batched.db')),
+                                args.writers, args.writes, args.readers),
+        }
+
+    columns = ['writes/s', 'p50 ms', 'p99 ms', 'commit p50', 'commit p99', 'calls s', 'durable s', 'reads/s']
+    print(f"{'':<18}" + ''.join(f"{c:>12}" for c in columns))
+    for name, r in results.items():
+        print(f"{name:<18}" + ''.join(f"{r[c]:>12.3f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
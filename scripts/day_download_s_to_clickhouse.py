@@ -6,10 +6,14 @@ import time
 import sys
 import os
 import argparse
+import hashlib
+import json
 import logging
 from logging.handlers import TimedRotatingFileHandler
 from dotenv import load_dotenv
 
+from ingest_manifest import MANIFEST_FILE, Manifest
+
 # Load environment variables
 load_dotenv()
 
@@ -46,11 +50,33 @@ console_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
 logger.addHandler(file_handler)
 logger.addHandler(console_handler)
 
+def day_unit(day):
+    return f"daily/{SYMBOL_BINANCE.replace('/', '')}/1s/{day}"
+
+def record_days(manifest, ohlcv, covered_until, complete):
+    """
+    Record inserted rows per (local) day. A day is complete once the fetch ran past its end
+    without errors; the checksum chains sha256 over the row blocks inserted for that day.
+    """
+    days = {}
+    for row in ohlcv:
+        days.setdefault(datetime.fromtimestamp(row[0] / 1000).strftime('%Y-%m-%d'), []).append(row)
+    for day, rows in days.items():
+        unit = day_unit(day)
+        entry = manifest.get(unit) or {}
+        checksum = hashlib.sha256(((entry.get('checksum') or '') + json.dumps(rows)).encode()).hexdigest()
+        day_end = int((datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).timestamp() * 1000)
+        status = 'complete' if complete and covered_until >= day_end - 1 else 'partial'
+        manifest.add_rows(unit, len(rows), rows[0][0], rows[-1][0], checksum=checksum, status=status)
+
 def fetch_and_store_daily_data():
     # Parse Arguments
     parser = argparse.ArgumentParser(description="Fetch daily 1s data from Binance API to ClickHouse")
     parser.add_argument('--date', type=str, help='Specific date to download (YYYY-MM-DD), e.g., 2025-01-01')
+    parser.add_argument('--manifest', default=MANIFEST_FILE, help='Checkpoint manifest (completed days are skipped)')
+    parser.add_argument('--force', action='store_true', help='Reload the date even if already ingested')
     args = parser.parse_args()
+    manifest = Manifest(args.manifest)
 
     logger.info(f"Starting daily data fetch for {SYMBOL_BINANCE}...")
 
@@ -81,6 +107,27 @@ def fetch_and_store_daily_data():
         except ValueError:
             logger.error("❌ Invalid date format. Use YYYY-MM-DD")
             return
+
+        unit = day_unit(args.date)
+        if args.force:
+            logger.info(">>> --force: deleting existing rows of this date")
+            client.command(
+                f"ALTER TABLE {DB_NAME}.{TABLE_NAME} DELETE WHERE open_time BETWEEN "
+                f"fromUnixTimestamp64Milli(toInt64({start_timestamp})) AND fromUnixTimestamp64Milli(toInt64({end_timestamp})) "
+                f"SETTINGS mutations_sync = 2")
+            manifest.reset(unit)
+        elif manifest.is_complete(unit):
+            entry = manifest.get(unit)
+            logger.info(f">>> {args.date} already ingested ({entry['rows']} rows), skipping. Use --force to reload.")
+            return
+        else:
+            # Resume after the last row already in the table (a partial run, or one without the manifest)
+            last_ms = int(client.command(
+                f"SELECT toUnixTimestamp64Milli(max(open_time)) FROM {DB_NAME}.{TABLE_NAME} WHERE open_time BETWEEN "
+                f"fromUnixTimestamp64Milli(toInt64({start_timestamp})) AND fromUnixTimestamp64Milli(toInt64({end_timestamp}))"))
+            if last_ms >= start_timestamp:
+                start_timestamp = last_ms + 1000
+                logger.info(f">>> Resuming {args.date} from {datetime.fromtimestamp(start_timestamp/1000)}")
     else:
         # Default: Incremental Fetch
         try:
@@ -121,6 +168,7 @@ def fetch_and_store_daily_data():
     limit = 1000
     all_ohlcv = []
     current_since = start_timestamp
+    fetch_failed = False
     
     while current_since < end_timestamp:
         try:
@@ -151,10 +199,13 @@ def fetch_and_store_daily_data():
 
         except Exception as e:
             logger.error(f"❌ Error fetching data: {e}")
+            fetch_failed = True
             break
 
     if not all_ohlcv:
         logger.info(">>> No data found for this range.")
+        if args.date and start_timestamp > end_timestamp and not fetch_failed:
+            manifest.update(day_unit(args.date), status='complete')
         return
 
     logger.info(f">>> Fetched {len(all_ohlcv)} records. Processing...")
@@ -185,6 +236,8 @@ def fetch_and_store_daily_data():
         logger.info(f"✅ Successfully inserted {len(df_final)} records.")
     except Exception as e:
         logger.error(f"❌ Insert Failed: {e}")
+        return
+    record_days(manifest, all_ohlcv, end_timestamp, complete=not fetch_failed)
 
 if __name__ == "__main__":
     fetch_and_store_daily_data()
\ No newline at end of file
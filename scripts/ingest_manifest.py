@@ -0,0 +1,125 @@
+"""
+Local checkpoint manifest for the ClickHouse ingesters.
+
+One entry per ingested unit (a monthly archive or a day of API data), keyed e.g.
+'monthly/BTCUSDT/1s/2025-01' or 'daily/BTCUSDT/1s/2026-01-06':
+
+    status      'partial' or 'complete'
+    checksum    sha256 of the source archive (daily: of the fetched rows)
+    rows        rows inserted so far
+    first_ts / last_ts   open_time range inserted, epoch ms
+    chunks      monthly only: {chunk index: rows} of inserted chunks, with chunk_bytes they were cut with
+    updated     ISO timestamp of the last change
+
+Reruns skip complete units and resume partial ones. The file is rewritten atomically
+(temp file + os.replace) after every change, so a crash never leaves it half written.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+
+MANIFEST_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'data_cache', 'ingest_manifest.json')
+
+
+class Manifest:
+    def __init__(self, path=MANIFEST_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def get(self, unit):
+        with self._lock:
+            entry = self.entries.get(unit)
+            return dict(entry) if entry else None
+
+    def is_complete(self, unit):
+        entry = self.get(unit)
+        return bool(entry) and entry['status'] == 'complete'
+
+    def update(self, unit, **fields):
+        with self._lock:
+            entry = self.entries.setdefault(unit, {'status': 'partial', 'rows': 0, 'first_ts': None, 'last_ts': None})
+            entry.update(fields, updated=datetime.now().isoformat(timespec='seconds'))
+            self._save()
+            return dict(entry)
+
+    def add_rows(self, unit, rows, first_ts, last_ts, chunk=None, **fields):
+        """Record an inserted block of rows (for chunked units, under its chunk index: recording twice is harmless)"""
+        with self._lock:
+            entry = self.entries.setdefault(unit, {'status': 'partial', 'rows': 0, 'first_ts': None, 'last_ts': None})
+            if chunk is None:
+                entry['rows'] += rows
+            else:
+                entry.setdefault('chunks', {})[str(chunk)] = rows
+                entry['rows'] = sum(entry['chunks'].values())
+            if rows:
+                entry['first_ts'] = first_ts if entry['first_ts'] is None else min(entry['first_ts'], first_ts)
+                entry['last_ts'] = last_ts if entry['last_ts'] is None else max(entry['last_ts'], last_ts)
+            entry.update(fields, updated=datetime.now().isoformat(timespec='seconds'))
+            self._save()
+            return dict(entry)
+
+    def reset(self, unit):
+        with self._lock:
+            self.entries.pop(unit, None)
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def replacing_schema(db_name, table_name):
+    """
+    Deduplicating variant of the 1s table: rows with the same open_time collapse into one
+    on merge, so a retried insert can never double count volume. Queries that must be exact
+    before background merges finish read it with FINAL (config.SOURCE_TABLE_FINAL).
+    """
+    return f'''
+    CREATE TABLE IF NOT EXISTS {db_name}.{table_name} (
+        open_time DateTime64(3),
+        open Float64,
+        high Float64,
+        low Float64,
+        close Float64,
+        volume Float64,
+        close_time DateTime64(3),
+        quote_volume Float64,
+        trades UInt64,
+        taker_buy_base Float64,
+        taker_buy_quote Float64
+    ) ENGINE = ReplacingMergeTree()
+    ORDER BY open_time
+    '''
+
+
+def migrate_to_replacing(client, db_name, table_name):
+    """
+    Convert an existing plain MergeTree table in place: copy into a ReplacingMergeTree twin,
+    swap the two, force a merge to drop existing duplicates. The old data is kept as
+    <table>_mergetree_backup until dropped by hand.
+    """
+    engine = client.command(f"SELECT engine FROM system.tables WHERE database = '{db_name}' AND name = '{table_name}'")
+    if engine == 'ReplacingMergeTree':
+        print(f">>> {db_name}.{table_name} is already a ReplacingMergeTree.")
+        return False
+    backup = f"{table_name}_mergetree_backup"
+    staging = f"{table_name}_replacing"
+    client.command(f'DROP TABLE IF EXISTS {db_name}.{staging}')
+    client.command(replacing_schema(db_name, staging))
+    print(f">>> Copying {db_name}.{table_name} into {staging}...")
+    client.command(f'INSERT INTO {db_name}.{staging} SELECT * FROM {db_name}.{table_name}')
+    client.command(f'RENAME TABLE {db_name}.{table_name} TO {db_name}.{backup}, '
+                   f'{db_name}.{staging} TO {db_name}.{table_name}')
+    print(">>> Merging to remove duplicates (OPTIMIZE ... FINAL)...")
+    client.command(f'OPTIMIZE TABLE {db_name}.{table_name} FINAL')
+    print(f"✅ Migrated. Old table kept as {db_name}.{backup}; drop it once verified.")
+    return True
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Web 面板压测: N 个并发客户端模拟打开的面板页面，对比
+    dev          Flask 开发服务器，无响应缓存 (旧部署方式)
+    prod         waitress 多线程服务，无响应缓存
+    prod+cache   waitress + 短 TTL 响应缓存 + gzip
+
+每个客户端先全量加载 (/api/equity 自动时间桶 + /api/operations)，之后不停地用
+ETag + 增量游标轮询，每 --reload-every 轮重新全量加载一次 (模拟刷新页面)；
+同时后台每 0.5 秒写入一条权益快照 (模拟机器人)。统计请求吞吐、延迟 (p50 / p99)、
+状态码分布与平均传输字节数。
+
+服务端在子进程中运行 (本脚本 --serve 模式)，使用临时数据库。
+
+用法:
+    python scripts/load_test_dashboard.py --clients 100 --duration 10 --rows 50000
+"""
+import argparse
+import asyncio
+import collections
+import datetime
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import aiohttp
+import numpy as np
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+sys.path.append(SRC)
+
+MODES = {
+    'dev': {'production': False, 'cache_ttl': 0},
+    'prod': {'production': True, 'cache_ttl': 0},
+    'prod+cache': {'production': True, 'cache_ttl': 2.0},
+}
+
+
+def seed(db_file, rows):
+    """每分钟一条权益快照 (共 rows 条) + 200 条操作记录"""
+    from database import DBManager
+    db = DBManager('bench', db_file=db_file)
+    now = int(time.time())
+    start = now - rows * 60
+    with db.connection() as conn:
+        conn.executemany(
+            'INSERT INTO equity_snapshots (timestamp, total_equity, unrealized_pnl, ts) VALUES (?, ?, 0, ?)',
+            [(datetime.datetime.fromtimestamp(ts).isoformat(), 1000.0 + random.gauss(0, 5), ts)
+             for ts in range(start, now, 60)])
+    for i in range(200):
+        db.log_operation('BTC/USDT', 'LONG', 'ENTRY', 40000.0 + i, 0.01, details=f"seed {i}")
+    db.flush()
+    return db
+
+
+def serve(db_file, port, mode):
+    import config
+    import web_server
+    from database import DBManager
+
+    db = DBManager('bench', db_file=db_file)
+    web_server.get_db = lambda env: db
+    config.WEB_CACHE_TTL = MODES[mode]['cache_ttl']
+    if MODES[mode]['production']:
+        config.WEB_THREADS = 32
+    web_server.run_server('127.0.0.1', port, MODES[mode]['production'])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(base, timeout=20):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base}/api/operations") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def dashboard_client(session, base, stop, stats, reload_every):
+    """与 dashboard.html 相同的请求序列"""
+    state = {}
+
+    async def get(url, etag_key=None):
+        headers = {'If-None-Match': state[etag_key]} if etag_key and etag_key in state else {}
+        started = time.perf_counter()
+        async with session.get(base + url, headers=headers) as resp:
+            body = await resp.json() if resp.status == 200 else None
+            size = int(resp.headers.get('Content-Length') or 0)
+            stats['latency'].append((time.perf_counter() - started) * 1000)
+            stats['status'][resp.status] += 1
+            stats['bytes'] += size
+            if etag_key and 'ETag' in resp.headers:
+                state[etag_key] = resp.headers['ETag']
+            return body
+
+    rounds = 0
+    while not stop.is_set():
+        if rounds % reload_every == 0:
+            state.clear()
+            equity = await get('/api/equity?env=live&bucket=auto', 'eq')
+            ops = await get('/api/operations?env=live', 'op')
+        else:
+            equity = await get(f"/api/equity?env=live&bucket=auto&after={state['last_ts']}", 'eq')
+            ops = await get(f"/api/operations?env=live&after_id={state['op_id']}", 'op')
+        if equity:
+            state['last_ts'] = equity['last_ts']
+        if ops:
+            state['op_id'] = ops[0]['id']
+        rounds += 1
+
+
+async def load(base, clients, duration, reload_every):
+    stats = {'latency': [], 'status': collections.Counter(), 'bytes': 0}
+    stop = asyncio.Event()
+    connector = aiohttp.TCPConnector(limit=clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        tasks = [asyncio.create_task(dashboard_client(session, base, stop, stats, reload_every))
+                 for _ in range(clients)]
+        started = time.perf_counter()
+        await asyncio.sleep(duration)
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+    latency = np.array(stats['latency'])
+    return {
+        'req/s': len(latency) / elapsed,
+        'p50 ms': np.percentile(latency, 50),
+        'p99 ms': np.percentile(latency, 99),
+        'KB/req': stats['bytes'] / len(latency) / 1024,
+        'status': dict(sorted(stats['status'].items())),
+    }
+
+
+def run_mode(mode, db_file, args):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', mode,
+                               '--db', db_file, '--port', str(port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    # 模拟机器人写入
+    stop_writer = threading.Event()
+
+    def writer():
+        from database import DBManager
+        db = DBManager('bench', db_file=db_file, flush_interval=0)
+        while not stop_writer.wait(0.5):
+            db.log_equity(1000.0 + random.gauss(0, 5))
+        db.flush()
+
+    writer_thread = threading.Thread(target=writer)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        asyncio.run(wait_ready(base))
+        writer_thread.start()
+        return asyncio.run(load(base, args.clients, args.duration, args.reload_every))
+    finally:
+        stop_writer.set()
+        if writer_thread.is_alive():
+            writer_thread.join()
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Web dashboard load test")
+    parser.add_argument('--clients', type=int, default=100, help='Concurrent dashboard clients')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per mode')
+    parser.add_argument('--rows', type=int, default=50000, help='Seeded equity snapshots (one per minute)')
+    parser.add_argument('--reload-every', type=int, default=10, help='Full reload every N polling rounds')
+    parser.add_argument('--modes', default=','.join(MODES), help='Comma separated: ' + ', '.join(MODES))
+    parser.add_argument('--serve', choices=list(MODES), help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.db, args.port, args.serve)
+        return
+
+    print(f"--- Dashboard Load Test: {args.clients} clients x {args.duration:.0f}s, {args.rows} equity rows ---")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'dashboard.db')
+        seed(db_file, args.rows)
+        for mode in args.modes.split(','):
+            results[mode] = run_mode(mode, db_file, args)
+
+    columns = ['req/s', 'p50 ms', 'p99 ms', 'KB/req']
+    print(f"{'':<12}" + ''.join(f"{c:>10}" for c in columns) + "  status")
+    for name, r in results.items():
+        print(f"{name:<12}" + ''.join(f"{r[c]:>10.1f}" for c in columns) + f"  {r['status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,26 @@
 import requests
 import zipfile
 import io
-import pandas as pd
+import calendar
+import hashlib
+import inspect
 import clickhouse_connect
-from datetime import datetime, timedelta
-import os
-import shutil
-import sys
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+from datetime import datetime
+import queue
+import threading
+import time
 import argparse
 
+from ingest_manifest import MANIFEST_FILE, Manifest, migrate_to_replacing, replacing_schema
+
 # --- Configuration ---
 SYMBOL = 'BTCUSDT'
 TIMEFRAME = '1s'
 START_DATE = datetime(2025, 1, 1) # Start from Jan 2025
 END_DATE = datetime.now()
-TEMP_DIR = 'temp_download'
 
 # ClickHouse Configuration
 CLICKHOUSE_HOST = '192.168.66.10'
@@ -24,6 +30,25 @@ CLICKHOUSE_PASSWORD = 'uming' # Leave empty if no password
 DB_NAME = 'crypto_data'
 TABLE_NAME = 'btc_usdt_1s'
 
+# Pipeline Configuration (overridable from the command line)
+DOWNLOAD_WORKERS = 3   # network bound
+PARSE_WORKERS = 2      # CPU bound (Arrow CSV reader releases the GIL)
+INSERT_WORKERS = 2     # one ClickHouse client per worker
+QUEUE_SIZE = 2         # items buffered between stages: downloaded zips / parsed chunks
+CHUNK_BYTES = 16 * 1024 * 1024  # CSV bytes per parsed chunk / insert (~180k rows)
+REPORT_INTERVAL = 10   # seconds between progress lines
+
+COLUMNS = [
+    'open_time', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_volume', 'trades',
+    'taker_buy_base', 'taker_buy_quote', 'ignore'
+]
+COLUMN_TYPES = {
+    'open_time': pa.int64(), 'close_time': pa.int64(), 'trades': pa.uint64(),
+    **{c: pa.float64() for c in ('open', 'high', 'low', 'close', 'volume',
+                                 'quote_volume', 'taker_buy_base', 'taker_buy_quote')},
+}
+
 def get_month_list(start, end):
     months = []
     current = start
@@ -31,40 +56,422 @@ def get_month_list(start, end):
         # Skip current month (incomplete)
         if not (current.year == end.year and current.month == end.month):
             months.append(current)
-        
+
         if current.month == 12:
             current = current.replace(year=current.year + 1, month=1)
         else:
             current = current.replace(month=current.month + 1)
     return months
 
-def download_file(url, desc):
-    response = requests.get(url, stream=True)
+def download_file(url, desc, on_chunk=None):
+    """
+    Download into memory. Prints a progress bar unless on_chunk(nbytes) is given
+    (pipeline mode: several downloads run at once, the stage reporter prints progress).
+    """
+    response = requests.get(url, stream=True, timeout=60)
     if response.status_code == 404:
         return None
     response.raise_for_status()
-    
+
     total_size = int(response.headers.get('content-length', 0))
     block_size = 1024 * 1024  # 1MB
     data = io.BytesIO()
     downloaded = 0
-    
-    print(f"  [Download] {desc}: ", end='', flush=True)
+
+    if on_chunk is None:
+        print(f"  [Download] {desc}: ", end='', flush=True)
     for chunk in response.iter_content(chunk_size=block_size):
         data.write(chunk)
         downloaded += len(chunk)
-        if total_size > 0:
+        if on_chunk is not None:
+            on_chunk(len(chunk))
+        elif total_size > 0:
             percent = (downloaded / total_size) * 100
             print(f"\r  [Download] {desc}: {percent:.1f}% ({downloaded/(1024*1024):.1f}MB)", end='', flush=True)
-    print("\n", end='')
+    if on_chunk is None:
+        print("\n", end='')
+    data.seek(0)
     return data
 
+def verify_checksum(url, data):
+    """sha256 of the archive, checked against Binance's published <file>.CHECKSUM when available"""
+    checksum = hashlib.sha256(data.getbuffer()).hexdigest()
+    try:
+        response = requests.get(url + '.CHECKSUM', timeout=30)
+    except requests.RequestException:
+        return checksum
+    if response.status_code == 200:
+        expected = response.text.split()[0].lower()
+        if expected != checksum:
+            raise ValueError(f"checksum mismatch (expected {expected[:12]}..., got {checksum[:12]}...)")
+    return checksum
+
+def get_client():
+    return clickhouse_connect.get_client(
+        host=CLICKHOUSE_HOST,
+        port=CLICKHOUSE_PORT,
+        username=CLICKHOUSE_USER,
+        password=CLICKHOUSE_PASSWORD
+    )
+
+_clients = threading.local()
+
+def thread_client():
+    """One ClickHouse client per worker thread (a client must not run concurrent queries)"""
+    if not hasattr(_clients, 'client'):
+        _clients.client = get_client()
+    return _clients.client
+
+def ensure_table(client, dedup=False):
+    client.command(f'CREATE DATABASE IF NOT EXISTS {DB_NAME}')
+    if dedup:
+        client.command(replacing_schema(DB_NAME, TABLE_NAME))
+        return
+
+    create_table_query = f'''
+    CREATE TABLE IF NOT EXISTS {DB_NAME}.{TABLE_NAME} (
+        open_time DateTime64(3),
+        open Float64,
+        high Float64,
+        low Float64,
+        close Float64,
+        volume Float64,
+        close_time DateTime64(3),
+        quote_volume Float64,
+        trades UInt64,
+        taker_buy_base Float64,
+        taker_buy_quote Float64
+    ) ENGINE = MergeTree()
+    ORDER BY open_time
+    '''
+    client.command(create_table_query)
+
+def month_task(date, manifest=None, force=False):
+    month_label = date.strftime('%Y-%m')
+    file_name = f"{SYMBOL}-{TIMEFRAME}-{month_label}.zip"
+    next_month = date.replace(year=date.year + 1, month=1) if date.month == 12 else date.replace(month=date.month + 1)
+    return {
+        'label': month_label,
+        'unit': f"monthly/{SYMBOL}/{TIMEFRAME}/{month_label}",
+        'file_name': file_name,
+        'url': f"https://data.binance.vision/data/spot/monthly/klines/{SYMBOL}/{TIMEFRAME}/{file_name}",
+        'range': (calendar.timegm(date.timetuple()) * 1000, calendar.timegm(next_month.timetuple()) * 1000),
+        'manifest': manifest,
+        'force': force,
+    }
+
+def epoch_ms_range(table):
+    """(first, last) open_time of an Arrow chunk as epoch ms"""
+    bounds = pc.min_max(table.column('open_time').cast(pa.int64()))
+    return bounds['min'].as_py(), bounds['max'].as_py()
+
+def count_range(client, first_ms, last_ms):
+    return int(client.command(
+        f"SELECT count() FROM {DB_NAME}.{TABLE_NAME} WHERE open_time BETWEEN "
+        f"fromUnixTimestamp64Milli(toInt64({first_ms})) AND fromUnixTimestamp64Milli(toInt64({last_ms}))"))
+
+def delete_range(client, start_ms, end_ms):
+    """Remove [start_ms, end_ms) before reloading a unit; waits for the mutation to finish"""
+    client.command(
+        f"ALTER TABLE {DB_NAME}.{TABLE_NAME} DELETE WHERE open_time >= fromUnixTimestamp64Milli(toInt64({start_ms})) "
+        f"AND open_time < fromUnixTimestamp64Milli(toInt64({end_ms})) SETTINGS mutations_sync = 2")
+
+def convert_table(table):
+    """int64 epoch columns -> timestamp[ms] (DateTime64(3) on insert)"""
+    open_time, close_time = table.column('open_time'), table.column('close_time')
+
+    # Fix: Check for microsecond timestamps (16 digits) vs millisecond (13 digits)
+    # Year 2262 (Pandas max) is approx 9.2e12 ms.
+    # If values are larger than 1e14, they are likely microseconds.
+    if table.num_rows and pc.max(open_time).as_py() > 100000000000000: # > 1e14
+        open_time = pc.divide(open_time, 1000)
+        close_time = pc.divide(close_time, 1000)
+
+    table = table.set_column(table.schema.get_field_index('open_time'), 'open_time',
+                             open_time.cast(pa.timestamp('ms')))
+    return table.set_column(table.schema.get_field_index('close_time'), 'close_time',
+                            close_time.cast(pa.timestamp('ms')))
+
+def parse_block(block):
+    """Parse a buffer of complete CSV lines into an Arrow table"""
+    table = pa_csv.read_csv(
+        pa.BufferReader(block),
+        read_options=pa_csv.ReadOptions(column_names=COLUMNS),
+        convert_options=pa_csv.ConvertOptions(column_types=COLUMN_TYPES, include_columns=COLUMNS[:-1]),
+    )
+    return convert_table(table)
+
+def read_csv_chunks(csv_file, block_size=None):
+    """
+    Stream a kline CSV file object (e.g. a zip member) as Arrow tables of ~block_size CSV bytes.
+    Blocks are read on demand and cut at the last newline, so only one block is in memory
+    at a time whatever the file size (pyarrow's own streaming reader reads ahead unbounded
+    when the consumer, here the ClickHouse insert, is slower than the source).
+    """
+    block_size = block_size or CHUNK_BYTES
+    tail = b''
+    while True:
+        block = csv_file.read(block_size)
+        if not block:
+            break
+        data = tail + block
+        cut = data.rfind(b'\n') + 1
+        if cut == 0:
+            tail = data  # line longer than a block: keep reading
+            continue
+        tail = data[cut:]
+        yield parse_block(memoryview(data)[:cut])
+    if tail.strip():
+        yield parse_block(tail)
+
+
+# --- Pipeline ---
+
+class Stage:
+    """
+    One pipeline stage: `workers` threads take tasks from inbox, run func(task, stage) and put
+    the result into outbox. Queues are bounded, so a slow downstream stage blocks the upstream
+    ones instead of piling months up in memory. func returns None to drop a task
+    (e.g. archive not published yet), or a generator to emit several results (chunks) per task.
+    """
+
+    def __init__(self, name, func, workers, inbox, outbox=None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.inbox = inbox
+        self.outbox = outbox
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.rows = 0
+        self.bytes = 0
+        self.busy = 0.0        # summed worker seconds spent in func
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def add(self, rows=0, nbytes=0):
+        with self._lock:
+            self.rows += rows
+            self.bytes += nbytes
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._threads = [threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+                         for i in range(self.workers)]
+        for t in self._threads:
+            t.start()
+
+    def join(self, downstream_workers=0):
+        """Wait for all workers, then tell the next stage there is nothing more to come"""
+        for t in self._threads:
+            t.join()
+        self.finished = time.perf_counter()
+        for _ in range(downstream_workers):
+            self.outbox.put(None)
+
+    def _worker(self):
+        while True:
+            task = self.inbox.get()
+            if task is None:
+                return
+            started = time.perf_counter()
+            try:
+                result = self.func(task, self)
+                if inspect.isgenerator(result):
+                    # Each chunk is handed on as soon as it is ready
+                    for item in result:
+                        self.outbox.put(item)
+                    result = ()
+                with self._lock:
+                    if result is None:
+                        self.skipped += 1
+                    else:
+                        self.done += 1
+            except Exception as e:
+                result = None
+                with self._lock:
+                    self.failed += 1
+                print(f"  ❌ [{self.name}] Error processing {task['label']}: {e}")
+            with self._lock:
+                self.busy += time.perf_counter() - started
+            if result and self.outbox is not None:
+                self.outbox.put(result)
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self):
+        elapsed = max(self.elapsed(), 1e-9)
+        return (f"{self.name:<9} {self.done:>4} ok {self.skipped:>3} skipped {self.failed:>3} failed  "
+                f"{self.rows:>12,} rows {self.rows / elapsed:>10,.0f} rows/s  "
+                f"{self.bytes / 1048576:>9.1f} MB {self.bytes / 1048576 / elapsed:>7.1f} MB/s  "
+                f"busy {self.busy:>7.1f}s")
+
+
+def download_stage(task, stage):
+    manifest = task['manifest']
+    if manifest is not None and not task['force'] and manifest.is_complete(task['unit']):
+        print(f"  ⏭️  {task['label']} already ingested (skipping)")
+        return None
+    data = download_file(task['url'], task['file_name'], on_chunk=lambda n: stage.add(nbytes=n))
+    if data is None:
+        print(f"  ⚠️  File not found (skipping): {task['file_name']}")
+        return None
+    task['checksum'] = verify_checksum(task['url'], data)
+    task['data'] = data
+    return task
+
+def prepare_month(task):
+    """
+    Decide how to load a month. Returns the chunk indexes already inserted.
+    - --force, or a partial load from a different archive / chunk size: delete the month and reload
+    - partial load of the same archive: resume, skipping the chunks recorded as inserted
+    Chunks not in the manifest are checked against the table before inserting (see insert_stage),
+    which also protects months loaded before the manifest existed.
+    """
+    manifest = task['manifest']
+    entry = manifest.get(task['unit']) if manifest is not None else None
+    if task['force'] or (entry and (entry.get('checksum') != task.get('checksum')
+                                     or entry.get('chunk_bytes') != CHUNK_BYTES)):
+        print(f"  ♻️  {task['label']}: reloading (deleting existing rows of this month)")
+        delete_range(thread_client(), *task['range'])
+        if manifest is not None:
+            manifest.reset(task['unit'])
+        task['verify'] = False
+        entry = None
+    else:
+        task['verify'] = True
+    if manifest is not None:
+        manifest.update(task['unit'], status='partial', checksum=task.get('checksum'), chunk_bytes=CHUNK_BYTES)
+    done = {int(i) for i in entry.get('chunks', {})} if entry else set()
+    if done:
+        print(f"  ⏯️  {task['label']}: resuming, {len(done)} chunks already inserted")
+    return done
+
+def parse_stage(task, stage):
+    """Read the CSV straight out of the zip member, one chunk at a time (no temp files)"""
+    done = prepare_month(task)
+    task['lock'] = threading.Lock()
+    task['pending'] = 0       # chunks emitted but not inserted yet
+    task['parsed'] = False
+    task['rows'] = 0
+    with zipfile.ZipFile(task.pop('data')) as z:
+        member = z.infolist()[0]
+        stage.add(nbytes=member.file_size)
+        with z.open(member) as csv_file:
+            for index, table in enumerate(read_csv_chunks(csv_file)):
+                stage.add(rows=table.num_rows)
+                with task['lock']:
+                    task['rows'] += table.num_rows
+                    if index in done:
+                        continue
+                    task['pending'] += 1
+                yield {'label': task['label'], 'month': task, 'index': index, 'table': table}
+    if finish_month(task, parsed=True):
+        complete_month(task)
+
+def finish_month(month, parsed=False, inserted=0):
+    """Returns True exactly once: when the month is fully parsed and every chunk is inserted"""
+    with month['lock']:
+        month['parsed'] = month['parsed'] or parsed
+        month['pending'] -= inserted
+        if month['parsed'] and month['pending'] == 0 and not month.get('finished'):
+            month['finished'] = True
+            return True
+    return False
+
+def complete_month(month):
+    if month['manifest'] is not None:
+        month['manifest'].update(month['unit'], status='complete')
+    print(f"  ✅ {month['label']}: {month['rows']:,} rows inserted")
+
+def insert_stage(chunk, stage):
+    month, table = chunk['month'], chunk.pop('table')
+    client = thread_client()
+    first, last = epoch_ms_range(table)
+
+    # A chunk inserted just before a crash (or by a run without the manifest) is already
+    # in the table: ClickHouse inserts each block atomically, so it is all there or absent
+    present = count_range(client, first, last) if month['verify'] and table.num_rows else 0
+    if present >= table.num_rows > 0:
+        if present > table.num_rows:
+            print(f"  ⚠️  {chunk['label']} chunk {chunk['index']}: {present - table.num_rows} duplicate rows "
+                  f"already in the table (use --force to reload the month)")
+    elif present:
+        raise ValueError(f"chunk {chunk['index']} is partially present ({present}/{table.num_rows} rows); "
+                         f"use --force to reload the month")
+    else:
+        client.insert_arrow(f'{DB_NAME}.{TABLE_NAME}', table)
+        stage.add(rows=table.num_rows, nbytes=table.nbytes)
+
+    if month['manifest'] is not None:
+        month['manifest'].add_rows(month['unit'], table.num_rows, first, last, chunk=chunk['index'])
+    if finish_month(month, inserted=1):
+        complete_month(month)
+    return chunk
+
+
+def run_pipeline(months, download_workers=DOWNLOAD_WORKERS, parse_workers=PARSE_WORKERS,
+                 insert_workers=INSERT_WORKERS, queue_size=QUEUE_SIZE, report_interval=REPORT_INTERVAL,
+                 download=download_stage, parse=parse_stage, insert=insert_stage, manifest=None, force=False):
+    """download -> parse -> insert, each stage with its own worker pool. Returns the stages."""
+    pending = queue.Queue()
+    downloaded = queue.Queue(maxsize=queue_size)
+    parsed = queue.Queue(maxsize=queue_size)
+    stages = [
+        Stage('download', download, download_workers, pending, downloaded),
+        Stage('parse', parse, parse_workers, downloaded, parsed),
+        Stage('insert', insert, insert_workers, parsed),
+    ]
+    for date in months:
+        pending.put(month_task(date, manifest, force))
+    for _ in range(download_workers):
+        pending.put(None)
+
+    stop = threading.Event()
+
+    def report():
+        while not stop.wait(report_interval):
+            line = " | ".join(
+                f"{s.name} {s.done} {s.rows / max(s.elapsed(), 1e-9):,.0f} rows/s "
+                f"{s.bytes / 1048576 / max(s.elapsed(), 1e-9):.1f} MB/s" for s in stages)
+            print(f"  [Progress] {line} | queued {downloaded.qsize()}/{parsed.qsize()}", flush=True)
+
+    reporter = threading.Thread(target=report, daemon=True)
+    for s in stages:
+        s.start()
+    reporter.start()
+    stages[0].join(parse_workers)
+    stages[1].join(insert_workers)
+    stages[2].join()
+    stop.set()
+    return stages
+
+
 def download_and_ingest():
     # Parse Arguments
     parser = argparse.ArgumentParser(description="Download Binance 1s data to ClickHouse")
     parser.add_argument('--month', type=str, help='Specific month to download (YYYY-MM), e.g., 2023-01')
+    parser.add_argument('--download-workers', type=int, default=DOWNLOAD_WORKERS, help='Parallel downloads')
+    parser.add_argument('--parse-workers', type=int, default=PARSE_WORKERS, help='Parallel CSV parsers')
+    parser.add_argument('--insert-workers', type=int, default=INSERT_WORKERS, help='Parallel ClickHouse inserts')
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE, help='Months buffered between stages')
+    parser.add_argument('--manifest', default=MANIFEST_FILE, help='Checkpoint manifest (completed months are skipped)')
+    parser.add_argument('--force', action='store_true', help='Reload months even if already ingested')
+    parser.add_argument('--dedup', action='store_true', help='Create the table as ReplacingMergeTree if missing')
+    parser.add_argument('--migrate-dedup', action='store_true',
+                        help='Convert the existing MergeTree table to ReplacingMergeTree and exit')
     args = parser.parse_args()
 
+    if args.migrate_dedup:
+        migrate_to_replacing(get_client(), DB_NAME, TABLE_NAME)
+        return
+
     # Determine Date Range
     if args.month:
         try:
@@ -81,114 +488,28 @@ def download_and_ingest():
 
     # 1. Setup ClickHouse
     try:
-        client = clickhouse_connect.get_client(
-            host=CLICKHOUSE_HOST, 
-            port=CLICKHOUSE_PORT, 
-            username=CLICKHOUSE_USER, 
-            password=CLICKHOUSE_PASSWORD
-        )
-        
-        client.command(f'CREATE DATABASE IF NOT EXISTS {DB_NAME}')
-        
-        create_table_query = f'''
-        CREATE TABLE IF NOT EXISTS {DB_NAME}.{TABLE_NAME} (
-            open_time DateTime64(3),
-            open Float64,
-            high Float64,
-            low Float64,
-            close Float64,
-            volume Float64,
-            close_time DateTime64(3),
-            quote_volume Float64,
-            trades UInt64,
-            taker_buy_base Float64,
-            taker_buy_quote Float64
-        ) ENGINE = MergeTree()
-        ORDER BY open_time
-        '''
-        client.command(create_table_query)
+        ensure_table(get_client(), args.dedup)
         print(">>> ClickHouse connection established and table verified.")
-        
+
     except Exception as e:
         print(f"❌ Failed to connect to ClickHouse: {e}")
         return
 
-    # 2. Setup Temp Dir
-    if not os.path.exists(TEMP_DIR):
-        os.makedirs(TEMP_DIR)
-    
-    total_months = len(all_months)
-    total_records_all = 0
-
+    print(f">>> Pipeline: {args.download_workers} download / {args.parse_workers} parse / "
+          f"{args.insert_workers} insert workers, queue size {args.queue_size}")
     print("-" * 60)
 
-    # 3. Iterate Months
-    for idx, date in enumerate(all_months):
-        year_str = date.strftime('%Y')
-        month_str = date.strftime('%m')
-        month_label = f"{year_str}-{month_str}"
-        
-        overall_progress = ((idx + 1) / total_months) * 100
-        print(f"[{overall_progress:.1f}%] Processing Month {idx+1}/{total_months}: {month_label}")
-
-        file_name = f"{SYMBOL}-{TIMEFRAME}-{year_str}-{month_str}.zip"
-        url = f"https://data.binance.vision/data/spot/monthly/klines/{SYMBOL}/{TIMEFRAME}/{file_name}"
-        
-        try:
-            # Download with progress
-            file_data = download_file(url, file_name)
-            if not file_data:
-                print(f"  ⚠️  File not found (skipping): {file_name}")
-                continue
-            
-            # Extract
-            with zipfile.ZipFile(file_data) as z:
-                csv_filename = z.namelist()[0]
-                z.extract(csv_filename, TEMP_DIR)
-                csv_path = os.path.join(TEMP_DIR, csv_filename)
-                
-                # Read CSV
-                columns = [
-                    'open_time', 'open', 'high', 'low', 'close', 'volume', 
-                    'close_time', 'quote_volume', 'trades', 
-                    'taker_buy_base', 'taker_buy_quote', 'ignore'
-                ]
-                
-                print(f"  [Ingest] Reading {csv_filename}...", end='', flush=True)
-                df = pd.read_csv(csv_path, names=columns)
-                df.drop(columns=['ignore'], inplace=True)
-                
-                # Fix: Check for microsecond timestamps (16 digits) vs millisecond (13 digits)
-                # Year 2262 (Pandas max) is approx 9.2e12 ms.
-                # If values are larger than 1e14, they are likely microseconds.
-                if not df.empty and df['open_time'].max() > 100000000000000: # > 1e14
-                    print(" (Detected microsecond timestamps, adjusting...)", end='')
-                    df['open_time'] = df['open_time'] // 1000
-                    df['close_time'] = df['close_time'] // 1000
-
-                df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-                df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
-                print(f" Done ({len(df)} rows).")
-                
-                # Insert
-                print(f"  [Ingest] Writing to ClickHouse...", end='', flush=True)
-                client.insert_df(f'{DB_NAME}.{TABLE_NAME}', df)
-                total_records_all += len(df)
-                print(f" Done. Total records in DB: {total_records_all:,}")
-                
-                # Cleanup
-                os.remove(csv_path)
-
-        except Exception as e:
-            print(f"\n  ❌ Error processing {month_label}: {e}")
-
-        print("-" * 30)
-
-    # Cleanup Temp Dir
-    if os.path.exists(TEMP_DIR):
-        shutil.rmtree(TEMP_DIR)
-    
-    print(f"\n✅ Task Completed! Total records ingested: {total_records_all:,}")
+    # 2. Run Pipeline
+    started = time.perf_counter()
+    stages = run_pipeline(all_months, args.download_workers, args.parse_workers,
+                          args.insert_workers, args.queue_size,
+                          manifest=Manifest(args.manifest), force=args.force)
+
+    print("-" * 60)
+    for s in stages:
+        print(f"  {s.summary()}")
+    print(f"\n✅ Task Completed! Total records ingested: {stages[-1].rows:,} "
+          f"in {time.perf_counter() - started:.1f}s")
 
 if __name__ == "__main__":
     download_and_ingest()
@@ -0,0 +1,322 @@
+# backtest_kernel.py
+"""
+SL/TP1/TP2 持仓状态机的数组内核
+
+输入整段 bar 数组 (high/low/close/atr) 与进场信号数组，一次性输出
+成交明细、每笔交易盈亏和权益曲线。资金管理、手续费、保本、日内风控
+与 Backtester.close_trade / manage_open_trades 完全一致。
+
+安装了 numba 时内核会被编译 (njit)，否则以纯 NumPy 数组 + Python 循环运行，
+结果相同，只是速度不同。主要用于参数扫描等需要反复回测的场景。
+"""
+import numpy as np
+import pandas as pd
+import config
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        # 无 numba 时的占位装饰器: 原样返回函数
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# 成交原因编码
+FILL_SL = 0
+FILL_TP1 = 1
+FILL_TP2 = 2
+FILL_REASONS = {FILL_SL: 'SL', FILL_TP1: 'TP1', FILL_TP2: 'TP2'}
+
+SIDE_LONG = 1
+SIDE_SHORT = -1
+
+
+@njit(cache=True)
+def _simulate(high, low, close, atr, signals, days,
+              initial_capital, commission_rate, risk_pct, position_size_pct, leverage,
+              sl_pct, use_atr_for_sl, atr_sl_multiplier,
+              tp1_ratio, tp2_ratio, tp1_close_pct, move_sl_to_be,
+              max_open_positions, max_trades_per_day, max_daily_loss, max_consecutive_loss):
+    n = high.shape[0]
+    max_trades = 0
+    for i in range(n):
+        if signals[i] != 0:
+            max_trades += 1
+    max_fills = max_trades * 2
+
+    # --- 每笔交易 (按开仓顺序编号) ---
+    t_entry_bar = np.empty(max_trades, dtype=np.int64)
+    t_side = np.empty(max_trades, dtype=np.int64)
+    t_entry = np.empty(max_trades, dtype=np.float64)
+    t_sl = np.empty(max_trades, dtype=np.float64)
+    t_size = np.empty(max_trades, dtype=np.float64)
+    t_tp1 = np.empty(max_trades, dtype=np.float64)
+    t_tp2 = np.empty(max_trades, dtype=np.float64)
+    t_tp1_filled = np.zeros(max_trades, dtype=np.bool_)
+    t_pnl = np.zeros(max_trades, dtype=np.float64)
+    t_exit_bar = np.full(max_trades, -1, dtype=np.int64)
+    t_exit_price = np.full(max_trades, np.nan, dtype=np.float64)
+    t_exit_reason = np.full(max_trades, -1, dtype=np.int64)
+    close_order = np.empty(max_trades, dtype=np.int64)
+
+    # --- 成交明细 ---
+    f_bar = np.empty(max_fills, dtype=np.int64)
+    f_trade = np.empty(max_fills, dtype=np.int64)
+    f_price = np.empty(max_fills, dtype=np.float64)
+    f_qty = np.empty(max_fills, dtype=np.float64)
+    f_pnl = np.empty(max_fills, dtype=np.float64)
+    f_reason = np.empty(max_fills, dtype=np.int64)
+
+    equity = np.empty(n, dtype=np.float64)
+
+    # 当前持仓 (保持开仓顺序，与 Backtester.open_trades 列表一致)
+    open_ids = np.empty(max(max_open_positions, 1), dtype=np.int64)
+    n_open = 0
+    n_trades = 0
+    n_closed = 0
+    n_fills = 0
+
+    capital = initial_capital
+    current_day = days[0] - 1 if n > 0 else 0
+    daily_trades_count = 0
+    daily_realized_pnl = 0.0
+    consecutive_losses = 0
+    stop_trading_today = False
+
+    for i in range(n):
+        # Daily Reset
+        if days[i] != current_day:
+            current_day = days[i]
+            daily_trades_count = 0
+            daily_realized_pnl = 0.0
+            consecutive_losses = 0
+            stop_trading_today = False
+
+        # Record Equity (Mark-to-market)
+        unrealized_pnl = 0.0
+        for k in range(n_open):
+            tid = open_ids[k]
+            if t_side[tid] == SIDE_LONG:
+                unrealized_pnl += (close[i] - t_entry[tid]) * t_size[tid]
+            else:
+                unrealized_pnl += (t_entry[tid] - close[i]) * t_size[tid]
+        if n_open > 0:
+            equity[i] = capital + unrealized_pnl
+        else:
+            equity[i] = capital
+
+        # Check Risk Stops (Daily)
+        if daily_realized_pnl <= max_daily_loss:
+            stop_trading_today = True
+        if consecutive_losses >= max_consecutive_loss:
+            stop_trading_today = True
+
+        # Manage Open Positions
+        k = 0
+        while k < n_open:
+            tid = open_ids[k]
+            is_long = t_side[tid] == SIDE_LONG
+            closed = False
+
+            # 每根 K 线最多 SL / TP1 / TP2 三个检查点
+            for step in range(3):
+                if step == 0:
+                    hit = low[i] <= t_sl[tid] if is_long else high[i] >= t_sl[tid]
+                    price = t_sl[tid]
+                    pct = 1.0
+                    reason = FILL_SL
+                elif step == 1:
+                    if t_tp1_filled[tid]:
+                        continue
+                    hit = high[i] >= t_tp1[tid] if is_long else low[i] <= t_tp1[tid]
+                    price = t_tp1[tid]
+                    pct = tp1_close_pct
+                    reason = FILL_TP1
+                else:
+                    if not t_tp1_filled[tid]:
+                        continue
+                    hit = high[i] >= t_tp2[tid] if is_long else low[i] <= t_tp2[tid]
+                    price = t_tp2[tid]
+                    pct = 1.0
+                    reason = FILL_TP2
+
+                if not hit:
+                    continue
+
+                # --- close_trade ---
+                close_qty = t_size[tid] * pct
+                if is_long:
+                    trade_pnl = (price - t_entry[tid]) * close_qty
+                else:
+                    trade_pnl = (t_entry[tid] - price) * close_qty
+                commission = (t_entry[tid] * close_qty * commission_rate) + \
+                             (price * close_qty * commission_rate)
+                net_pnl = trade_pnl - commission
+
+                capital += net_pnl
+                daily_realized_pnl += net_pnl
+
+                f_bar[n_fills] = i
+                f_trade[n_fills] = tid
+                f_price[n_fills] = price
+                f_qty[n_fills] = close_qty
+                f_pnl[n_fills] = net_pnl
+                f_reason[n_fills] = reason
+                n_fills += 1
+
+                t_pnl[tid] += net_pnl
+                t_exit_price[tid] = price
+
+                if pct == 1.0:
+                    t_exit_bar[tid] = i
+                    t_exit_reason[tid] = reason
+                    close_order[n_closed] = tid
+                    n_closed += 1
+                    if net_pnl < 0:
+                        consecutive_losses += 1
+                    else:
+                        consecutive_losses = 0
+                    closed = True
+                    break
+
+                # Partial Close (TP1)
+                t_size[tid] -= close_qty
+                t_tp1_filled[tid] = True
+                if move_sl_to_be:
+                    t_sl[tid] = t_entry[tid]
+
+            if closed:
+                for m in range(k, n_open - 1):
+                    open_ids[m] = open_ids[m + 1]
+                n_open -= 1
+            else:
+                k += 1
+
+        # Check Entry Signal
+        if signals[i] != 0 and not stop_trading_today and \
+           daily_trades_count < max_trades_per_day and \
+           n_open < max_open_positions:
+            entry_price = close[i]
+            if use_atr_for_sl and not np.isnan(atr[i]):
+                sl_dist = atr[i] * atr_sl_multiplier
+            else:
+                sl_dist = entry_price * sl_pct
+
+            if signals[i] > 0:
+                sl_price = entry_price - sl_dist
+            else:
+                sl_price = entry_price + sl_dist
+
+            # calculate_position_size
+            qty = 0.0
+            risk_per_btc_usdt = abs(entry_price - sl_price)
+            if risk_per_btc_usdt > 0:
+                qty_by_risk = (capital * risk_pct) / risk_per_btc_usdt
+                qty_by_capital = ((capital * position_size_pct) * leverage) / entry_price
+                qty = min(qty_by_risk, qty_by_capital)
+
+            if qty > 0:
+                tid = n_trades
+                n_trades += 1
+                risk_dist = abs(entry_price - sl_price)
+                t_entry_bar[tid] = i
+                t_entry[tid] = entry_price
+                t_sl[tid] = sl_price
+                t_size[tid] = qty
+                if signals[i] > 0:
+                    t_side[tid] = SIDE_LONG
+                    t_tp1[tid] = entry_price + (risk_dist * tp1_ratio)
+                    t_tp2[tid] = entry_price + (risk_dist * tp2_ratio)
+                else:
+                    t_side[tid] = SIDE_SHORT
+                    t_tp1[tid] = entry_price - (risk_dist * tp1_ratio)
+                    t_tp2[tid] = entry_price - (risk_dist * tp2_ratio)
+                open_ids[n_open] = tid
+                n_open += 1
+                daily_trades_count += 1
+
+    # 收盘后仍持仓的交易排在已平仓交易之后
+    order = np.empty(n_closed + n_open, dtype=np.int64)
+    order[:n_closed] = close_order[:n_closed]
+    order[n_closed:] = open_ids[:n_open]
+
+    return (equity, capital, order, n_closed,
+            t_entry_bar, t_side, t_entry, t_sl, t_size, t_tp1, t_tp2,
+            t_tp1_filled, t_pnl, t_exit_bar, t_exit_price, t_exit_reason,
+            f_bar[:n_fills], f_trade[:n_fills], f_price[:n_fills],
+            f_qty[:n_fills], f_pnl[:n_fills], f_reason[:n_fills])
+
+
+def simulate_trades(df, signals, cfg=config):
+    """
+    df: 已计算指标并 dropna 的回测 DataFrame (需要 high/low/close/atr 列)
+    signals: np.int8 进场信号数组 (+1 LONG / -1 SHORT / 0)
+    cfg: 配置对象 (默认全局 config)
+    Returns: {
+        'equity': DataFrame[time, equity],
+        'trades': DataFrame (已平仓在前，按平仓顺序；未平仓在后),
+        'fills': DataFrame (每一次平仓/减仓成交，trade_id 对应 trades.trade_id),
+        'final_capital': float
+    }
+    """
+    index = df.index
+    high = np.ascontiguousarray(df['high'].to_numpy(dtype=np.float64))
+    low = np.ascontiguousarray(df['low'].to_numpy(dtype=np.float64))
+    close = np.ascontiguousarray(df['close'].to_numpy(dtype=np.float64))
+    atr = np.ascontiguousarray(df['atr'].to_numpy(dtype=np.float64))
+    signals = np.ascontiguousarray(signals, dtype=np.int8)
+    days = np.ascontiguousarray(index.normalize().asi8, dtype=np.int64)
+
+    (equity, capital, order, n_closed,
+     t_entry_bar, t_side, t_entry, t_sl, t_size, t_tp1, t_tp2,
+     t_tp1_filled, t_pnl, t_exit_bar, t_exit_price, t_exit_reason,
+     f_bar, f_trade, f_price, f_qty, f_pnl, f_reason) = _simulate(
+        high, low, close, atr, signals, days,
+        float(cfg.INITIAL_CAPITAL), float(cfg.COMMISSION_RATE),
+        float(cfg.RISK_PER_TRADE_PCT), float(cfg.POSITION_SIZE_PCT), float(cfg.LEVERAGE),
+        float(cfg.SL_PCT), bool(cfg.USE_ATR_FOR_SL), float(cfg.ATR_SL_MULTIPLIER),
+        float(cfg.TP1_RATIO), float(cfg.TP2_RATIO), float(cfg.TP1_CLOSE_PCT),
+        bool(cfg.MOVE_SL_TO_BE_AFTER_TP1),
+        int(cfg.MAX_OPEN_POSITIONS), int(cfg.MAX_TRADES_PER_DAY),
+        float(cfg.MAX_DAILY_LOSS), int(cfg.MAX_CONSECUTIVE_LOSS)
+    )
+
+    exit_bar = t_exit_bar[order]
+    exit_reason = t_exit_reason[order]
+    exit_time = pd.Series(index.take(np.maximum(exit_bar, 0))).where(exit_bar >= 0)
+    trades = pd.DataFrame({
+        'trade_id': order,
+        'entry_time': index[t_entry_bar[order]],
+        'side': np.where(t_side[order] == SIDE_LONG, 'LONG', 'SHORT'),
+        'entry_price': t_entry[order],
+        'sl_price': t_sl[order],
+        'size': t_size[order],
+        'tp1_price': t_tp1[order],
+        'tp2_price': t_tp2[order],
+        'tp1_filled': t_tp1_filled[order],
+        'pnl': t_pnl[order],
+        'exit_time': exit_time.to_numpy(),
+        'exit_price': t_exit_price[order],
+        'exit_reason': [FILL_REASONS.get(r) for r in exit_reason],
+        'status': np.where(exit_bar >= 0, 'CLOSED', 'OPEN'),
+    })
+
+    fills = pd.DataFrame({
+        'time': index[f_bar],
+        'trade_id': f_trade,
+        'price': f_price,
+        'qty': f_qty,
+        'pnl': f_pnl,
+        'reason': [FILL_REASONS[r] for r in f_reason],
+    })
+
+    return {
+        'equity': pd.DataFrame({'time': index, 'equity': equity}),
+        'trades': trades,
+        'fills': fills,
+        'final_capital': float(capital),
+    }
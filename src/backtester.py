@@ -1,11 +1,19 @@
 # backtester.py
+import numpy as np
 import pandas as pd
 from datetime import timedelta
 import config
+import backtest_kernel
 from strategy_factory import get_strategy
+from strategies.base import SIGNAL_LONG, SIGNAL_SHORT
+
+# 信号编码 (用于数组化回测)
+SIGNAL_CODES = {'LONG': SIGNAL_LONG, 'SHORT': SIGNAL_SHORT}
+SIGNAL_SIDES = {SIGNAL_LONG: 'LONG', SIGNAL_SHORT: 'SHORT'}
 
 class Trade:
-    def __init__(self, entry_time, entry_price, sl_price, size, sl_pct, side='LONG'):
+    def __init__(self, entry_time, entry_price, sl_price, size, sl_pct, side='LONG', cfg=config, symbol=None):
+        self.symbol = symbol # 组合回测时的交易对 (单品种回测为 None)
         self.entry_time = entry_time
         self.entry_price = entry_price
         self.sl_price = sl_price
@@ -17,11 +25,11 @@ class Trade:
         risk_dist = abs(entry_price - sl_price)
         
         if self.side == 'LONG':
-            self.tp1_price = entry_price + (risk_dist * config.TP1_RATIO)
-            self.tp2_price = entry_price + (risk_dist * config.TP2_RATIO)
+            self.tp1_price = entry_price + (risk_dist * cfg.TP1_RATIO)
+            self.tp2_price = entry_price + (risk_dist * cfg.TP2_RATIO)
         else: # SHORT
-            self.tp1_price = entry_price - (risk_dist * config.TP1_RATIO)
-            self.tp2_price = entry_price - (risk_dist * config.TP2_RATIO)
+            self.tp1_price = entry_price - (risk_dist * cfg.TP1_RATIO)
+            self.tp2_price = entry_price - (risk_dist * cfg.TP2_RATIO)
         
         self.status = 'OPEN' # OPEN, TP1_HIT, CLOSED
         self.tp1_filled = False
@@ -31,15 +39,17 @@ class Trade:
         self.exit_reason = None
 
 class Backtester:
-    def __init__(self, df):
+    def __init__(self, df, cfg=config):
         self.df = df
-        self.capital = config.INITIAL_CAPITAL
+        # 每次回测使用独立的配置对象 (默认全局 config，参数扫描时传入覆盖后的副本)
+        self.config = cfg
+        self.capital = cfg.INITIAL_CAPITAL
         self.equity_curve = []
         self.trades = []
         self.open_trades = [] # 支持多单
         
         # Load Strategy
-        self.strategy = get_strategy(config.ACTIVE_STRATEGY)
+        self.strategy = get_strategy(cfg.ACTIVE_STRATEGY, cfg)
         
         # Daily Constraints State
         self.current_date = None
@@ -62,7 +72,7 @@ class Backtester:
     def calculate_position_size(self, entry_price, sl_price):
         # 1. 基于风险计算 (Risk Based - USDT)
         # 允许亏损的 USDT 金额
-        risk_amount_usdt = self.capital * config.RISK_PER_TRADE_PCT
+        risk_amount_usdt = self.capital * self.config.RISK_PER_TRADE_PCT
         
         # 每 1 BTC 的亏损 USDT (Diff)
         risk_per_btc_usdt = abs(entry_price - sl_price)
@@ -75,7 +85,7 @@ class Backtester:
         # 2. 基于资金占用计算 (Capital Allocation Based - USDT)
         # 单笔最大投入 USDT = 本金 * 20%
         # 杠杆后最大可买 USDT 价值
-        max_position_value_usdt = (self.capital * config.POSITION_SIZE_PCT) * config.LEVERAGE
+        max_position_value_usdt = (self.capital * self.config.POSITION_SIZE_PCT) * self.config.LEVERAGE
         
         # 资金限定的数量 (BTC)
         qty_by_capital = max_position_value_usdt / entry_price
@@ -93,8 +103,8 @@ class Backtester:
             trade_pnl = (trade.entry_price - price) * close_qty
         
         # Commission
-        commission = (trade.entry_price * close_qty * config.COMMISSION_RATE) + \
-                     (price * close_qty * config.COMMISSION_RATE)
+        commission = (trade.entry_price * close_qty * self.config.COMMISSION_RATE) + \
+                     (price * close_qty * self.config.COMMISSION_RATE)
         
         net_pnl = trade_pnl - commission
         
@@ -124,126 +134,287 @@ class Backtester:
             trade.pnl += net_pnl
             trade.exit_price = price 
     
-    def run(self):
-        print("Starting Backtest...")
+    def mark_to_market(self, price):
+        # Mark-to-market PnL for ALL open positions
+        unrealized_pnl = 0
+        for t in self.open_trades:
+            if t.side == 'LONG':
+                unrealized_pnl += (price - t.entry_price) * t.size
+            else:
+                unrealized_pnl += (t.entry_price - price) * t.size
+        return unrealized_pnl
+
+    def update_risk_stops(self):
+        if self.daily_realized_pnl <= self.config.MAX_DAILY_LOSS:
+            self.stop_trading_today = True
+        
+        if self.consecutive_losses >= self.config.MAX_CONSECUTIVE_LOSS:
+            self.stop_trading_today = True
+
+    def can_open_trade(self):
+        # Condition: Not stopped today AND slots available
+        return not self.stop_trading_today and \
+               self.daily_trades_count < self.config.MAX_TRADES_PER_DAY and \
+               len(self.open_trades) < self.config.MAX_OPEN_POSITIONS
+
+    def manage_open_trades(self, high, low, timestamp, trades=None):
+        # --- Manage Open Positions (Loop over copy) ---
+        # trades: 只检查这些持仓 (组合回测按交易对传入)，默认全部
+        for t in (self.open_trades if trades is None else trades)[:]:
+            if t.side == 'LONG':
+                # Check SL (Low hits SL)
+                if low <= t.sl_price:
+                    self.close_trade(t, t.sl_price, 'SL', timestamp)
+                    continue
+                
+                # Check TP1 (High hits TP)
+                if not t.tp1_filled and high >= t.tp1_price:
+                    self.close_trade(t, t.tp1_price, 'TP1', timestamp, pct=self.config.TP1_CLOSE_PCT)
+                    t.tp1_filled = True
+                    if self.config.MOVE_SL_TO_BE_AFTER_TP1:
+                        t.sl_price = t.entry_price 
+                
+                # Check TP2
+                if t.tp1_filled and high >= t.tp2_price:
+                    self.close_trade(t, t.tp2_price, 'TP2', timestamp, pct=1.0)
+                    continue
+
+            else: # SHORT
+                # Check SL (High hits SL)
+                if high >= t.sl_price:
+                    self.close_trade(t, t.sl_price, 'SL', timestamp)
+                    continue
+                
+                # Check TP1 (Low hits TP)
+                if not t.tp1_filled and low <= t.tp1_price:
+                    self.close_trade(t, t.tp1_price, 'TP1', timestamp, pct=self.config.TP1_CLOSE_PCT)
+                    t.tp1_filled = True
+                    if self.config.MOVE_SL_TO_BE_AFTER_TP1:
+                        t.sl_price = t.entry_price 
+                
+                # Check TP2
+                if t.tp1_filled and low <= t.tp2_price:
+                    self.close_trade(t, t.tp2_price, 'TP2', timestamp, pct=1.0)
+                    continue
+
+    def open_trade(self, signal, timestamp, entry_price, atr, symbol=None):
+        if signal not in ('LONG', 'SHORT'):
+            return
+
+        if self.config.USE_ATR_FOR_SL and not pd.isna(atr):
+            sl_dist = atr * self.config.ATR_SL_MULTIPLIER
+        else:
+            sl_dist = entry_price * self.config.SL_PCT
+        
+        if signal == 'LONG':
+            sl_price = entry_price - sl_dist
+        else: # SHORT
+            sl_price = entry_price + sl_dist 
+        
+        qty = self.calculate_position_size(entry_price, sl_price)
+        
+        if qty > 0:
+            new_trade = Trade(timestamp, entry_price, sl_price, qty, self.config.SL_PCT, side=signal, cfg=self.config,
+                              symbol=symbol)
+            self.open_trades.append(new_trade)
+            self.daily_trades_count += 1
+
+    def run(self, engine=None):
+        """
+        engine: 'pandas' (逐行 iterrows, 参考实现) / 'numpy' (连续数组, 快速模式)
+                / 'kernel' (backtest_kernel 状态机内核, 有 numba 时编译运行)
+        默认读取 config.BACKTEST_ENGINE
+        """
+        engine = engine or self.config.BACKTEST_ENGINE
+        if engine not in ('pandas', 'numpy', 'kernel'):
+            raise ValueError(f"Unknown backtest engine: {engine}")
+
+        print(f"Starting Backtest... (engine: {engine})")
         
         # Pre-calculate indicators first (safe)
         self.df = self.strategy.calculate_indicators(self.df)
         self.df.dropna(inplace=True)
         
+        if engine == 'numpy':
+            equity_df = self._run_numpy()
+        elif engine == 'kernel':
+            equity_df = self._run_kernel()
+        else:
+            equity_df = self._run_pandas()
+
+        print("Backtest Finished.")
+        return equity_df
+
+    def iter_indicator_chunks(self, chunks):
+        """
+        逐块计算指标与信号。每块前拼接上一段末尾 STREAM_WARMUP_BARS 根原始 K 线作为预热，
+        使 EMA / 滚动窗口的状态跨块延续；预热部分算完即丢弃。
+        Yields: (带指标的 DataFrame, 信号数组)
+        """
+        warmup = self.config.STREAM_WARMUP_BARS
+        tail = None
+        last_timestamp = None
+
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+
+            frame = chunk if tail is None else pd.concat([tail, chunk])
+            df = self.strategy.calculate_indicators(frame)
+            df.dropna(inplace=True)
+            # 信号在含预热段的数据上计算，块内第一根 K 线也能拿到 prev_row
+            signals = self.signal_array(df)
+
+            if last_timestamp is not None:
+                keep = df.index > last_timestamp
+                df = df[keep]
+                signals = signals[keep]
+
+            tail = frame.iloc[-warmup:]
+            if df.empty:
+                continue
+            last_timestamp = df.index[-1]
+            yield df, signals
+
+    def run_stream(self, chunks):
+        """
+        流式回测: chunks 为按时间顺序产出 prepare_strategy_data 格式 DataFrame 的生成器
+        (如 data_loader.iter_strategy_data)。内存只保留当前块与预热段，
+        资金/持仓/日内风控状态跨块延续，结果与一次性加载的 numpy 引擎一致。
+        Returns: 权益曲线 DataFrame[time, equity, close]
+        """
+        print("Starting Backtest... (engine: numpy, streaming)")
+
+        equity_parts = []
+        for df, signals in self.iter_indicator_chunks(chunks):
+            self.df = df
+            part = self._run_numpy(signals)
+            part['close'] = df['close'].to_numpy()
+            equity_parts.append(part)
+
+        self.df = None
+        print("Backtest Finished.")
+        if not equity_parts:
+            return pd.DataFrame(columns=['time', 'equity', 'close'])
+        return pd.concat(equity_parts, ignore_index=True)
+
+    def _run_pandas(self):
         prev_row = None
         
         for timestamp, row in self.df.iterrows():
             self.check_daily_reset(timestamp)
             
             # Record Equity
-            # Mark-to-market PnL for ALL open positions
-            unrealized_pnl = 0
-            for t in self.open_trades:
-                if t.side == 'LONG':
-                    unrealized_pnl += (row['close'] - t.entry_price) * t.size
-                else:
-                    unrealized_pnl += (t.entry_price - row['close']) * t.size
-            
+            unrealized_pnl = self.mark_to_market(row['close'])
             self.equity_curve.append({'time': timestamp, 'equity': self.capital + unrealized_pnl})
 
             # Check Risk Stops (Daily)
-            if self.stop_trading_today:
-                # Still manage open trades even if stopped for new ones
-                pass
-            
-            if self.daily_realized_pnl <= config.MAX_DAILY_LOSS:
-                self.stop_trading_today = True
-            
-            if self.consecutive_losses >= config.MAX_CONSECUTIVE_LOSS:
-                self.stop_trading_today = True
-
-            # --- Manage Open Positions (Loop over copy) ---
-            for t in self.open_trades[:]:
-                if t.side == 'LONG':
-                    # Check SL (Low hits SL)
-                    if row['low'] <= t.sl_price:
-                        self.close_trade(t, t.sl_price, 'SL', timestamp)
-                        continue
-                    
-                    # Check TP1 (High hits TP)
-                    if not t.tp1_filled and row['high'] >= t.tp1_price:
-                        self.close_trade(t, t.tp1_price, 'TP1', timestamp, pct=config.TP1_CLOSE_PCT)
-                        t.tp1_filled = True
-                        if config.MOVE_SL_TO_BE_AFTER_TP1:
-                            t.sl_price = t.entry_price 
-                    
-                    # Check TP2
-                    if t.tp1_filled and row['high'] >= t.tp2_price:
-                        self.close_trade(t, t.tp2_price, 'TP2', timestamp, pct=1.0)
-                        continue
-
-                else: # SHORT
-                    # Check SL (High hits SL)
-                    if row['high'] >= t.sl_price:
-                        self.close_trade(t, t.sl_price, 'SL', timestamp)
-                        continue
-                    
-                    # Check TP1 (Low hits TP)
-                    if not t.tp1_filled and row['low'] <= t.tp1_price:
-                        self.close_trade(t, t.tp1_price, 'TP1', timestamp, pct=config.TP1_CLOSE_PCT)
-                        t.tp1_filled = True
-                        if config.MOVE_SL_TO_BE_AFTER_TP1:
-                            t.sl_price = t.entry_price 
-                    
-                    # Check TP2
-                    if t.tp1_filled and row['low'] <= t.tp2_price:
-                        self.close_trade(t, t.tp2_price, 'TP2', timestamp, pct=1.0)
-                        continue
+            # Still manage open trades even if stopped for new ones
+            self.update_risk_stops()
+
+            self.manage_open_trades(row['high'], row['low'], timestamp)
 
             # --- Check Entry Signal ---
-            # Condition: Not stopped today AND slots available
-            if not self.stop_trading_today and \
-               self.daily_trades_count < config.MAX_TRADES_PER_DAY and \
-               len(self.open_trades) < config.MAX_OPEN_POSITIONS:
-                
+            if self.can_open_trade():
                 signal = self.strategy.check_signal(row, prev_row)
-                entry_price = row['close']
-                
-                # Check if we already have a position in this direction?
-                # Usually grids/strategies might allow scaling in, but here "TrendMeanReversion" usually implies one entry per signal.
-                # Let's simple check: Don't enter if we just entered (prev candle). 
-                # But here we are iterating candles.
-                # Strategy logic handles signal generation.
-                
-                if signal == 'LONG':
-                    if config.USE_ATR_FOR_SL and not pd.isna(row['atr']):
-                        sl_dist = row['atr'] * config.ATR_SL_MULTIPLIER
-                    else:
-                        sl_dist = entry_price * config.SL_PCT
-                    
-                    sl_price = entry_price - sl_dist
-                    qty = self.calculate_position_size(entry_price, sl_price)
-                    
-                    if qty > 0:
-                        new_trade = Trade(timestamp, entry_price, sl_price, qty, config.SL_PCT, side='LONG')
-                        self.open_trades.append(new_trade)
-                        self.daily_trades_count += 1
-                
-                elif signal == 'SHORT':
-                    if config.USE_ATR_FOR_SL and not pd.isna(row['atr']):
-                        sl_dist = row['atr'] * config.ATR_SL_MULTIPLIER
-                    else:
-                        sl_dist = entry_price * config.SL_PCT
-                        
-                    sl_price = entry_price + sl_dist 
-                    qty = self.calculate_position_size(entry_price, sl_price)
-                    
-                    if qty > 0:
-                        new_trade = Trade(timestamp, entry_price, sl_price, qty, config.SL_PCT, side='SHORT')
-                        self.open_trades.append(new_trade)
-                        self.daily_trades_count += 1
+                self.open_trade(signal, timestamp, row['close'], row['atr'])
 
             prev_row = row
 
-        print("Backtest Finished.")
         return pd.DataFrame(self.equity_curve)
 
+    def signal_array(self, df=None):
+        """
+        预先计算整段数据的进场信号: +1 = LONG, -1 = SHORT, 0 = 无信号
+        优先使用策略的向量化 generate_signals，未实现时回退到逐行 check_signal
+        """
+        df = self.df if df is None else df
+        signals = self.strategy.generate_signals(df)
+        if signals is not None:
+            return np.asarray(signals, dtype=np.int8)
+
+        signals = np.zeros(len(df), dtype=np.int8)
+        prev_row = None
+        for i, row in enumerate(df.to_dict('records')):
+            signal = self.strategy.check_signal(row, prev_row)
+            if signal in SIGNAL_CODES:
+                signals[i] = SIGNAL_CODES[signal]
+            prev_row = row
+        return signals
+
+    def _run_numpy(self, signals=None):
+        """
+        与 _run_pandas 语义完全一致 (SL/TP1/TP2/保本/日内风控)，
+        但按连续 NumPy 数组逐 bar 推进，避免 iterrows 为每行构造 Series。
+        signals: 预先算好的信号数组 (流式回测时传入)，默认由 self.df 计算
+        """
+        index = self.df.index
+        n = len(index)
+        if n == 0:
+            return pd.DataFrame(self.equity_curve)
+
+        high = np.ascontiguousarray(self.df['high'].to_numpy(dtype=np.float64)).tolist()
+        low = np.ascontiguousarray(self.df['low'].to_numpy(dtype=np.float64)).tolist()
+        close = np.ascontiguousarray(self.df['close'].to_numpy(dtype=np.float64)).tolist()
+        atr = np.ascontiguousarray(self.df['atr'].to_numpy(dtype=np.float64)).tolist()
+        if signals is None:
+            signals = self.signal_array()
+        signals = signals.tolist()
+        days = index.normalize().asi8.tolist()
+
+        equity = np.empty(n, dtype=np.float64)
+        current_day = None
+
+        for i in range(n):
+            if days[i] != current_day:
+                current_day = days[i]
+                self.check_daily_reset(index[i])
+
+            # Record Equity
+            if self.open_trades:
+                equity[i] = self.capital + self.mark_to_market(close[i])
+            else:
+                equity[i] = self.capital
+
+            # Check Risk Stops (Daily)
+            self.update_risk_stops()
+
+            if self.open_trades:
+                self.manage_open_trades(high[i], low[i], index[i])
+
+            # --- Check Entry Signal ---
+            if signals[i] and self.can_open_trade():
+                self.open_trade(SIGNAL_SIDES[signals[i]], index[i], close[i], atr[i])
+
+        # 权益曲线直接由数组构建 (不再逐行追加 dict)
+        return pd.DataFrame({'time': index, 'equity': equity})
+
+    def _run_kernel(self):
+        """
+        整段交给 backtest_kernel 内核模拟，再还原为 Trade 对象 (供 get_stats / 报告使用)
+        """
+        result = backtest_kernel.simulate_trades(self.df, self.signal_array(), self.config)
+        self.capital = result['final_capital']
+
+        for rec in result['trades'].to_dict('records'):
+            t = Trade(rec['entry_time'], rec['entry_price'], rec['sl_price'], rec['size'], self.config.SL_PCT,
+                      side=rec['side'], cfg=self.config)
+            t.tp1_price = rec['tp1_price']
+            t.tp2_price = rec['tp2_price']
+            t.tp1_filled = rec['tp1_filled']
+            t.pnl = rec['pnl']
+            t.exit_price = None if pd.isna(rec['exit_price']) else rec['exit_price']
+
+            if rec['status'] == 'CLOSED':
+                t.status = 'CLOSED'
+                t.exit_time = rec['exit_time']
+                t.exit_reason = rec['exit_reason']
+                self.trades.append(t)
+            else:
+                self.open_trades.append(t)
+
+        return result['equity']
+
     def get_stats(self):
         if not self.trades:
             return {
@@ -0,0 +1,194 @@
+# bar_cache.py
+"""
+本地 K 线列式缓存 (Parquet)
+
+ClickHouse 聚合出来的 K 线按 (源表, 周期, 月份) 分区保存:
+    BAR_CACHE_DIR/<table>/<timeframe>/<YYYY-MM>.parquet
+
+回测请求某个日期区间时，只向 ClickHouse 查询缓存中缺失的月份，
+已完整的历史月份直接从本地读取。当前未结束的月份不会落盘 (数据仍在增长)。
+
+已结束但 ClickHouse 中数据不完整的月份 (日线下载脚本滞后、按月导入中断在 partial 状态)
+同样不会落盘: 只有最后一根 K 线距月末不超过 COMPLETE_TOLERANCE 的月份才写入缓存；
+读取缓存时也做同样的检查 (旧版本写入的截断月份会被重新查询并覆盖)。
+月中缺失的数据 (月末完整) 无法由此发现，补录后需 clear / refresh 对应月份。
+
+命令行:
+    python src/bar_cache.py info
+    python src/bar_cache.py clear [--timeframe 5m] [--month 2024-01]
+    python src/bar_cache.py refresh --start 2024-01-01 --end 2024-03-01
+"""
+import argparse
+import os
+import shutil
+
+import pandas as pd
+
+import config
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+# 最后一根 K 线的起始时间距月末不超过该值才认为整月已入库 (>= 最大周期 1h，容忍月末极短的停盘)
+COMPLETE_TOLERANCE = pd.Timedelta(hours=1)
+
+try:
+    import pyarrow  # noqa: F401 (Parquet 引擎)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+def cache_enabled():
+    return config.BAR_CACHE_ENABLED and PARQUET_AVAILABLE
+
+
+def month_starts(start, end):
+    """覆盖 [start, end] 的所有月份起点"""
+    first = pd.Timestamp(start).to_period('M').to_timestamp()
+    last = pd.Timestamp(end).to_period('M').to_timestamp()
+    return list(pd.date_range(first, last, freq='MS'))
+
+
+def month_path(table, timeframe, month, cache_dir=None):
+    cache_dir = cache_dir or config.BAR_CACHE_DIR
+    return os.path.join(cache_dir, table, timeframe, f"{month:%Y-%m}.parquet")
+
+
+def is_complete_month(month, now=None):
+    """该月是否已经结束 (只有结束的月份才会写入缓存)"""
+    now = pd.Timestamp(now) if now is not None else pd.Timestamp.now()
+    return month + pd.DateOffset(months=1) <= now
+
+
+def covers_month(df, month):
+    """df 的最后一根 K 线是否已到达该月末 (否则 ClickHouse 中该月数据尚不完整)"""
+    return not df.empty and df.index.max() >= month + pd.DateOffset(months=1) - COMPLETE_TOLERANCE
+
+
+def empty_bars():
+    """与 query_aggregated_data 同结构的空 K 线"""
+    return pd.DataFrame(columns=OHLCV_COLUMNS, dtype=float,
+                        index=pd.DatetimeIndex([], name='timestamp'))
+
+
+def write_month(path, df):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 先写临时文件再原子替换，避免并发回测读到半个文件
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    df.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_bars(timeframe, start, end, fetch, table=None, cache_dir=None, now=None):
+    """
+    读取 [start, end] 区间的 K 线 (按 K 线起始时间闭区间截取)
+    fetch(timeframe, month_start, month_end): 查询 [month_start, month_end) 的聚合 K 线，
+        返回以 timestamp 为索引的 DataFrame
+    """
+    table = table or config.SOURCE_TABLE
+    frames = []
+    fetched = 0
+
+    for month in month_starts(start, end):
+        path = month_path(table, timeframe, month, cache_dir)
+        if os.path.exists(path):
+            df_month = pd.read_parquet(path)
+            if covers_month(df_month, month):
+                frames.append(df_month)
+                continue
+
+        next_month = month + pd.DateOffset(months=1)
+        df_month = fetch(timeframe, month, next_month)
+        fetched += 1
+
+        # 空月份 (尚未入库)、未结束的月份、数据未到月末的月份不缓存，下次重新查询
+        if covers_month(df_month, month) and is_complete_month(month, now):
+            write_month(path, df_month)
+        frames.append(df_month)
+
+    print(f"Bar cache [{table}/{timeframe}]: {len(frames) - fetched} months from cache, {fetched} fetched")
+
+    non_empty = [f for f in frames if not f.empty]
+    if not non_empty:
+        # 区间内没有数据，或 start > end 时没有任何月份
+        return empty_bars()
+
+    df = pd.concat(non_empty)
+    return df.loc[pd.Timestamp(start):pd.Timestamp(end)]
+
+
+def clear(table=None, timeframe=None, month=None, cache_dir=None):
+    """删除缓存 (可按 源表 / 周期 / 月份 缩小范围)，返回删除的文件数"""
+    cache_dir = cache_dir or config.BAR_CACHE_DIR
+    table = table or config.SOURCE_TABLE
+    table_dir = os.path.join(cache_dir, table)
+    if not os.path.isdir(table_dir):
+        return 0
+
+    timeframes = [timeframe] if timeframe else os.listdir(table_dir)
+    removed = 0
+    for tf in timeframes:
+        tf_dir = os.path.join(table_dir, tf)
+        if not os.path.isdir(tf_dir):
+            continue
+        if month:
+            path = os.path.join(tf_dir, f"{month}.parquet")
+            if os.path.exists(path):
+                os.remove(path)
+                removed += 1
+        else:
+            removed += len([f for f in os.listdir(tf_dir) if f.endswith('.parquet')])
+            shutil.rmtree(tf_dir)
+    return removed
+
+
+def info(table=None, cache_dir=None):
+    """{timeframe: [YYYY-MM, ...]}"""
+    cache_dir = cache_dir or config.BAR_CACHE_DIR
+    table = table or config.SOURCE_TABLE
+    table_dir = os.path.join(cache_dir, table)
+    if not os.path.isdir(table_dir):
+        return {}
+    return {
+        tf: sorted(f[:-len('.parquet')] for f in os.listdir(os.path.join(table_dir, tf)) if f.endswith('.parquet'))
+        for tf in sorted(os.listdir(table_dir))
+    }
+
+
+def main():
+    import data_loader
+
+    parser = argparse.ArgumentParser(description="Qtrading local bar cache")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('info', help='List cached months')
+    parser.epilog = ("Only ended months whose last bar reaches month end are cached. "
+                     "Bars backfilled inside an already cached month are not detected: clear or refresh that month.")
+
+    p_clear = sub.add_parser('clear', help='Invalidate cached bars (e.g. after backfilling gaps inside a month)')
+    p_clear.add_argument('--timeframe', type=str, help='Only this timeframe (5m/15m/1h)')
+    p_clear.add_argument('--month', type=str, help='Only this month (YYYY-MM)')
+
+    p_refresh = sub.add_parser('refresh', help='Re-download months in a date range')
+    p_refresh.add_argument('--start', type=str, required=True, help='Start Date (YYYY-MM-DD)')
+    p_refresh.add_argument('--end', type=str, required=True, help='End Date (YYYY-MM-DD)')
+
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print(f"Cache dir: {config.BAR_CACHE_DIR}")
+        for tf, months in info().items():
+            print(f"  {tf}: {len(months)} months ({', '.join(months)})")
+
+    elif args.command == 'clear':
+        removed = clear(timeframe=args.timeframe, month=args.month)
+        print(f"✅ Removed {removed} cached files")
+
+    elif args.command == 'refresh':
+        for month in month_starts(args.start, args.end):
+            clear(month=f"{month:%Y-%m}")
+        data_loader.prepare_strategy_data(args.start, args.end)
+        print(f"✅ Cache refreshed for {args.start} to {args.end}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# candle_store.py
+"""
+实盘 K 线环形缓存
+
+每个周期一块固定容量的 NumPy 环形缓冲区 (timestamp, open, high, low, close, volume)。
+预热时拉取最近 capacity 根，之后只请求 open time >= 最后一根已存 K 线的数据:
+最后一根 (可能未收盘) 原地覆盖，新 K 线追加并挤掉最旧的一根。
+"""
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def parse_klines(raw_klines):
+    """币安原始 K 线 [open_time, open, high, low, close, volume, close_time, ...] -> (n, 6) float 数组"""
+    if not raw_klines:
+        return np.empty((0, len(COLUMNS)))
+    return np.array([k[:6] for k in raw_klines], dtype=float)
+
+
+class CandleStore:
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.buffer = np.empty((capacity, len(COLUMNS)))
+        self.size = 0
+        self.head = 0   # 下一根新 K 线写入的位置
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def last_open_time(self):
+        """最后一根已存 K 线的 open time (毫秒)，空缓存返回 None"""
+        if self.size == 0:
+            return None
+        return int(self.buffer[(self.head - 1) % self.capacity, 0])
+
+    def clear(self):
+        self.size = 0
+        self.head = 0
+
+    def update(self, rows):
+        """
+        合并新拉取的 K 线 (按 open time 升序)
+        与最后一根 open time 相同的行覆盖它，更早的行忽略，更晚的行依次追加
+        Returns: 新增的 K 线根数
+        """
+        added = 0
+        for row in rows:
+            last_ts = self.last_open_time
+            if last_ts is not None and row[0] < last_ts:
+                continue
+            if last_ts is not None and row[0] == last_ts:
+                self.buffer[(self.head - 1) % self.capacity] = row
+                continue
+            self.buffer[self.head] = row
+            self.head = (self.head + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+            added += 1
+        return added
+
+    def sync(self, request, incremental_limit=10):
+        """
+        与交易所同步 (预热或增量)
+        request(limit, start_time=None): 返回原始 K 线列表 (start_time 为空时取最近 limit 根)
+        Returns: 本次发出的请求数
+        """
+        requests_made = 0
+        if self.size > 0:
+            # 增量: 从最后一根 (可能未收盘) 开始取，覆盖它并追加新 K 线
+            rows = parse_klines(request(incremental_limit, self.last_open_time))
+            requests_made += 1
+            if len(rows) >= incremental_limit:
+                # 断档超过一页 (例如网络中断)，整段重新预热
+                self.clear()
+            else:
+                self.update(rows)
+
+        if self.size == 0:
+            self.update(parse_klines(request(self.capacity)))
+            requests_made += 1
+        return requests_made
+
+    def to_array(self):
+        """按时间顺序返回缓存内容的副本"""
+        if self.size < self.capacity:
+            return self.buffer[:self.size].copy()
+        return np.concatenate([self.buffer[self.head:], self.buffer[:self.head]])
+
+    def to_frame(self):
+        """与原 fetch_candles 相同结构的 DataFrame (每次返回新对象，策略可自由添加列)"""
+        df = pd.DataFrame(self.to_array(), columns=COLUMNS)
+        df['timestamp'] = df['timestamp'].astype('int64')
+        df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
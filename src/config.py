@@ -22,6 +22,11 @@ MAX_CONSECUTIVE_LOSS = 4     # 最大连亏次数
 # --- 策略选择 ---
 ACTIVE_STRATEGY = 'TrendMeanReversion'
 
+# --- 回测引擎 ---
+BACKTEST_ENGINE = 'numpy'    # 'numpy' (连续数组, 快速) / 'kernel' (状态机内核, 可选 numba 编译) / 'pandas' (逐行 iterrows, 参考实现)
+STREAM_WARMUP_BARS = 3000    # 流式回测每块前拼接的预热 K 线数 (保证 EMA100 等指标跨月连续)
+PORTFOLIO_SYMBOLS = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT']  # 组合回测默认交易对 (源表: <base>_<quote>_1s)
+
 # --- 策略参数 (优化版: 趋势+震荡回归) ---
 USE_ATR_FOR_SL = True        # 使用 ATR 动态止损
 ATR_PERIOD = 14
@@ -54,6 +59,18 @@ CLICKHOUSE_USER = 'default'
 CLICKHOUSE_PASSWORD = 'uming'
 DB_NAME = 'crypto_data'
 SOURCE_TABLE = 'btc_usdt_1s'
+SOURCE_TABLE_FINAL = False       # 源表为 ReplacingMergeTree (下载脚本 --dedup / --migrate-dedup) 时设为 True: 查询加 FINAL，未合并的重复行不会重复计入成交量
+
+# 实盘记录 (SQLite): 写入进队列，后台线程每 DB_FLUSH_INTERVAL_MS 毫秒合并成一个事务提交
+DB_FLUSH_INTERVAL_MS = 200
+DB_POOL_SIZE = 8                 # 复用的读连接数 (Web 面板并发请求)
+EQUITY_MAX_POINTS = 1000         # Web 面板权益曲线最多返回的点数 (按时间桶降采样)
+SSE_POLL_INTERVAL = 1.0          # Web 面板推送: 检查机器人进程新写入记录的间隔 (秒，仅在有页面连接时查询)
+SSE_KEEPALIVE = 15               # SSE 空闲保活注释的间隔 (秒)
+WEB_SERVER_MODE = 'development'  # 'production': waitress 多线程服务 (python src/web_server.py --prod 同效)
+WEB_THREADS = 128                # 生产模式工作线程数 (每个打开 SSE 推送的页面占用一个)
+WEB_CACHE_TTL = 2.0              # /api/equity、/api/operations 响应缓存时间 (秒，0 为不缓存)
+WEB_GZIP_MIN_SIZE = 1024         # 超过该字节数的 JSON 响应 gzip 压缩 (客户端支持时)
 
 # --- 消息推送设置 ---
 from dotenv import load_dotenv
@@ -67,11 +84,43 @@ NOTIFICATION_CHANNELS = ['bk']  # 可选: 'telegram', 'bk'
 BARK_URL = os.getenv("BARK_URL", "http://192.168.66.10:10009/myhFXFuNtus7kJHQsBWdzi/")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "YOUR_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "YOUR_CHAT_ID")
+NOTIFICATION_QUEUE_SIZE = 100  # 推送队列上限，积压超过时丢弃最旧的消息 (后台线程发送，不阻塞交易)
 
 # --- 实盘交易设置 (危险操作) ---
 REAL_TRADING_ENABLED = False # 设为 True 才会真正下单
 IS_TESTNET = False           # 实盘请设为 False
 
+# 实盘 K 线缓存 (每个周期一块环形缓冲区，预热后只拉取增量)
+LIVE_KLINE_LIMIT = 100               # 每个周期保留的 K 线根数 (传给策略 analyze_live)
+LIVE_FETCH_WORKERS = 4               # 并发拉取 K 线的线程数 (多个周期同时请求)
+LIVE_KLINE_INCREMENTAL_LIMIT = 10    # 增量请求的 limit (<100 时请求权重为 1); 返回满页说明断档，整段重新预热
+
+# 交易对元数据缓存 (精度 / 最小下单量 / 价格步长)，启动时加载，过期后后台刷新
+MARKET_CACHE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data_cache', 'markets.json')
+MARKET_CACHE_TTL = 6 * 60 * 60      # 秒
+
+# 实盘行情来源: 'websocket' (K 线收盘即触发, 断线自动重连 + REST 补齐) / 'rest' (每 5 分钟轮询)
+LIVE_DATA_SOURCE = 'websocket'
+BINANCE_WS_URL = 'wss://fstream.binance.com'                 # 合约行情推送
+BINANCE_TESTNET_WS_URL = 'wss://stream.binancefuture.com'    # 测试网行情推送
+WS_RECONNECT_MAX_DELAY = 60      # 重连退避上限 (秒)
+WS_FALLBACK_GRACE = 15           # 超过 5 分钟 + 该秒数仍无收盘推送时，退回 REST 拉取
+
+# 账户推送 (user data stream, 仅 WebSocket 模式): 成交/持仓变化实时推送，TP1 成交立即推保本
+USER_STREAM_ENABLED = True
+USER_STREAM_KEEPALIVE = 30 * 60              # listenKey 续期间隔 (秒，60 分钟不续期即失效)
+USER_STREAM_RECONCILE_INTERVAL = 30 * 60     # 推送在线时 REST 对账持仓/挂单的间隔 (秒)
+
+# 多交易对实盘 (multi_symbol_bot.py)
+LIVE_SYMBOLS = [
+    'BTC/USDT', 'ETH/USDT', 'BNB/USDT', 'SOL/USDT', 'XRP/USDT',
+    'DOGE/USDT', 'ADA/USDT', 'AVAX/USDT', 'LINK/USDT', 'DOT/USDT',
+    'LTC/USDT', 'BCH/USDT', 'TRX/USDT', 'ATOM/USDT', 'NEAR/USDT',
+    'APT/USDT', 'ARB/USDT', 'OP/USDT', 'FIL/USDT', 'ETC/USDT',
+]
+LIVE_SYMBOL_WORKERS = 16         # 并发评估的线程数
+LIVE_RATE_LIMIT_WEIGHT = 1200    # 每分钟请求权重预算 (币安上限 2400，预留一半给下单与其它进程)
+
 # 币安实盘 API (从环境变量加载)
 BINANCE_API_KEY = os.getenv("BINANCE_API_KEY", "YOUR_REAL_API_KEY")
 BINANCE_SECRET = os.getenv("BINANCE_SECRET", "YOUR_REAL_SECRET")
@@ -82,3 +131,6 @@ BINANCE_SECRET = os.getenv("BINANCE_SECRET", "YOUR_REAL_SECRET")
 PROXY_URL = os.getenv("PROXY_URL", "")  # 设置为空字符串 "" 则不使用代理
 #PROXY_URL = "http://192.168.66.6:19091"
 
+# --- 本地 K 线缓存 (Parquet, 按月分区) ---
+BAR_CACHE_ENABLED = True     # 已结束月份的聚合 K 线缓存到本地，重复回测无需查询 ClickHouse
+BAR_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data_cache')
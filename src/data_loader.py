@@ -1,13 +1,44 @@
 # data_loader.py
+import functools
+
 import clickhouse_connect
 import pandas as pd
 import config
+import bar_cache
+
+def symbol_table(symbol):
+    """交易对 -> ClickHouse 1s 源表名 (与下载脚本一致): 'ETH/USDT' -> 'eth_usdt_1s'"""
+    return f"{symbol.replace('/', '_').lower()}_1s"
+
+def get_aggregated_data(timeframe_str, start_date, end_date, table=None):
+    """
+    获取指定 timeframe 的聚合 K 线
+    启用本地缓存时 (config.BAR_CACHE_ENABLED) 只向 ClickHouse 查询缓存中缺失的月份
+    timeframe_str: '5m', '15m', '1h'
+    table: 源表 (默认 config.SOURCE_TABLE)
+    """
+    table = table or config.SOURCE_TABLE
+    if bar_cache.cache_enabled():
+        return bar_cache.load_bars(timeframe_str, start_date, end_date,
+                                   functools.partial(fetch_month_data, table=table), table=table)
+    return query_aggregated_data(timeframe_str, start_date, end_date, table=table)
+
+def fetch_month_data(timeframe_str, month_start, month_end, table=None):
+    """查询 [month_start, month_end) 区间的完整 K 线 (供 bar_cache 使用)"""
+    return query_aggregated_data(
+        timeframe_str,
+        month_start.strftime('%Y-%m-%d %H:%M:%S'),
+        month_end.strftime('%Y-%m-%d %H:%M:%S'),
+        include_end=False,
+        table=table
+    )
 
-def get_aggregated_data(timeframe_str, start_date, end_date):
+def query_aggregated_data(timeframe_str, start_date, end_date, include_end=True, table=None):
     """
     利用 ClickHouse 聚合 1s 数据到指定 timeframe
     timeframe_str: '5m', '15m', '1h'
     """
+    table = table or config.SOURCE_TABLE
     
     # 将 timeframe 转换为秒数
     tf_map = {'5m': 300, '15m': 900, '1h': 3600}
@@ -16,7 +47,9 @@ def get_aggregated_data(timeframe_str, start_date, end_date):
     if not seconds:
         raise ValueError(f"Unsupported timeframe: {timeframe_str}")
 
-    print(f"Loading and aggregating {timeframe_str} data from ClickHouse...")
+    print(f"Loading and aggregating {timeframe_str} data from ClickHouse [{table}] ({start_date} ~ {end_date})...")
+    end_op = '<=' if include_end else '<'
+    final = ' FINAL' if config.SOURCE_TABLE_FINAL else ''
 
     query = f"""
     SELECT
@@ -26,8 +59,8 @@ def get_aggregated_data(timeframe_str, start_date, end_date):
         min(low) as low,
         argMax(close, open_time) as close,
         sum(volume) as volume
-    FROM {config.DB_NAME}.{config.SOURCE_TABLE}
-    WHERE open_time >= '{start_date}' AND open_time <= '{end_date}'
+    FROM {config.DB_NAME}.{table}{final}
+    WHERE open_time >= '{start_date}' AND open_time {end_op} '{end_date}'
     GROUP BY timestamp
     ORDER BY timestamp ASC
     """
@@ -45,22 +78,38 @@ def get_aggregated_data(timeframe_str, start_date, end_date):
     df.set_index('timestamp', inplace=True)
     return df
 
-def prepare_strategy_data(start_date='2021-01-01', end_date='2021-02-01'):
+# timeframe -> pandas resample 规则
+RESAMPLE_RULES = {'5m': '5min', '15m': '15min', '1h': '1h'}
+
+def resample_ohlcv(df, timeframe_str):
     """
-    拉取 1H, 15m, 5m 数据并对齐到 5m 粒度 (主回测周期)
+    在本地把较小周期 K 线精确合成为大周期 (与 ClickHouse 直接聚合 1s 数据等价):
+    open = 第一根 open, high = max, low = min, close = 最后一根 close, volume = sum
+    没有任何成交数据的区间不产生 K 线 (与 GROUP BY 行为一致)
     """
-    # 1. Fetch Data
-    df_1h = get_aggregated_data('1h', start_date, end_date)
-    df_15m = get_aggregated_data('15m', start_date, end_date)
-    df_5m = get_aggregated_data('5m', start_date, end_date)
+    rule = RESAMPLE_RULES.get(timeframe_str)
+    if not rule:
+        raise ValueError(f"Unsupported timeframe: {timeframe_str}")
 
+    resampled = df.resample(rule, label='left', closed='left')
+    out = resampled.agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+    out = out[resampled['close'].count() > 0]
+    out.index.name = df.index.name
+    return out
+
+def merge_timeframes(df_1h, df_15m, df_5m):
+    """
+    将 1H / 15m 数据对齐到 5m 粒度 (主回测周期)
+    """
     print("Merging dataframes...")
     
-    # 2. Rename columns for merging
+    # 1. Rename columns for merging
+    df_1h = df_1h.copy()
+    df_15m = df_15m.copy()
     df_1h.columns = [f"1h_{col}" for col in df_1h.columns]
     df_15m.columns = [f"15m_{col}" for col in df_15m.columns]
     
-    # 3. Merge:
+    # 2. Merge:
     # 我们以 df_5m 为主轴。
     # 对于 10:05 的 5m K线，我们想知道的是：
     # - 1H 趋势：取 10:00 之前最近的一个已完成的 1H 线 (避免未来函数) 
@@ -97,6 +146,51 @@ def prepare_strategy_data(start_date='2021-01-01', end_date='2021-02-01'):
     print(f"Data prepared. Total bars: {len(df_merged)}")
     return df_merged
 
+def prepare_strategy_data(start_date='2021-01-01', end_date='2021-02-01', table=None):
+    """
+    拉取 1H, 15m, 5m 数据并对齐到 5m 粒度 (主回测周期)
+    只让 ClickHouse 扫描一次 1s 源数据 (聚合为 5m)，15m / 1h 在本地由 5m 精确合成
+    """
+    # 1. Fetch Data (single scan)
+    df_5m = get_aggregated_data('5m', start_date, end_date, table=table)
+    df_15m = resample_ohlcv(df_5m, '15m')
+    df_1h = resample_ohlcv(df_5m, '1h')
+
+    return merge_timeframes(df_1h, df_15m, df_5m)
+
+def iter_portfolio_data(symbols, start_date='2021-01-01', end_date='2021-02-01'):
+    """
+    多交易对组合回测数据: 逐个产出 (symbol, prepare_strategy_data 格式的 DataFrame)
+    每个交易对读取各自的 1s 源表 (symbol_table)，无数据的交易对会被跳过
+    """
+    for symbol in symbols:
+        df = prepare_strategy_data(start_date, end_date, table=symbol_table(symbol))
+        if df.empty:
+            print(f"⚠️ {symbol}: no data, skipped")
+            continue
+        yield symbol, df
+
+def iter_strategy_data(start_date='2021-01-01', end_date='2021-02-01'):
+    """
+    按自然月分块产出与 prepare_strategy_data 相同格式的数据 (流式回测用)
+    15m / 1H 的区间边界都落在月初，每块单独合成与合并的结果和整段加载一致
+    """
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    month = start.to_period('M').to_timestamp()
+
+    while month <= end:
+        next_month = month + pd.DateOffset(months=1)
+        chunk_start = max(start, month)
+        # 区间查询是闭区间，块尾取下个月初前 1 秒，最后一块用原始 end
+        chunk_end = min(end, next_month - pd.Timedelta(seconds=1))
+
+        df_5m = get_aggregated_data('5m', chunk_start.strftime('%Y-%m-%d %H:%M:%S'),
+                                    chunk_end.strftime('%Y-%m-%d %H:%M:%S'))
+        if not df_5m.empty:
+            yield merge_timeframes(resample_ohlcv(df_5m, '1h'), resample_ohlcv(df_5m, '15m'), df_5m)
+        month = next_month
+
 if __name__ == "__main__":
     # Test
     df = prepare_strategy_data('2024-01-01', '2024-01-05')
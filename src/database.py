@@ -2,36 +2,107 @@ import sqlite3
 import datetime
 import os
 import json
+import queue
+import threading
+import time
+import atexit
+import re
+from contextlib import contextmanager
+
+import config
+from event_bus import EventBus
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+BUCKET_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+AUTO_BUCKETS = ['5m', '15m', '1h', '4h', '1d', '1w']
+
+
+def bucket_seconds(bucket):
+    """'15m' -> 900, '1h' -> 3600"""
+    match = re.fullmatch(r'(\d+)([smhdw])', bucket)
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Invalid bucket: {bucket}")
+    return int(match.group(1)) * BUCKET_UNITS[match.group(2)]
+
+
+def choose_bucket(start, end, max_points=1000):
+    """[start, end) 区间 (epoch 秒) 内点数不超过 max_points 的最细粒度"""
+    span = max(end - start, 0)
+    for bucket in AUTO_BUCKETS:
+        if span / bucket_seconds(bucket) <= max_points:
+            return bucket
+    return AUTO_BUCKETS[-1]
+
+
 class DBManager:
-    def __init__(self, env='live'):
+    def __init__(self, env='live', db_file=None, flush_interval=None, pool_size=None):
         self.env = env
         db_name = f'trading_history_{env}.db'
-        self.db_file = os.path.join(BASE_DIR, db_name)
+        self.db_file = db_file or os.path.join(BASE_DIR, db_name)
+        # 写入先进队列，由后台线程每 flush_interval 秒合并成一个事务提交
+        self.flush_interval = config.DB_FLUSH_INTERVAL_MS / 1000 if flush_interval is None else flush_interval
+        # 读连接池: 连接复用，PRAGMA 只在建连时执行一次
+        self._pool = queue.LifoQueue(maxsize=config.DB_POOL_SIZE if pool_size is None else pool_size)
+        self._pending = []
+        self._busy = False
+        self._cond = threading.Condition()
+        self._writer = None
+        # 新记录推送 (Web 面板 SSE): 订阅者从 events 读取，游标记录已推送到的 (权益 rowid, 操作 id)
+        self.events = EventBus()
+        self._cursor = None
+        # 每发布一批新记录加 1: Web 面板的响应缓存以它作为键的一部分，推送后的请求不会命中旧缓存
+        self.generation = 0
+        self._publish_lock = threading.Lock()
+        self._watcher = None
         self.init_db()
 
     def get_connection(self):
-        # Use check_same_thread=False to allow Flask threads to use the connection
-        # Enable WAL mode for better concurrency
-        conn = sqlite3.connect(self.db_file, check_same_thread=False)
-        conn.execute('PRAGMA journal_mode=WAL;')
+        """新建一个已配置好的连接 (一般通过 connection() 从连接池借用)"""
+        # Use check_same_thread=False so pooled connections can move between Flask threads
+        conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=10)
+        conn.execute('PRAGMA synchronous=NORMAL;')  # WAL 下只在 checkpoint 时 fsync
+        conn.execute('PRAGMA busy_timeout=10000;')
         return conn
 
+    @contextmanager
+    def connection(self):
+        """从连接池借用一个连接，用完归还 (事务语义同 sqlite3 的 with conn)"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self.get_connection()
+        try:
+            with conn:
+                yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
     def init_db(self):
-        with self.get_connection() as conn:
+        with self.connection() as conn:
+            # Enable WAL mode for better concurrency (持久化在数据库文件中，设置一次即可)
+            conn.execute('PRAGMA journal_mode=WAL;')
             cursor = conn.cursor()
-            
+
             # Table for Equity Snapshots (Floating PnL)
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS equity_snapshots (
                     timestamp TEXT PRIMARY KEY,
                     total_equity REAL,
-                    unrealized_pnl REAL
+                    unrealized_pnl REAL,
+                    ts INTEGER
                 )
             ''')
-            
+            # 旧库迁移: 补充 epoch 秒列 (timestamp 为本地时间的 ISO 文本)
+            columns = [row[1] for row in cursor.execute('PRAGMA table_info(equity_snapshots)')]
+            if 'ts' not in columns:
+                cursor.execute('ALTER TABLE equity_snapshots ADD COLUMN ts INTEGER')
+                cursor.execute("UPDATE equity_snapshots SET ts = CAST(strftime('%s', timestamp, 'utc') AS INTEGER)")
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_equity_snapshots_ts ON equity_snapshots (ts)')
+
             # Table for Trade Operations (Signals/Orders)
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS trade_operations (
@@ -39,58 +110,222 @@ class DBManager:
                     timestamp TEXT,
                     symbol TEXT,
                     side TEXT,
-                    action TEXT, 
+                    action TEXT,
                     price REAL,
                     quantity REAL,
                     status TEXT,
                     details TEXT
                 )
             ''')
-            conn.commit()
+
+    # --- 批量写入 ---
+
+    def _enqueue(self, sql, params):
+        with self._cond:
+            self._pending.append((sql, params))
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name=f"db-writer-{self.env}", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush, 5)
+            self._cond.notify()
+
+    def _write_loop(self):
+        conn = self.get_connection()
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # 攒一个周期的写入，合并成一个事务
+            time.sleep(self.flush_interval)
+            with self._cond:
+                batch, self._pending = self._pending, []
+                self._busy = True
+            try:
+                self._write_batch(conn, batch)
+                if len(self.events):
+                    self.publish_changes()
+            except Exception as e:
+                print(f"DB Error (writer): {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    @staticmethod
+    def _write_batch(conn, batch):
+        with conn:
+            start = 0
+            # 相邻的同类语句合并为一次 executemany
+            while start < len(batch):
+                sql = batch[start][0]
+                end = start
+                while end < len(batch) and batch[end][0] == sql:
+                    end += 1
+                conn.executemany(sql, [params for _, params in batch[start:end]])
+                start = end
+
+    def flush(self, timeout=None):
+        """等待已入队的写入全部提交，返回是否已完成"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    # --- 新记录推送 ---
+
+    def subscribe(self):
+        """订阅新增的权益快照 ('equity') 与操作记录 ('operation')，用完需 events.unsubscribe"""
+        with self._publish_lock:
+            if not len(self.events):
+                # 第一个订阅者: 从当前位置开始推送，不补发历史
+                with self.connection() as conn:
+                    self._cursor = self._latest_ids(conn)
+            return self.events.subscribe()
+
+    @staticmethod
+    def _latest_ids(conn):
+        equity_id, op_id = conn.execute('SELECT (SELECT MAX(rowid) FROM equity_snapshots), '
+                                        '(SELECT MAX(id) FROM trade_operations)').fetchone()
+        return equity_id or 0, op_id or 0
+
+    def publish_changes(self):
+        """
+        把游标之后新增的记录发布到 events
+        同进程写入时由写入线程在每批提交后调用；机器人在另一个进程时由 watch() 定时调用
+        Returns: 发布的事件数
+        """
+        with self._publish_lock, self.connection() as conn:
+            equity_id, op_id = self._latest_ids(conn)
+            if self._cursor is None:
+                self._cursor = (equity_id, op_id)
+                return 0
+
+            last_equity_id, last_op_id = self._cursor
+            if (equity_id, op_id) != self._cursor:
+                self.generation += 1
+            published = 0
+            if equity_id > last_equity_id:
+                for timestamp, equity, ts in conn.execute(
+                        'SELECT timestamp, total_equity, ts FROM equity_snapshots WHERE rowid > ? ORDER BY rowid',
+                        (last_equity_id,)):
+                    self.events.publish('equity', {'timestamp': timestamp, 'equity': equity, 'ts': ts})
+                    published += 1
+            if op_id > last_op_id:
+                cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
+                for row in cursor.execute('SELECT * FROM trade_operations WHERE id > ? ORDER BY id', (last_op_id,)):
+                    self.events.publish('operation', dict(row))
+                    published += 1
+            self._cursor = (equity_id, op_id)
+            return published
+
+    def watch(self, interval=1.0):
+        """启动后台线程，每 interval 秒检查一次其它进程写入的新记录 (仅在有订阅者时查询)"""
+        with self._publish_lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch_loop, args=(interval,),
+                                             name=f"db-watcher-{self.env}", daemon=True)
+            self._watcher.start()
+
+    def _watch_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            if len(self.events):
+                try:
+                    self.publish_changes()
+                except sqlite3.Error as e:
+                    print(f"DB Error (watch): {e}")
 
     def log_equity(self, equity, unrealized=0.0):
-        try:
-            with self.get_connection() as conn:
-                timestamp = datetime.datetime.now().isoformat()
-                conn.execute(
-                    'INSERT INTO equity_snapshots (timestamp, total_equity, unrealized_pnl) VALUES (?, ?, ?)',
-                    (timestamp, equity, unrealized)
-                )
-                conn.commit()
-        except Exception as e:
-            print(f"DB Error (log_equity): {e}")
+        now = time.time()
+        timestamp = datetime.datetime.fromtimestamp(now).isoformat()
+        self._enqueue(
+            'INSERT OR REPLACE INTO equity_snapshots (timestamp, total_equity, unrealized_pnl, ts) VALUES (?, ?, ?, ?)',
+            (timestamp, equity, unrealized, int(now))
+        )
 
     def log_operation(self, symbol, side, action, price, quantity, status="FILLED", details=""):
-        try:
-            with self.get_connection() as conn:
-                timestamp = datetime.datetime.now().isoformat()
-                conn.execute(
-                    '''INSERT INTO trade_operations 
-                       (timestamp, symbol, side, action, price, quantity, status, details) 
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
-                    (timestamp, symbol, side, action, price, quantity, status, str(details))
-                )
-                conn.commit()
-        except Exception as e:
-            print(f"DB Error (log_operation): {e}")
+        timestamp = datetime.datetime.now().isoformat()
+        self._enqueue(
+            '''INSERT INTO trade_operations
+               (timestamp, symbol, side, action, price, quantity, status, details)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+            (timestamp, symbol, side, action, price, quantity, status, str(details))
+        )
 
-    def get_equity_history(self, limit=1000):
-        with self.get_connection() as conn:
+    def get_equity_history(self, start=None, end=None, bucket=None, limit=1000):
+        """
+        权益曲线 (按时间升序)，start / end 为 epoch 秒 (区间 [start, end)，None 表示不限)
+        bucket=None: 区间内最近 limit 条原始记录 [(timestamp, total_equity), ...]
+        bucket='1h' 等: 在 SQL 中按桶聚合 [(bucket_ts, min_equity, max_equity, last_equity), ...]
+        """
+        start = 0 if start is None else int(start)
+        end = 2 ** 62 if end is None else int(end)
+        with self.connection() as conn:
             cursor = conn.cursor()
             try:
-                cursor.execute('SELECT timestamp, total_equity FROM equity_snapshots ORDER BY timestamp DESC LIMIT ?', (limit,))
-                rows = cursor.fetchall()
-                # Return reversed (chronological order)
-                return rows[::-1]
+                if bucket is None:
+                    cursor.execute(
+                        'SELECT timestamp, total_equity FROM equity_snapshots WHERE ts >= ? AND ts < ? '
+                        'ORDER BY ts DESC LIMIT ?', (start, end, limit))
+                    rows = cursor.fetchall()
+                    # Return reversed (chronological order)
+                    return rows[::-1]
+
+                size = bucket_seconds(bucket)
+                cursor.execute('''
+                    WITH buckets AS (
+                        SELECT ts / :size AS k, MIN(total_equity) AS lo, MAX(total_equity) AS hi, MAX(ts) AS last_ts
+                        FROM equity_snapshots
+                        WHERE ts >= :start AND ts < :end
+                        GROUP BY k
+                    )
+                    SELECT k * :size, lo, hi,
+                           (SELECT total_equity FROM equity_snapshots
+                            WHERE ts = buckets.last_ts ORDER BY timestamp DESC LIMIT 1)
+                    FROM buckets ORDER BY k
+                ''', {'size': size, 'start': start, 'end': end})
+                return cursor.fetchall()
             except sqlite3.OperationalError:
                 return []
 
-    def get_recent_operations(self, limit=50):
-        with self.get_connection() as conn:
-            conn.row_factory = sqlite3.Row
+    def get_equity_range(self):
+        """Returns: (最早, 最晚) 快照的 epoch 秒，空表为 (None, None)"""
+        with self.connection() as conn:
+            # 分成两个子查询，各自走索引 (同一查询里同时取 MIN/MAX 会全表扫描)
+            return conn.execute('SELECT (SELECT MIN(ts) FROM equity_snapshots), '
+                                '(SELECT MAX(ts) FROM equity_snapshots)').fetchone()
+
+    def get_equity_version(self):
+        """
+        权益表的数据版本 (用于 ETag)，只读索引，不扫描数据
+        Returns: (最大 rowid, 最晚快照的 epoch 秒)，空表为 (None, None)
+        """
+        with self.connection() as conn:
+            return conn.execute('SELECT (SELECT MAX(rowid) FROM equity_snapshots), '
+                                '(SELECT MAX(ts) FROM equity_snapshots)').fetchone()
+
+    def get_operations_version(self):
+        """操作记录的最大 id (用于 ETag 与增量游标)，空表为 None"""
+        with self.connection() as conn:
+            return conn.execute('SELECT MAX(id) FROM trade_operations').fetchone()[0]
+
+    def get_recent_operations(self, limit=50, after_id=None):
+        """最近的操作记录 (id 降序)；after_id 不为空时只返回 id 更大的记录"""
+        with self.connection() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row  # 只作用于该游标，不影响池中连接
             try:
-                cursor.execute('SELECT * FROM trade_operations ORDER BY id DESC LIMIT ?', (limit,))
+                if after_id is None:
+                    cursor.execute('SELECT * FROM trade_operations ORDER BY id DESC LIMIT ?', (limit,))
+                else:
+                    cursor.execute('SELECT * FROM trade_operations WHERE id > ? ORDER BY id DESC LIMIT ?',
+                                   (after_id, limit))
                 return [dict(row) for row in cursor.fetchall()]
             except sqlite3.OperationalError:
                 return []
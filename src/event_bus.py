@@ -0,0 +1,56 @@
+# event_bus.py
+"""
+进程内发布/订阅 (Web 面板 SSE 推送用)
+
+发布方 (DBManager) 每条新记录 publish 一次，事件复制到每个订阅者自己的有界队列；
+订阅者 (SSE 连接) 消费太慢导致队列写满时，清空其队列并只留一条 reset 事件，让客户端重新全量加载。
+"""
+import queue
+import threading
+
+
+class Subscription:
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout=None):
+        """Returns: (event, data)，超时抛出 queue.Empty"""
+        return self.queue.get(timeout=timeout)
+
+    def put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # 积压过多: 丢弃未读事件，通知客户端重新拉取
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.queue.put_nowait(('reset', {}))
+
+
+class EventBus:
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        subscription = Subscription(self.maxsize)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put((event, data))
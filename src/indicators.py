@@ -1,3 +1,8 @@
+import copy
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+
 import pandas as pd
 
 def calculate_ema(series, span):
@@ -28,3 +33,133 @@ def calculate_bollinger_bands(series, period=20, std_dev=2):
     upper = sma + (std * std_dev)
     lower = sma - (std * std_dev)
     return upper, lower
+
+
+# --- 增量 (流式) 指标: 每根新 K 线 O(1) 更新，结果与上面的批量函数一致 ---
+
+
+class StreamingIndicator(ABC):
+    """流式指标基类: update() 写入一根已收盘 K 线；peek() 试算但不改变状态 (用于未收盘 K 线)"""
+
+    @abstractmethod
+    def update(self, *args):
+        """写入一根 K 线并返回最新指标值"""
+        pass
+
+    def peek(self, *args):
+        return copy.deepcopy(self).update(*args)
+
+
+class StreamingEMA(StreamingIndicator):
+    """对应 calculate_ema (ewm adjust=False)"""
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = float('nan')
+
+    def update(self, x):
+        if math.isnan(self.value):
+            self.value = float(x)
+        else:
+            self.value = (1.0 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+
+class StreamingRollingStats(StreamingIndicator):
+    """
+    滑动窗口均值 / 样本标准差 (ddof=1)，窗口未满时返回 NaN
+    使用滑动 Welford 更新，避免 sum(x^2) 的大数相消误差；
+    窗口内全部相同 (横盘 / 无涨跌) 时与 pandas 一样直接返回精确值，不留浮点残差
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.same_count = 0
+
+    def update(self, x):
+        x = float(x)
+        if self.values and x == self.values[-1]:
+            self.same_count += 1
+        else:
+            self.same_count = 1
+        if len(self.values) < self.window:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.values.popleft()
+            self.values.append(x)
+            old_mean = self.mean
+            self.mean += (x - old) / self.window
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+        return self.current()
+
+    def current(self):
+        if len(self.values) < self.window:
+            return float('nan'), float('nan')
+        if self.same_count >= self.window:
+            return self.values[-1], 0.0
+        std = math.sqrt(max(self.m2, 0.0) / (self.window - 1)) if self.window > 1 else float('nan')
+        return self.mean, std
+
+
+class StreamingSMA(StreamingRollingStats):
+    """对应 series.rolling(window).mean()"""
+
+    def update(self, x):
+        return super().update(x)[0]
+
+
+class StreamingRSI(StreamingIndicator):
+    """对应 calculate_rsi (涨跌幅的简单滑动平均，非 Wilder 平滑)"""
+
+    def __init__(self, period=14):
+        self.gain = StreamingSMA(period)
+        self.loss = StreamingSMA(period)
+        self.prev_close = None
+
+    def update(self, close):
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+        avg_gain = self.gain.update(max(delta, 0.0))
+        avg_loss = self.loss.update(max(-delta, 0.0))
+
+        if math.isnan(avg_gain) or math.isnan(avg_loss):
+            return float('nan')
+        if avg_loss == 0:
+            # 与 pandas 一致: x/0 = inf -> RSI 100; 0/0 = NaN
+            return 100.0 if avg_gain > 0 else float('nan')
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+class StreamingATR(StreamingIndicator):
+    """对应 calculate_atr (真实波幅的简单滑动平均)"""
+
+    def __init__(self, period=14):
+        self.tr = StreamingSMA(period)
+        self.prev_close = None
+
+    def update(self, high, low, close):
+        if self.prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        return self.tr.update(true_range)
+
+
+class StreamingBollingerBands(StreamingIndicator):
+    """对应 calculate_bollinger_bands, 返回 (upper, lower)"""
+
+    def __init__(self, period=20, std_dev=2):
+        self.stats = StreamingRollingStats(period)
+        self.std_dev = std_dev
+
+    def update(self, x):
+        sma, std = self.stats.update(x)
+        return sma + (std * self.std_dev), sma - (std * self.std_dev)
@@ -5,8 +5,10 @@ import time
 from datetime import datetime, timedelta
 import sys
 import os
-import requests
+import asyncio
 import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from logging.handlers import TimedRotatingFileHandler
 
 # Ensure we can import from src
@@ -14,6 +16,11 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 import config
 from strategy_factory import get_strategy
+from candle_store import CandleStore
+from market_stream import MarketDataFeed
+from market_metadata import MarketMetadata
+from notifier import Notifier
+from user_stream import OrderBook, UserDataStream
 from database import db_live
 
 # --- Logging Setup ---
@@ -36,9 +43,9 @@ logger.addHandler(file_handler)
 logger.addHandler(console_handler)
 
 class LiveBot:
-    def __init__(self):
+    def __init__(self, symbol='BTC/USDT'):
         self.db = db_live # Default to live DB
-        self.strategy = get_strategy(config.ACTIVE_STRATEGY)
+        self.notifier = Notifier().start()
         
         # 1. Exchange Configuration
         self.api_ready = False
@@ -108,9 +115,12 @@ class LiveBot:
             mode_str = "实盘 (Mainnet)"
             logger.warning(f"🚨 运行模式: {mode_str}")
             
-        self.symbol = 'BTC/USDT'
-        self.risk_pct = config.RISK_PER_TRADE_PCT
-        self.sl_pct = config.SL_PCT
+        # 交易对精度信息: 启动时从本地缓存加载 (过期才请求 exchangeInfo)，之后后台定期刷新
+        self.market_meta = MarketMetadata(self.exchange)
+        self.market_meta.load()
+        self.market_meta.start()
+        self.fetch_pool = ThreadPoolExecutor(max_workers=config.LIVE_FETCH_WORKERS)
+        self._init_symbol_state(symbol)
         
         # 3. Initial Balance Check
         if self.check_connection():
@@ -150,6 +160,36 @@ class LiveBot:
             self.send_notification("Qtrading 启动失败", "无法连接交易所 API，正在重试...")
             self.capital = config.INITIAL_CAPITAL
 
+    def _init_symbol_state(self, symbol):
+        """单个交易对的状态 (LiveBot 与多交易对引擎的 SymbolTrader 共用)"""
+        self.symbol = symbol
+        self.strategy = get_strategy(config.ACTIVE_STRATEGY)
+        self.candle_stores = {}  # {timeframe: CandleStore}
+        self.fetch_timings = {}  # {timeframe: 最近一次拉取耗时 (ms)}
+        # 账户推送维护的持仓/挂单簿 (WebSocket 模式下启用)，REST 仅做低频对账
+        self.order_book = OrderBook()
+        self.user_stream = None
+        self.last_reconcile = 0.0
+        self.risk_pct = config.RISK_PER_TRADE_PCT
+        self.sl_pct = config.SL_PCT
+
+    def _share_account(self, account):
+        """复用另一个 LiveBot 的账户级资源 (交易所会话、精度信息、记录库、推送、拉取线程池)"""
+        self.exchange = account.exchange
+        self.market_meta = account.market_meta
+        self.api_ready = account.api_ready
+        self.db = account.db
+        self.notifier = account.notifier
+        self.fetch_pool = account.fetch_pool
+
+    @property
+    def base_asset(self):
+        return self.symbol.split('/')[0]
+
+    @property
+    def market_id(self):
+        return self.symbol.replace('/', '')
+
     def check_connection(self):
         try:
             self.exchange.fetch_time()
@@ -159,72 +199,65 @@ class LiveBot:
             return False
         
     def send_notification(self, title, message):
+        """入队后立即返回，由 Notifier 后台线程发送 (推送服务器慢或不可用时不拖慢交易流程)"""
         if not config.NOTIFICATION_ENABLED:
             return
-
-        channels = config.NOTIFICATION_CHANNELS
-        if isinstance(channels, str):
-            channels = [channels]
-
-        if 'bk' in channels and config.BARK_URL:
-            try:
-                base_url = config.BARK_URL.rstrip('/')
-                url = f"{base_url}/{title}/{message}"
-                requests.get(url, timeout=5)
-            except Exception as e:
-                logger.error(f"❌ Bark 推送失败: {e}")
-
-        if 'tg' in channels and config.TELEGRAM_BOT_TOKEN and config.TELEGRAM_CHAT_ID:
-            try:
-                tg_url = f"https://api.telegram.org/bot{config.TELEGRAM_BOT_TOKEN}/sendMessage"
-                payload = {
-                    'chat_id': config.TELEGRAM_CHAT_ID,
-                    'text': f"*{title}*\n{message}",
-                    'parse_mode': 'Markdown'
-                }
-                requests.post(tg_url, json=payload, timeout=5)
-            except Exception as e:
-                logger.error(f"❌ Telegram 推送失败: {e}")
-
-    def fetch_candles(self, timeframe, limit=100):
-        """Fetch latest candles from Binance (using raw endpoint to avoid CCXT routing issues)"""
+        self.notifier.notify(title, message)
+
+    def fetch_candles(self, timeframe, limit=None):
+        """
+        Fetch latest candles from Binance (using raw endpoint to avoid CCXT routing issues)
+        每个周期维护一块环形缓存: 首次拉取 limit 根预热，之后只请求最后一根已存 K 线之后的数据
+        """
+        limit = limit or config.LIVE_KLINE_LIMIT
+        started = time.perf_counter()
         try:
-            # 使用原生接口 GET /fapi/v1/klines
-            # 必须移除 symbol 中的斜杠
-            market_id = self.symbol.replace('/', '')
-            
-            raw_klines = self.exchange.fapiPublicGetKlines({
-                'symbol': market_id,
-                'interval': timeframe,
-                'limit': limit
-            })
-            
-            # 原始数据: [timestamp, open, high, low, close, volume, close_time, ...]
-            # 我们只需要前6列
-            data = []
-            for k in raw_klines:
-                data.append([
-                    int(k[0]),      # timestamp
-                    float(k[1]),    # open
-                    float(k[2]),    # high
-                    float(k[3]),    # low
-                    float(k[4]),    # close
-                    float(k[5])     # volume
-                ])
-            
-            df = pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
-            return df
+            store = self.candle_stores.get(timeframe)
+            if store is None or store.capacity != limit:
+                store = self.candle_stores[timeframe] = CandleStore(limit)
+
+            request = lambda n, start_time=None: self._request_klines(timeframe, n, start_time)
+            if store.sync(request, config.LIVE_KLINE_INCREMENTAL_LIMIT) > 1:
+                logger.warning(f"⚠️ {timeframe} K线缓存断档，已重新预热 {limit} 根")
+            return store.to_frame()
             
         except Exception as e:
             logger.error(f"❌ 获取 {timeframe} K线失败: {e}")
             return pd.DataFrame()
+        finally:
+            self.fetch_timings[timeframe] = (time.perf_counter() - started) * 1000
+
+    def _request_klines(self, timeframe, limit, start_time=None):
+        # 使用原生接口 GET /fapi/v1/klines
+        # 必须移除 symbol 中的斜杠
+        params = {
+            'symbol': self.symbol.replace('/', ''),
+            'interval': timeframe,
+            'limit': limit
+        }
+        if start_time is not None:
+            params['startTime'] = start_time
+        return self.exchange.fapiPublicGetKlines(params)
+
+    def fetch_timeframes(self, timeframes=('1h', '15m', '5m')):
+        """
+        并发拉取多个周期 (每个请求独立计时)，总耗时约等于最慢的一次往返
+        Returns: {timeframe: DataFrame}
+        """
+        started = time.perf_counter()
+        futures = {tf: self.fetch_pool.submit(self.fetch_candles, tf) for tf in timeframes}
+        frames = {tf: future.result() for tf, future in futures.items()}
+
+        total_ms = (time.perf_counter() - started) * 1000
+        timings = " | ".join(f"{tf} {self.fetch_timings.get(tf, 0):.0f}ms" for tf in timeframes)
+        logger.info(f"⏱ K线拉取: {timings} (总计 {total_ms:.0f}ms)")
+        return frames
 
     def get_latest_indicators(self):
-        df_1h = self.fetch_candles('1h')
-        df_15m = self.fetch_candles('15m')
-        df_5m = self.fetch_candles('5m')
+        frames = self.fetch_timeframes()
+        return self.analyze(frames['1h'], frames['15m'], frames['5m'])
 
+    def analyze(self, df_1h, df_15m, df_5m):
         if df_1h.empty or df_15m.empty or df_5m.empty:
             return None
 
@@ -272,31 +305,16 @@ class LiveBot:
         }
 
     def place_orders(self, side, quantity, price, sl_price, tp1_price, tp2_price):
-        """Execute Real Orders on Binance"""
+        """
+        Execute Real Orders on Binance
+        市价开仓成交后，SL / TP1 / TP2 通过 /fapi/v1/batchOrders 一次提交 (一个往返即全部保护)；
+        逐腿检查结果，失败的腿单独重试，止损始终挂不上时撤销已挂的止盈并市价平仓 (回滚)
+        """
         execution_info = {'success': False}
         try:
-            # 确保交易对信息已加载 (用于精度计算)
-            if not self.exchange.markets:
-                try:
-                    self.exchange.load_markets()
-                except Exception as e:
-                    if config.IS_TESTNET:
-                        logger.warning(f"⚠️ load_markets 失败 ({e})，尝试手动注入 BTC/USDT 精度信息...")
-                        # 手动注入测试网精度
-                        self.exchange.markets = {
-                            self.symbol: {
-                                'id': 'BTCUSDT',
-                                'symbol': self.symbol,
-                                'type': 'future',
-                                'spot': False,
-                                'future': True,
-                                'contract': True,
-                                'precision': {'amount': 3, 'price': 1},
-                                'limits': {'amount': {'min': 0.001, 'max': 1000}, 'price': {'min': 0.1, 'max': 1000000}, 'cost': {'min': 5}}
-                            }
-                        }
-                    else:
-                        raise e
+            # 精度信息在启动时已加载 (见 MarketMetadata)，这里只在缓存缺少该交易对时补拉一次
+            if self.symbol not in self.market_meta:
+                self.market_meta.refresh()
 
             # 格式化精度
             qty_str = self.exchange.amount_to_precision(self.symbol, quantity)
@@ -306,98 +324,66 @@ class LiveBot:
             
             qty_f = float(qty_str)
 
-            logger.info(f"⚡️ 正在下单: {side} {qty_str} BTC @ 市价")
+            logger.info(f"⚡️ 正在下单: {self.symbol} {side} {qty_str} {self.base_asset} @ 市价")
             
             if not self.api_ready:
                 logger.error("❌ 未配置 API Key，无法下单。")
                 return execution_info
 
-            # --- Testnet Specific Logic ---
-            if config.IS_TESTNET:
-                market_id = self.symbol.replace('/', '')
-                side_str = 'BUY' if side == 'LONG' else 'SELL'
-                sl_side_str = 'SELL' if side == 'LONG' else 'BUY'
-                
-                # 1. Entry
-                entry_order = self.exchange.fapiPrivatePostOrder({
-                    'symbol': market_id, 'side': side_str, 'type': 'MARKET', 'quantity': qty_str
-                })
-                logger.info(f"✅ [Testnet] 开仓成功: {entry_order['orderId']}")
-                
-                avg_price = float(entry_order.get('avgPrice', 0.0))
-                if avg_price == 0: avg_price = price
-                
-                # 2. SL
-                self.exchange.fapiPrivatePostOrder({
-                    'symbol': market_id, 'side': sl_side_str, 'type': 'STOP_MARKET',
-                    'stopPrice': sl_price_str, 'closePosition': 'true'
-                })
-                logger.info(f"🛡 [Testnet] 止损已挂单: ${sl_price_str}")
-                
-                # 3. TP
-                qty_tp1 = float(self.exchange.amount_to_precision(self.symbol, qty_f * config.TP1_CLOSE_PCT))
-                qty_tp2 = float(self.exchange.amount_to_precision(self.symbol, qty_f - qty_tp1))
-                
-                if qty_tp1 > 0:
-                    self.exchange.fapiPrivatePostOrder({
-                        'symbol': market_id, 'side': sl_side_str, 'type': 'LIMIT', 'timeInForce': 'GTC',
-                        'quantity': qty_tp1, 'price': tp1_price_str, 'reduceOnly': 'true'
-                    })
-                
-                if qty_tp2 > 0:
-                    self.exchange.fapiPrivatePostOrder({
-                        'symbol': market_id, 'side': sl_side_str, 'type': 'LIMIT', 'timeInForce': 'GTC',
-                        'quantity': qty_tp2, 'price': tp2_price_str, 'reduceOnly': 'true'
-                    })
-                
-                self.db.log_operation(self.symbol, side, 'ENTRY', avg_price, qty_f, 'FILLED')
-                
-                execution_info = {
-                    'success': True,
-                    'avg_price': avg_price,
-                    'qty': qty_f,
-                    'sl_price': float(sl_price_str)
-                }
-                return execution_info
+            market_id = self.symbol.replace('/', '')
+            entry_side = 'BUY' if side == 'LONG' else 'SELL'
+            exit_side = 'SELL' if side == 'LONG' else 'BUY'
 
-            # --- Mainnet Logic ---
-            order_side = 'buy' if side == 'LONG' else 'sell'
-            tp_side = 'sell' if side == 'LONG' else 'buy'
-            sl_side = 'sell' if side == 'LONG' else 'buy'
-            
             # 1. Entry
-            entry_order = self.exchange.create_order(self.symbol, 'market', order_side, qty_f)
-            avg_price = entry_order.get('average', price) 
-            logger.info(f"✅ 开仓成功: {entry_order['id']}")
-            self.db.log_operation(self.symbol, side, 'ENTRY', avg_price, qty_f, 'FILLED')
-            
-            # 2. SL
-            self.exchange.create_order(self.symbol, 'STOP_MARKET', sl_side, qty_f, None, 
-                                     params={'stopPrice': float(sl_price_str), 'reduceOnly': True})
-            logger.info(f"🛡 止损已挂单: ${sl_price_str}")
-            self.db.log_operation(self.symbol, side, 'STOP_LOSS_ORDER', float(sl_price_str), qty_f, 'NEW')
-
-            # 3. TP
-            qty_tp1 = float(self.exchange.amount_to_precision(self.symbol, qty_f * config.TP1_CLOSE_PCT))
-            qty_tp2 = float(self.exchange.amount_to_precision(self.symbol, qty_f - qty_tp1))
+            started = time.perf_counter()
+            entry_order = self.exchange.fapiPrivatePostOrder({
+                'symbol': market_id, 'side': entry_side, 'type': 'MARKET', 'quantity': qty_str,
+                'newOrderRespType': 'RESULT'
+            })
+            filled = time.perf_counter()
+            logger.info(f"✅ 开仓成功: {entry_order['orderId']}")
             
-            if qty_tp1 > 0:
-                self.exchange.create_order(self.symbol, 'limit', tp_side, qty_tp1, float(tp1_price_str), 
-                                         params={'reduceOnly': True})
-                logger.info(f"💰 TP1 已挂单: ${tp1_price_str}")
-                self.db.log_operation(self.symbol, side, 'TP1_ORDER', float(tp1_price_str), qty_tp1, 'NEW')
+            avg_price = float(entry_order.get('avgPrice') or 0.0)
+            if avg_price == 0: avg_price = price
+            self.db.log_operation(self.symbol, side, 'ENTRY', avg_price, qty_f, 'FILLED')
             
-            if qty_tp2 > 0:
-                self.exchange.create_order(self.symbol, 'limit', tp_side, qty_tp2, float(tp2_price_str), 
-                                         params={'reduceOnly': True})
-                logger.info(f"💰 TP2 已挂单: ${tp2_price_str}")
-                self.db.log_operation(self.symbol, side, 'TP2_ORDER', float(tp2_price_str), qty_tp2, 'NEW')
+            # 2. SL + TP1 + TP2 (batchOrders 不支持 closePosition，止损按数量 reduceOnly)
+            qty_tp1_str = self.exchange.amount_to_precision(self.symbol, qty_f * config.TP1_CLOSE_PCT)
+            qty_tp2_str = self.exchange.amount_to_precision(self.symbol, qty_f - float(qty_tp1_str))
+            legs = [('SL', {
+                'symbol': market_id, 'side': exit_side, 'type': 'STOP_MARKET',
+                'stopPrice': sl_price_str, 'quantity': qty_str, 'reduceOnly': 'true'
+            })]
+            for name, leg_qty, leg_price in (('TP1', qty_tp1_str, tp1_price_str), ('TP2', qty_tp2_str, tp2_price_str)):
+                if float(leg_qty) > 0:
+                    legs.append((name, {
+                        'symbol': market_id, 'side': exit_side, 'type': 'LIMIT', 'timeInForce': 'GTC',
+                        'quantity': leg_qty, 'price': leg_price, 'reduceOnly': 'true'
+                    }))
+
+            placed = self.place_protective_orders(side, qty_str, legs)
+            protected = time.perf_counter()
+
+            entry_ms = (filled - started) * 1000
+            protect_ms = (protected - filled) * 1000
+            logger.info(f"⏱ 开仓→全部保护: {entry_ms + protect_ms:.0f}ms (开仓 {entry_ms:.0f}ms + 保护单 {protect_ms:.0f}ms)")
+
+            if placed is None:
+                return {'success': False, 'error': 'stop loss rejected, position rolled back', 'rolled_back': True}
+
+            operations = {'SL': 'STOP_LOSS_ORDER', 'TP1': 'TP1_ORDER', 'TP2': 'TP2_ORDER'}
+            for name, order in legs:
+                if name in placed:
+                    leg_price = float(order.get('stopPrice') or order['price'])
+                    logger.info(f"🛡 {name} 已挂单: ${leg_price}")
+                    self.db.log_operation(self.symbol, side, operations[name], leg_price, float(order['quantity']), 'NEW')
             
             execution_info = {
                 'success': True,
                 'avg_price': avg_price,
                 'qty': qty_f,
-                'sl_price': float(sl_price_str)
+                'sl_price': float(sl_price_str),
+                'protect_latency_ms': entry_ms + protect_ms
             }
             return execution_info
 
@@ -406,6 +392,92 @@ class LiveBot:
             self.db.log_operation(self.symbol, side, 'ERROR', price, quantity, 'FAILED', str(e))
             return {'success': False, 'error': str(e)}
 
+    def place_protective_orders(self, side, qty_str, legs):
+        """
+        一次 batchOrders 请求提交全部保护单，返回 {腿名: 订单回报}；止损最终失败并已回滚时返回 None
+        legs: [(name, 原始下单参数)]，name 为 'SL' / 'TP1' / 'TP2'
+        每腿预先带上本地生成的 newClientOrderId: 批量请求超时/报错时交易所可能已接受部分或全部腿，
+        先按订单号逐腿查询，已存在的视为已挂出，只重试确实不存在的腿
+        """
+        tag = uuid.uuid4().hex[:16]
+        for name, order in legs:
+            order.setdefault('newClientOrderId', f"pb{tag}{name}")
+
+        unconfirmed = set()   # 状态未知 (查询失败) 的腿，回滚时也要按订单号撤销
+        try:
+            response = self.exchange.fapiPrivatePostBatchOrders({'batchOrders': [order for _, order in legs]})
+        except Exception as e:
+            logger.error(f"❌ 批量挂单请求失败 ({e})，按客户端订单号确认各腿状态")
+            response = []
+            for name, order in legs:
+                try:
+                    response.append(self.lookup_order(order))
+                except Exception as lookup_error:
+                    logger.error(f"⚠️ 查询 {name} 失败: {lookup_error}")
+                    unconfirmed.add(name)
+                    response.append(None)
+        response = list(response) + [None] * (len(legs) - len(response))
+
+        # 批量接口按腿返回: 成功为订单回报，失败为 {"code": ..., "msg": ...}
+        placed = {}
+        for (name, order), result in zip(legs, response):
+            if isinstance(result, dict) and 'orderId' in result:
+                placed[name] = result
+                continue
+            reason = result.get('msg') if isinstance(result, dict) else '未提交'
+            logger.warning(f"⚠️ {name} 挂单失败 ({reason})，单独重试...")
+            try:
+                placed[name] = self.exchange.fapiPrivatePostOrder(order)
+                unconfirmed.discard(name)
+            except Exception as e:
+                logger.error(f"❌ {name} 重试失败: {e}")
+
+        if 'SL' not in placed:
+            self.rollback_entry(side, qty_str, legs, placed, unconfirmed)
+            return None
+
+        missing = [name for name, _ in legs if name not in placed]
+        if missing:
+            self.send_notification("⚠️ 止盈挂单失败", f"{self.symbol} {'/'.join(missing)} 未挂上，止损已生效，请人工检查")
+        return placed
+
+    def lookup_order(self, order):
+        """按客户端订单号查询一条挂单，仍有效时返回订单回报，不存在或已失效返回 None (查询本身失败则抛出)"""
+        try:
+            result = self.exchange.fapiPrivateGetOrder({'symbol': order['symbol'],
+                                                        'origClientOrderId': order['newClientOrderId']})
+        except ccxt.OrderNotFound:
+            return None
+        if result.get('status') in ('CANCELED', 'EXPIRED', 'REJECTED'):
+            return None
+        return result
+
+    def rollback_entry(self, side, qty_str, legs, placed, unconfirmed=()):
+        """止损无法挂出: 按客户端订单号撤销已挂/状态未知的保护单并市价平掉刚开的仓位，绝不留下无保护的持仓"""
+        logger.error(f"🚨 止损挂单失败，回滚 {self.symbol} 开仓...")
+        sl_order = legs[0][1]
+        for name, order in legs:
+            if name not in placed and name not in unconfirmed:
+                continue
+            try:
+                self.exchange.fapiPrivateDeleteOrder({'symbol': order['symbol'],
+                                                      'origClientOrderId': order['newClientOrderId']})
+            except Exception as e:
+                logger.error(f"⚠️ 撤销 {name} 失败: {e}")
+
+        try:
+            self.exchange.fapiPrivatePostOrder({
+                'symbol': sl_order['symbol'], 'side': sl_order['side'], 'type': 'MARKET',
+                'quantity': qty_str, 'reduceOnly': 'true'
+            })
+            logger.info("✅ 已市价平仓 (回滚完成)")
+            self.db.log_operation(self.symbol, side, 'ROLLBACK', 0.0, float(qty_str), 'FILLED', 'stop loss rejected')
+            self.send_notification("🚨 开仓已回滚", f"{self.symbol} 止损挂单失败，已撤单并市价平仓")
+        except Exception as e:
+            logger.error(f"❌ 回滚平仓失败: {e}")
+            self.db.log_operation(self.symbol, side, 'ROLLBACK', 0.0, float(qty_str), 'FAILED', str(e))
+            self.send_notification("🚨 持仓无止损保护", f"{self.symbol} 止损挂单与回滚平仓均失败，请立即人工处理！")
+
     def update_balance(self):
         """Update wallet balance for position sizing"""
         if not self.api_ready or not config.REAL_TRADING_ENABLED:
@@ -438,65 +510,107 @@ class LiveBot:
     def get_position_data(self):
         """Helper to get current position data safely for both Testnet and Mainnet"""
         try:
-            if config.IS_TESTNET:
-                # Raw call for Testnet to avoid load_markets issues
-                market_id = self.symbol.replace('/', '')
-                positions = self.exchange.fapiPrivateV2GetPositionRisk({'symbol': market_id})
-                # Result is a list, usually one item for One-Way mode if symbol specified
-                if positions:
-                    p = positions[0]
-                    return {
-                        'symbol': self.symbol,
-                        'contracts': float(p['positionAmt']),
-                        'entryPrice': float(p['entryPrice']),
-                        'side': 'long' if float(p['positionAmt']) > 0 else 'short' # Check logic
-                    }
-                return None
-            else:
-                # Standard CCXT
-                positions = self.exchange.fetch_positions([self.symbol])
-                p = next((p for p in positions if p['symbol'] == self.symbol), None)
-                if p:
-                    return {
-                        'symbol': self.symbol,
-                        'contracts': float(p['contracts']),
-                        'entryPrice': float(p['entryPrice']),
-                        'side': p['side']
-                    }
-                return None
+            return self.fetch_position_data()
         except Exception as e:
             logger.error(f"获取持仓失败: {e}")
             return None
 
+    def fetch_position_data(self):
+        """查询当前持仓 (出错时抛出异常)"""
+        if config.IS_TESTNET:
+            # Raw call for Testnet to avoid load_markets issues
+            market_id = self.symbol.replace('/', '')
+            positions = self.exchange.fapiPrivateV2GetPositionRisk({'symbol': market_id})
+            # Result is a list, usually one item for One-Way mode if symbol specified
+            if positions:
+                p = positions[0]
+                return {
+                    'symbol': self.symbol,
+                    'contracts': float(p['positionAmt']),
+                    'entryPrice': float(p['entryPrice']),
+                    'side': 'long' if float(p['positionAmt']) > 0 else 'short' # Check logic
+                }
+            return None
+        else:
+            # Standard CCXT
+            positions = self.exchange.fetch_positions([self.symbol])
+            p = next((p for p in positions if p['symbol'] == self.symbol), None)
+            if p:
+                return {
+                    'symbol': self.symbol,
+                    'contracts': float(p['contracts']),
+                    'entryPrice': float(p['entryPrice']),
+                    'side': p['side']
+                }
+            return None
+
     def get_open_orders_data(self):
         """Helper to get open orders safely"""
         try:
-            if config.IS_TESTNET:
-                market_id = self.symbol.replace('/', '')
-                raw_orders = self.exchange.fapiPrivateGetOpenOrders({'symbol': market_id})
-                orders = []
-                for o in raw_orders:
-                    orders.append({
-                        'id': str(o['orderId']),
-                        'type': o['type'], # Raw: LIMIT, STOP_MARKET
-                        'stopPrice': float(o.get('stopPrice', 0))
-                    })
-                return orders
-            else:
-                # Standard CCXT
-                return self.exchange.fetch_open_orders(self.symbol)
+            return self.fetch_open_orders_data()
         except Exception as e:
             logger.error(f"获取挂单失败: {e}")
             return []
 
+    def fetch_open_orders_data(self):
+        """查询当前挂单 (出错时抛出异常)"""
+        if config.IS_TESTNET:
+            market_id = self.symbol.replace('/', '')
+            raw_orders = self.exchange.fapiPrivateGetOpenOrders({'symbol': market_id})
+            orders = []
+            for o in raw_orders:
+                orders.append({
+                    'id': str(o['orderId']),
+                    'type': o['type'], # Raw: LIMIT, STOP_MARKET
+                    'stopPrice': float(o.get('stopPrice', 0))
+                })
+            return orders
+        else:
+            # Standard CCXT
+            return self.exchange.fetch_open_orders(self.symbol)
+
+    def reconcile(self):
+        """REST 查询持仓与挂单，覆盖推送维护的持仓/挂单簿 (查询失败时抛出异常，不覆盖)"""
+        position = self.fetch_position_data()
+        open_orders = self.fetch_open_orders_data()
+        self.order_book.reset(self.market_id, position, open_orders)
+        self.last_reconcile = time.time()
+
+    def account_snapshot(self):
+        """
+        当前持仓与挂单: 账户推送在线时读内存 (每 USER_STREAM_RECONCILE_INTERVAL 秒用 REST 对账一次)，
+        否则 (REST 轮询模式 / 推送断线) 直接走 REST
+        """
+        if self.user_stream is None or not self.user_stream.connected:
+            return self.get_position_data(), self.get_open_orders_data()
+
+        if time.time() - self.last_reconcile >= config.USER_STREAM_RECONCILE_INTERVAL:
+            try:
+                self.reconcile()
+            except Exception as e:
+                logger.error(f"❌ 持仓/挂单对账失败，继续使用推送数据: {e}")
+        position, open_orders = self.order_book.snapshot(self.market_id)
+        return (dict(position, symbol=self.symbol) if position else None), open_orders
+
+    def on_user_event(self, event):
+        """
+        应用一条账户推送 (在事件循环中调用，不做阻塞操作)
+        Returns: 是否需要立即巡检 (本交易对的减仓单成交，如 TP1)
+        """
+        order = self.order_book.apply(event)
+        if not order or order['symbol'] != self.market_id or not order['reduceOnly']:
+            return False
+        logger.info(f"📨 推送: {self.symbol} {order['type']} 减仓单成交 {order['filled']} ({order['status']})，立即巡检")
+        return True
+
     def monitor_positions(self):
         """订单巡检：实现推保本逻辑 (Move SL to BE)"""
         if not self.api_ready or not config.REAL_TRADING_ENABLED:
             return
 
         try:
-            # 1. 获取当前持仓
-            position = self.get_position_data()
+            # 1. 获取当前持仓 / 2. 获取当前挂单
+            position, open_orders = self.account_snapshot()
             
             if not position or position['contracts'] == 0:
                 return # 无持仓
@@ -504,9 +618,6 @@ class LiveBot:
             entry_price = position['entryPrice']
             current_qty = abs(position['contracts'])
             side = 'LONG' if position['contracts'] > 0 else 'SHORT' # positionAmt signed
-
-            # 2. 获取当前挂单
-            open_orders = self.get_open_orders_data()
             
             # 分类挂单 (统一转小写进行比较)
             tp_orders = [o for o in open_orders if o['type'].lower() in ['limit', 'take_profit', 'take_profit_market']]
@@ -575,15 +686,18 @@ class LiveBot:
         logger.info(f"🚀 {mode_label} Qtrading 机器人已就绪 | 交易对: {self.symbol}")
         logger.info(f"风险设置: {self.risk_pct*100}% 风险/笔 | 仓位上限: {config.POSITION_SIZE_PCT*100}% 资金/笔")
         logger.info(f"当前策略: {config.ACTIVE_STRATEGY}")
-        logger.info("等待下一个 5分钟K线 收盘...")
 
+        if config.LIVE_DATA_SOURCE == 'websocket':
+            logger.info("📡 行情来源: WebSocket (K线收盘即触发)")
+            asyncio.run(self.run_stream())
+        else:
+            logger.info("等待下一个 5分钟K线 收盘...")
+            self.run_polling()
+
+    def run_polling(self):
         while True:
-            # 1. Update Balance & Log Equity
-            self.update_balance()
-            self.db.log_equity(self.capital)
-            
-            # 2. Monitor Positions (推保本)
-            self.monitor_positions()
+            # 1. Update Balance & Log Equity / 2. Monitor Positions (推保本)
+            self.housekeeping()
 
             # 3. Sync with time
             now = datetime.now()
@@ -595,32 +709,88 @@ class LiveBot:
             time.sleep(sleep_time)
             
             logger.info("正在检查市场...")
+            self.evaluate(self.get_latest_indicators())
+
+    async def run_stream(self):
+        """
+        WebSocket 模式: 5m K线收盘推送 (x=true) 到达即分析；
+        余额/下单等阻塞调用放到单线程池中顺序执行，不阻塞行情接收
+        """
+        executor = ThreadPoolExecutor(max_workers=1)
+        ws_url = config.BINANCE_TESTNET_WS_URL if config.IS_TESTNET else config.BINANCE_WS_URL
+        proxy = config.PROXY_URL.strip() or None
+        feed = MarketDataFeed(
+            self.symbol, self.candle_stores, self.fetch_candles,
+            on_close=lambda frames: executor.submit(self.on_candle_close, frames),
+            url=ws_url, proxy=proxy,
+            max_reconnect_delay=config.WS_RECONNECT_MAX_DELAY
+        )
+        tasks = [feed.run()]
+
+        if self.api_ready and config.REAL_TRADING_ENABLED and config.USER_STREAM_ENABLED:
+            # 账户推送: 成交即更新持仓/挂单簿，减仓单 (TP1) 成交后立即巡检推保本
+            async def on_user_connect(reconnected):
+                # 连接 (或重连) 后先用 REST 对账，补上断线期间错过的推送
+                self.last_reconcile = 0.0
+                executor.submit(self.monitor_positions)
+
+            async def on_user_event(event):
+                if self.on_user_event(event):
+                    executor.submit(self.monitor_positions)
+
+            self.user_stream = UserDataStream(
+                self.exchange, on_user_event, on_user_connect, url=ws_url, proxy=proxy,
+                max_reconnect_delay=config.WS_RECONNECT_MAX_DELAY
+            )
+            tasks.append(self.user_stream.run())
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            executor.shutdown(wait=False)
+
+    def on_candle_close(self, frames):
+        try:
+            self.housekeeping()
+            logger.info("正在检查市场...")
+            self.evaluate(self.analyze(frames['1h'], frames['15m'], frames['5m']))
+        except Exception as e:
+            logger.error(f"❌ 收盘分析出错: {e}")
+
+    def housekeeping(self):
+        # 1. Update Balance & Log Equity
+        self.update_balance()
+        self.db.log_equity(self.capital)
+        
+        # 2. Monitor Positions (推保本)
+        self.monitor_positions()
+
+    def evaluate(self, data):
+        if not data:
+            logger.warning("⚠️ 数据获取失败，将在下一个周期重试。")
+            return
             
-            data = self.get_latest_indicators()
-            if not data:
-                logger.warning("⚠️ 数据获取失败，将在下一个周期重试。")
-                continue
-                
-            # 3. Print Status
-            price = data['price']
-            indicators = data['indicators']
-            signal = data['signal']
-            
-            logger.info(f"  价格: ${price:.2f} | RSI: {indicators['rsi']:.1f} | ATR: {data['atr']:.2f}")
-            logger.info(f"  趋势: {indicators['trend']} (EMA: {indicators['trend_ema']:.2f})")
-            
-            # Check Signal
-            if signal:
-                self.execute_signal(price, signal, data['atr'])
-            else:
-                logger.info("  >> 暂无信号。")
+        # 3. Print Status
+        price = data['price']
+        indicators = data['indicators']
+        signal = data['signal']
+        
+        logger.info(f"  价格: ${price:.2f} | RSI: {indicators['rsi']:.1f} | ATR: {data['atr']:.2f}")
+        logger.info(f"  趋势: {indicators['trend']} (EMA: {indicators['trend_ema']:.2f})")
+        
+        # Check Signal
+        if signal:
+            self.execute_signal(price, signal, data['atr'])
+        else:
+            logger.info("  >> 暂无信号。")
 
     def execute_signal(self, price, side, atr):
+        """执行开仓信号，返回是否成功 (模拟模式视为成功)"""
         side_cn = "做多" if side == 'LONG' else "做空"
         side_emoji = "🟢" if side == 'LONG' else "🔴"
         
         logger.info("="*40)
-        logger.info(f"🚀 {side_cn} 信号触发！")
+        logger.info(f"🚀 {self.symbol} {side_cn} 信号触发！")
         logger.info("="*40)
         
         params = self.calculate_trade_params(price, side, atr)
@@ -629,19 +799,22 @@ class LiveBot:
         logger.info(f"🛑 止损价:   ${params['sl']:,.2f} (ATR动态)")
         logger.info(f"🎯 止盈一:   ${params['tp1']:,.2f} ({config.TP1_RATIO}R)")
         logger.info(f"🎯 止盈二:   ${params['tp2']:,.2f} ({config.TP2_RATIO}R)")
-        logger.info(f"⚖️ 仓位量:   {params['qty']:.5f} BTC")
+        qty_label = f"{params['qty']:.5f} {self.base_asset}"
+        logger.info(f"⚖️ 仓位量:   {qty_label}")
         logger.info(f"💵 总价值:   ${params['qty']*price:,.2f}")
         
         status_msg = "模拟信号"
         mode_tag = "[模拟]"
+        success = True
         
         # Real Execution
         if config.REAL_TRADING_ENABLED:
             mode_tag = "[实盘]"
-            success = self.place_orders(
+            execution = self.place_orders(
                 side, params['qty'], price, 
                 params['sl'], params['tp1'], params['tp2']
             )
+            success = bool(execution.get('success'))
             if success:
                 status_msg = "下单成功 ✅"
             else:
@@ -653,7 +826,7 @@ class LiveBot:
         
         # Enhanced Notification
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        msg_title = f"{side_emoji} {mode_tag} BTC {side_cn} {status_msg}"
+        msg_title = f"{side_emoji} {mode_tag} {self.base_asset} {side_cn} {status_msg}"
         msg_body = (
             f"⏰ 时间: {current_time}\n"
             f"💰 价格: ${price:,.2f}\n"
@@ -665,6 +838,7 @@ class LiveBot:
             f"🤖 策略: {config.ACTIVE_STRATEGY}"
         )
         self.send_notification(msg_title, msg_body)
+        return success
 
 if __name__ == "__main__":
     bot = LiveBot()
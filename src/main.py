@@ -13,6 +13,10 @@ def main():
     parser = argparse.ArgumentParser(description="Qtrading Backtest System")
     parser.add_argument('--start', type=str, default='2021-01-01', help='Start Date (YYYY-MM-DD)')
     parser.add_argument('--end', type=str, default='2021-06-01', help='End Date (YYYY-MM-DD)')
+    parser.add_argument('--engine', type=str, choices=['numpy', 'kernel', 'pandas'], default=config.BACKTEST_ENGINE,
+                        help='Backtest engine: numpy (array based), kernel (numba/NumPy state machine) or pandas (iterrows reference)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream data month by month with bounded memory (numpy engine)')
     args = parser.parse_args()
 
     start_date = args.start
@@ -21,18 +25,28 @@ def main():
     print(f"--- Qtrading Backtest System ---")
     print(f"Strategy: {config.ACTIVE_STRATEGY}")
     print(f"Period: {start_date} to {end_date}")
+    print(f"Engine: {'numpy (streaming)' if args.stream else args.engine}")
     
-    # 2. Data Preparation
-    # This pulls from ClickHouse and merges 1H/15m/5m
-    try:
-        df = data_loader.prepare_strategy_data(start_date, end_date)
-    except Exception as e:
-        print(f"Error loading data: {e}")
-        return
+    if args.stream:
+        # 2/3. Streaming: fetch, merge and backtest one month at a time
+        bt = backtester.Backtester(None)
+        try:
+            equity_df = bt.run_stream(data_loader.iter_strategy_data(start_date, end_date))
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            return
+    else:
+        # 2. Data Preparation
+        # This pulls from ClickHouse and merges 1H/15m/5m
+        try:
+            df = data_loader.prepare_strategy_data(start_date, end_date)
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            return
 
-    # 3. Run Backtest
-    bt = backtester.Backtester(df)
-    equity_df = bt.run()
+        # 3. Run Backtest
+        bt = backtester.Backtester(df)
+        equity_df = bt.run(engine=args.engine)
     
     # 4. Results
     stats = bt.get_stats()
@@ -64,7 +78,10 @@ def main():
         print("Generating HTML report...")
         # (Prepare data)
         temp_equity_df = equity_df.copy().set_index('time')
-        result_df = temp_equity_df.join(df['close'])
+        if 'close' in temp_equity_df:
+            result_df = temp_equity_df  # streaming mode keeps close alongside equity
+        else:
+            result_df = temp_equity_df.join(df['close'])
         
         # Create Figure with Subplots (One for summary, one for chart)
         # We removed the top row 'Indicators' from the Plotly figure because we are using custom HTML cards now.
@@ -0,0 +1,198 @@
+# market_metadata.py
+"""
+合约交易对元数据缓存 (精度 / 最小下单量 / 价格步长)
+
+启动时从本地缓存文件加载 (未过期时不发任何请求)，否则请求一次 GET /fapi/v1/exchangeInfo (权重 1)，
+只保留 USDT 永续合约的精简信息写回缓存文件，并通过 exchange.set_markets 注入 ccxt。
+之后 amount_to_precision / price_to_precision 都是纯内存查表，ccxt 也不会再在下单路径上触发 load_markets。
+后台线程在缓存过期后刷新 (交易所调整精度时无需重启)。
+"""
+import json
+import logging
+import os
+import threading
+import time
+from decimal import Decimal
+
+import config
+
+logger = logging.getLogger("Qtrading_Live")
+
+
+def decimal_places(step):
+    """'0.00100000' -> 3, '1' -> 0 (DECIMAL_PLACES 精度模式下的小数位数)"""
+    step = Decimal(step).normalize()
+    return max(-step.as_tuple().exponent, 0)
+
+
+def parse_exchange_info(info):
+    """
+    exchangeInfo -> {symbol: 精简元数据}，symbol 为 'BTC/USDT' 形式 (与 config.LIVE_SYMBOLS 一致)
+    """
+    table = {}
+    for s in info.get('symbols', []):
+        if s.get('contractType') != 'PERPETUAL' or s.get('status') != 'TRADING':
+            continue
+        filters = {f['filterType']: f for f in s.get('filters', [])}
+        price_filter = filters.get('PRICE_FILTER', {})
+        lot_size = filters.get('LOT_SIZE', {})
+        tick_size = price_filter.get('tickSize', '0.01')
+        step_size = lot_size.get('stepSize', '0.001')
+        table[f"{s['baseAsset']}/{s['quoteAsset']}"] = {
+            'id': s['symbol'],
+            'base': s['baseAsset'],
+            'quote': s['quoteAsset'],
+            'settle': s.get('marginAsset', s['quoteAsset']),
+            'tick_size': float(tick_size),
+            'step_size': float(step_size),
+            'price_precision': decimal_places(tick_size),
+            'amount_precision': decimal_places(step_size),
+            'min_qty': float(lot_size.get('minQty', step_size)),
+            'max_qty': float(lot_size['maxQty']) if 'maxQty' in lot_size else None,
+            'min_price': float(price_filter['minPrice']) if 'minPrice' in price_filter else None,
+            'max_price': float(price_filter['maxPrice']) if 'maxPrice' in price_filter else None,
+            'min_notional': float(filters.get('MIN_NOTIONAL', {}).get('notional', 0)) or None,
+        }
+    return table
+
+
+def market_structure(symbol, meta):
+    """精简元数据 -> ccxt 统一 market 结构 (线性永续合约)"""
+    return {
+        'id': meta['id'],
+        'symbol': f"{symbol}:{meta['settle']}",
+        'base': meta['base'],
+        'quote': meta['quote'],
+        'settle': meta['settle'],
+        'baseId': meta['base'],
+        'quoteId': meta['quote'],
+        'settleId': meta['settle'],
+        'type': 'swap',
+        'spot': False,
+        'margin': False,
+        'swap': True,
+        'future': False,
+        'option': False,
+        'contract': True,
+        'linear': True,
+        'inverse': False,
+        'contractSize': 1,
+        'active': True,
+        'precision': {'amount': meta['amount_precision'], 'price': meta['price_precision']},
+        'limits': {
+            'amount': {'min': meta['min_qty'], 'max': meta['max_qty']},
+            'price': {'min': meta['min_price'], 'max': meta['max_price']},
+            'cost': {'min': meta['min_notional'], 'max': None},
+            'leverage': {'min': None, 'max': None},
+        },
+        'info': {'symbol': meta['id']},
+    }
+
+
+class MarketMetadata:
+    def __init__(self, exchange, path=None, ttl=None, clock=time.time):
+        self.exchange = exchange
+        self.path = path or config.MARKET_CACHE_FILE
+        self.ttl = config.MARKET_CACHE_TTL if ttl is None else ttl
+        self.clock = clock
+        self.table = {}
+        self.fetched_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __contains__(self, symbol):
+        return symbol in self.table
+
+    def get(self, symbol):
+        return self.table.get(symbol)
+
+    @property
+    def expired(self):
+        return self.fetched_at is None or self.clock() - self.fetched_at >= self.ttl
+
+    def read_cache(self):
+        """Returns: (fetched_at, table)，文件不存在或损坏时返回 (None, {})"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            return cached['fetched_at'], cached['markets']
+        except (OSError, ValueError, KeyError):
+            return None, {}
+
+    def write_cache(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 先写临时文件再替换，避免进程中断留下半个文件
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': self.fetched_at, 'markets': self.table}, f)
+        os.replace(tmp_path, self.path)
+
+    def install(self, fetched_at, table):
+        with self._lock:
+            self.fetched_at = fetched_at
+            self.table = table
+            self.exchange.set_markets([market_structure(symbol, meta) for symbol, meta in table.items()])
+
+    def refresh(self):
+        """请求 exchangeInfo，更新内存表与缓存文件"""
+        started = time.perf_counter()
+        table = parse_exchange_info(self.exchange.fapiPublicGetExchangeInfo())
+        if not table:
+            raise ValueError("exchangeInfo 中没有可交易的永续合约")
+        self.install(self.clock(), table)
+        try:
+            self.write_cache()
+        except OSError as e:
+            logger.warning(f"⚠️ 交易对缓存写入失败: {e}")
+        logger.info(f"📘 交易对元数据已刷新: {len(table)} 个合约 ({(time.perf_counter() - started) * 1000:.0f}ms)")
+
+    def load(self):
+        """
+        启动时调用: 优先使用未过期的缓存文件，否则请求交易所；请求失败时退回过期缓存
+        Returns: 是否已有可用的元数据
+        """
+        fetched_at, table = self.read_cache()
+        if table:
+            self.install(fetched_at, table)
+            if not self.expired:
+                logger.info(f"📘 已从缓存加载 {len(table)} 个合约的精度信息")
+                return True
+
+        try:
+            self.refresh()
+        except Exception as e:
+            if not self.table:
+                logger.error(f"❌ 交易对元数据加载失败: {e}")
+                return False
+            logger.warning(f"⚠️ 交易对元数据刷新失败 ({e})，继续使用过期缓存")
+        return True
+
+    def start(self, retry_interval=60):
+        """启动后台刷新线程 (daemon)，缓存过期后刷新，失败时每 retry_interval 秒重试"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, args=(retry_interval,),
+                                        name="market-metadata", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _refresh_loop(self, retry_interval):
+        while True:
+            wait = retry_interval if self.fetched_at is None else max(self.fetched_at + self.ttl - self.clock(), 0)
+            if self._stop.wait(wait):
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"⚠️ 交易对元数据后台刷新失败: {e}")
+                if self._stop.wait(retry_interval):
+                    return
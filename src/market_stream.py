@@ -0,0 +1,173 @@
+# market_stream.py
+"""
+实盘行情 WebSocket 推送 (币安合约 kline stream)
+
+KlineStream:   订阅 <symbol>@kline_<tf> 组合流，断线后指数退避自动重连
+MarketDataFeed: 把推送写入各周期的 CandleStore；首次连接/重连/推送断档时用 REST 补齐；
+                主周期 (默认 5m) K 线收盘 (x=true) 时立即回调，
+                若 WebSocket 长时间没有收盘推送，则退回 REST 拉取兜底。
+"""
+import asyncio
+import json
+import logging
+import time
+
+import aiohttp
+import numpy as np
+
+import config
+
+logger = logging.getLogger("Qtrading_Live")
+
+TIMEFRAME_MS = {
+    '1m': 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+}
+
+
+def stream_url(base_url, symbol, timeframes):
+    market_id = symbol.replace('/', '').lower()
+    streams = '/'.join(f"{market_id}@kline_{tf}" for tf in timeframes)
+    return f"{base_url.rstrip('/')}/stream?streams={streams}"
+
+
+def parse_kline_message(message):
+    """
+    组合流消息 {"stream": ..., "data": {"e": "kline", "k": {...}}}
+    Returns: (timeframe, row, closed)，row 与 candle_store.parse_klines 的列一致；非 K 线消息返回 None
+    """
+    data = message.get('data', message)
+    if data.get('e') != 'kline':
+        return None
+    k = data['k']
+    row = np.array([k['t'], k['o'], k['h'], k['l'], k['c'], k['v']], dtype=float)
+    return k['i'], row, bool(k['x'])
+
+
+class KlineStream:
+    def __init__(self, symbol, timeframes, on_kline, on_connect=None, url=None, proxy=None,
+                 reconnect_delay=1.0, max_reconnect_delay=60.0, heartbeat=30.0):
+        """
+        on_kline(timeframe, row, closed): 协程，每条 K 线推送调用一次
+        on_connect(reconnected): 协程，每次连接建立后调用 (用于 REST 补齐断线期间的数据)
+        """
+        self.url = stream_url(url or config.BINANCE_WS_URL, symbol, timeframes)
+        self.on_kline = on_kline
+        self.on_connect = on_connect
+        self.proxy = proxy or None
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.heartbeat = heartbeat
+        self.connections = 0
+        self._ws = None
+        self._stopped = False
+
+    async def run(self):
+        delay = self.reconnect_delay
+        async with aiohttp.ClientSession() as session:
+            while not self._stopped:
+                try:
+                    async with session.ws_connect(self.url, proxy=self.proxy, heartbeat=self.heartbeat) as ws:
+                        self._ws = ws
+                        self.connections += 1
+                        delay = self.reconnect_delay
+                        logger.info(f"📡 WebSocket 已连接 ({self.connections}): {self.url}")
+                        if self.on_connect:
+                            await self.on_connect(self.connections > 1)
+
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                parsed = parse_kline_message(json.loads(msg.data))
+                                if parsed:
+                                    await self.on_kline(*parsed)
+                            elif msg.type == aiohttp.WSMsgType.ERROR:
+                                break
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                    logger.warning(f"⚠️ WebSocket 连接异常: {e}")
+                finally:
+                    self._ws = None
+
+                if self._stopped:
+                    break
+                logger.warning(f"⚠️ WebSocket 已断开，{delay:.0f}秒后重连...")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def stop(self):
+        self._stopped = True
+        if self._ws is not None:
+            await self._ws.close()
+
+
+class MarketDataFeed:
+    def __init__(self, symbol, stores, sync, on_close, timeframes=('1h', '15m', '5m'), trigger='5m',
+                 fallback_grace=None, check_interval=1.0, **stream_kwargs):
+        """
+        stores: {timeframe: CandleStore} (与 REST 拉取共用)
+        sync(timeframe): 阻塞函数，用 REST 同步该周期的缓存 (LiveBot.fetch_candles)
+        on_close(frames): trigger 周期收盘时调用，frames 为 {timeframe: DataFrame} 快照；
+            回调不应阻塞事件循环 (耗时操作请提交到线程池)
+        """
+        self.stores = stores
+        self.sync = sync
+        self.on_close = on_close
+        self.timeframes = list(timeframes)
+        self.trigger = trigger
+        self.fallback_grace = config.WS_FALLBACK_GRACE if fallback_grace is None else fallback_grace
+        self.check_interval = check_interval
+        self.stream = KlineStream(symbol, self.timeframes, self.handle_kline, self.handle_connect, **stream_kwargs)
+        self.backfills = 0
+        self.fallbacks = 0
+        self.last_emit = time.time()
+        self._lock = asyncio.Lock()
+        self._watchdog = None
+
+    async def backfill(self, timeframes):
+        self.backfills += 1
+        # 各周期并发补齐，慢请求不拖累其它周期
+        await asyncio.gather(*(asyncio.to_thread(self.sync, tf) for tf in timeframes))
+
+    async def handle_connect(self, reconnected):
+        # 首次连接: 预热；重连: 补齐断线期间缺失的 K 线
+        async with self._lock:
+            await self.backfill(self.timeframes)
+
+    async def handle_kline(self, timeframe, row, closed):
+        async with self._lock:
+            store = self.stores.get(timeframe)
+            if store is None or len(store) == 0 or row[0] > store.last_open_time + TIMEFRAME_MS[timeframe]:
+                # 推送与缓存之间有缺口 (漏消息 / 缓存未预热)
+                await self.backfill([timeframe])
+                store = self.stores[timeframe]
+            store.update([row])
+
+            if closed and timeframe == self.trigger:
+                self.emit()
+
+    def emit(self):
+        self.last_emit = time.time()
+        self.on_close({tf: self.stores[tf].to_frame() for tf in self.timeframes})
+
+    async def watchdog(self):
+        """WebSocket 超过一个周期 + fallback_grace 没有收盘推送时，用 REST 拉取一次并回调"""
+        period = TIMEFRAME_MS[self.trigger] / 1000
+        while True:
+            await asyncio.sleep(self.check_interval)
+            if time.time() - self.last_emit > period + self.fallback_grace:
+                logger.warning("⚠️ WebSocket 未推送收盘K线，改用 REST 拉取")
+                self.fallbacks += 1
+                async with self._lock:
+                    await self.backfill(self.timeframes)
+                    self.emit()
+
+    async def run(self):
+        self._watchdog = asyncio.create_task(self.watchdog())
+        try:
+            await self.stream.run()
+        finally:
+            self._watchdog.cancel()
+
+    async def stop(self):
+        await self.stream.stop()
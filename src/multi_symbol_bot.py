@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+多交易对实盘引擎
+
+一个进程同时运行 config.LIVE_SYMBOLS 中的全部 USDT 永续合约:
+- 共享一个交易所会话 (LiveBot 账户实例: 连接、余额、推送) 与一份请求权重额度 (WeightRateLimiter):
+  该会话上的所有 REST 请求 (K 线、余额、持仓/挂单、下单/撤单) 都先从额度中扣除权重
+- 每个交易对一个 SymbolTrader: 独立的策略指标状态、K 线缓存、持仓/挂单快照
+- 每根 5m K 线收盘后，线程池并发评估所有交易对，并记录每个交易对的耗时
+- 持仓与挂单每个周期只查询一次 (不带 symbol 的批量接口)，再分发给各交易对
+- 开仓信号在主线程中顺序执行，受 MAX_OPEN_POSITIONS 限制；持仓快照刷新失败的周期不开新仓
+
+用法:
+    python src/multi_symbol_bot.py
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from live_bot import LiveBot, logger
+from rate_limiter import WeightRateLimiter, limit_exchange
+
+TIMEFRAMES = ('1h', '15m', '5m')
+
+class SymbolTrader(LiveBot):
+    """
+    单个交易对的交易逻辑 (复用 LiveBot 的取数/分析/下单/推保本方法)
+    交易所会话、账户余额与请求额度由 MultiSymbolBot 共享
+    """
+
+    def __init__(self, engine, symbol):
+        # 不调用 LiveBot.__init__ (会新建交易所连接)，账户级资源取自共享的账户实例
+        self.engine = engine
+        self._share_account(engine.account)
+        self._init_symbol_state(symbol)   # 不启用账户推送: 持仓/挂单由批量巡检快照提供
+        # 最近一次批量巡检得到的持仓/挂单快照 (由 MultiSymbolBot.refresh_account_state 写入)
+        self.position = None
+        self.open_orders = []
+        self.last_cycle_ms = None
+
+    @property
+    def capital(self):
+        return self.engine.account.capital
+
+    @capital.setter
+    def capital(self, value):
+        self.engine.account.capital = value
+
+    def send_notification(self, title, message):
+        self.engine.account.send_notification(title, message)
+
+    def get_position_data(self):
+        return self.position
+
+    def get_open_orders_data(self):
+        return self.open_orders
+
+    def run_cycle(self):
+        """
+        拉取 K 线 -> 策略分析 -> 推保本巡检 (在线程池中执行，不下新单)
+        Returns: analyze_live 的结果 (数据不完整时为 None)
+        """
+        started = time.perf_counter()
+        try:
+            # 交易对之间已经并发，单个交易对内的各周期顺序拉取 (避免嵌套占用线程池)
+            frames = {tf: self.fetch_candles(tf) for tf in TIMEFRAMES}
+            data = self.analyze(frames['1h'], frames['15m'], frames['5m'])
+            self.monitor_positions()
+            return data
+        finally:
+            self.last_cycle_ms = (time.perf_counter() - started) * 1000
+
+
+class MultiSymbolBot:
+    def __init__(self, symbols=None, account=None):
+        self.symbols = list(symbols or config.LIVE_SYMBOLS)
+        # 账户级实例: 交易所连接、余额与推送 (所有交易对共享)
+        self.account = account or LiveBot(self.symbols[0])
+        self.rate_limiter = WeightRateLimiter(config.LIVE_RATE_LIMIT_WEIGHT)
+        self.symbol_pool = ThreadPoolExecutor(max_workers=config.LIVE_SYMBOL_WORKERS)
+        self._share_session()
+        self.traders = {symbol: SymbolTrader(self, symbol) for symbol in self.symbols}
+
+    def _share_session(self):
+        exchange = self.account.exchange
+        # 限流改由共享的 WeightRateLimiter 负责: 所有交易对与账户实例的请求共用一份额度
+        limit_exchange(exchange, self.rate_limiter)
+        # 连接池大小与并发线程数一致，避免多线程时频繁丢弃/重建 HTTPS 连接
+        session = getattr(exchange, 'session', None)
+        if session is not None:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=config.LIVE_SYMBOL_WORKERS)
+            session.mount('https://', adapter)
+
+    def refresh_account_state(self):
+        """一次批量查询全部持仓与挂单，按交易对分发到各 SymbolTrader"""
+        exchange = self.account.exchange
+
+        positions = {}
+        for p in exchange.fapiPrivateV2GetPositionRisk():
+            amount = float(p['positionAmt'])
+            if amount != 0:
+                positions[p['symbol']] = {
+                    'contracts': amount,
+                    'entryPrice': float(p['entryPrice']),
+                    'side': 'long' if amount > 0 else 'short'
+                }
+
+        orders = {}
+        for o in exchange.fapiPrivateGetOpenOrders():
+            orders.setdefault(o['symbol'], []).append({
+                'id': str(o['orderId']),
+                'type': o['type'],
+                'stopPrice': float(o.get('stopPrice', 0))
+            })
+
+        for trader in self.traders.values():
+            position = positions.get(trader.market_id)
+            trader.position = dict(position, symbol=trader.symbol) if position else None
+            trader.open_orders = orders.get(trader.market_id, [])
+
+    def open_position_count(self):
+        return sum(1 for t in self.traders.values() if t.position and t.position['contracts'] != 0)
+
+    def run_cycle(self):
+        """评估全部交易对一次，返回 {symbol: analyze_live 结果}"""
+        cycle_started = time.perf_counter()
+
+        state_ready = True
+        if self.account.api_ready and config.REAL_TRADING_ENABLED:
+            self.account.update_balance()
+            try:
+                self.refresh_account_state()
+            except Exception as e:
+                logger.error(f"❌ 批量获取持仓/挂单失败: {e}")
+                state_ready = False
+        self.account.db.log_equity(self.account.capital)
+
+        futures = {symbol: self.symbol_pool.submit(trader.run_cycle) for symbol, trader in self.traders.items()}
+        results = {}
+        for symbol, future in futures.items():
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                logger.error(f"❌ {symbol} 评估出错: {e}")
+                results[symbol] = None
+
+        eval_ms = (time.perf_counter() - cycle_started) * 1000
+        self.log_cycle(results, eval_ms)
+        if state_ready:
+            self.execute_signals(results)
+        else:
+            # 快照仍是上个周期的: 刚开的仓位看起来还是空仓，继续执行可能重复开仓或超出最大持仓数
+            logger.warning("⚠️ 持仓快照未更新，本周期跳过开仓信号")
+        return results
+
+    def log_cycle(self, results, eval_ms):
+        for symbol, data in results.items():
+            trader = self.traders[symbol]
+            if data:
+                status = (f"价格 {data['price']:.4f} | RSI {data['indicators']['rsi']:.1f} | "
+                          f"趋势 {data['indicators']['trend']} | 信号 {data['signal'] or '-'}")
+            else:
+                status = "数据获取失败"
+            logger.info(f"  {symbol:<12} {trader.last_cycle_ms:7.0f}ms | {status}")
+
+        timings = [t.last_cycle_ms for t in self.traders.values() if t.last_cycle_ms is not None]
+        slowest = max(self.traders.values(), key=lambda t: t.last_cycle_ms or 0)
+        logger.info(
+            f"⏱ {len(self.traders)} 个交易对评估完成: 总计 {eval_ms:.0f}ms | "
+            f"平均 {sum(timings) / max(len(timings), 1):.0f}ms | 最慢 {slowest.symbol} {slowest.last_cycle_ms:.0f}ms | "
+            f"累计请求权重 {self.rate_limiter.used}"
+        )
+
+    def execute_signals(self, results):
+        """按交易对顺序执行开仓信号，遵守最大同时持仓数"""
+        open_count = self.open_position_count()
+        for symbol, data in results.items():
+            if not data or not data['signal']:
+                continue
+            trader = self.traders[symbol]
+            if trader.position:
+                logger.info(f"  {symbol} 已有持仓，忽略 {data['signal']} 信号")
+                continue
+            if open_count >= config.MAX_OPEN_POSITIONS:
+                logger.warning(f"⚠️ 已达最大持仓数 {config.MAX_OPEN_POSITIONS}，忽略 {symbol} {data['signal']} 信号")
+                continue
+            if trader.execute_signal(data['price'], data['signal'], data['atr']):
+                open_count += 1
+
+    def run(self):
+        mode_label = "[模拟盘]" if config.IS_TESTNET else "[实盘]"
+        logger.info(f"🚀 {mode_label} Qtrading 多交易对引擎已就绪 | {len(self.symbols)} 个交易对")
+        logger.info(f"当前策略: {config.ACTIVE_STRATEGY} | 并发: {config.LIVE_SYMBOL_WORKERS} 线程 | "
+                    f"权重预算: {config.LIVE_RATE_LIMIT_WEIGHT}/分钟")
+
+        while True:
+            now = datetime.now()
+            next_run = now - timedelta(minutes=now.minute % 5, seconds=now.second, microseconds=now.microsecond) + timedelta(minutes=5)
+            sleep_time = (next_run - now).total_seconds() + 3
+
+            logger.info(f"💤 休眠 {int(sleep_time)}秒 直到 {next_run.strftime('%H:%M:%S')} | 当前权益: ${self.account.capital:.2f}...")
+            time.sleep(sleep_time)
+
+            logger.info("正在检查市场...")
+            self.run_cycle()
+
+
+if __name__ == "__main__":
+    bot = MultiSymbolBot()
+    bot.run()
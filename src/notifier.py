@@ -0,0 +1,163 @@
+# notifier.py
+"""
+异步消息推送 (Bark / Telegram)
+
+交易代码只调用 notify() 入队，立即返回；后台线程负责发送:
+- 复用连接池 (requests.Session)，失败按指数退避重试
+- 合并突发: 一次取出队列中积压的全部消息 (最多 max_batch 条)，每个渠道合并成一条推送
+- 有界队列: 积压超过 max_queue 时丢弃最旧的消息，并在下一条推送中注明丢弃条数
+"""
+import atexit
+import collections
+import logging
+import threading
+import time
+from urllib.parse import quote
+
+import requests
+
+import config
+
+logger = logging.getLogger("Qtrading_Live")
+
+
+class Notifier:
+    def __init__(self, max_queue=None, max_batch=10, coalesce_window=0.5, retries=3, backoff=1.0,
+                 timeout=5, session=None, sleep=time.sleep):
+        self.max_queue = config.NOTIFICATION_QUEUE_SIZE if max_queue is None else max_queue
+        self.max_batch = max_batch
+        self.coalesce_window = coalesce_window
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.sleep = sleep
+        self.session = session or requests.Session()
+        self.session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=2))
+        self.session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=2))
+
+        self.pending = collections.deque()
+        self.dropped = 0
+        self.sent = 0
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, name="notifier", daemon=True)
+            self._thread.start()
+            # 进程正常退出前尽量把积压的消息发出去
+            atexit.register(self.close, 5)
+        return self
+
+    def notify(self, title, message):
+        """入队 (不阻塞)"""
+        with self._cond:
+            if self._closed:
+                return
+            if len(self.pending) >= self.max_queue:
+                self.pending.popleft()
+                self.dropped += 1
+            self.pending.append((title, message))
+            self._cond.notify()
+
+    def flush(self, timeout=None):
+        """等待队列清空 (测试 / 退出时使用)，返回是否已清空"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self.pending and not self._closed:
+                self._cond.wait()
+            if self._closed and not self.pending:
+                return None
+            self._busy = True
+
+        # 稍等片刻，把同一时刻的突发消息 (如开仓 + 挂单失败) 合并成一条
+        if self.coalesce_window:
+            self.sleep(self.coalesce_window)
+
+        with self._cond:
+            batch = [self.pending.popleft() for _ in range(min(self.max_batch, len(self.pending)))]
+            dropped, self.dropped = self.dropped, 0
+        return batch, dropped
+
+    def _worker(self):
+        while True:
+            item = self._next_batch()
+            if item is None:
+                return
+            try:
+                title, message = self.merge(*item)
+                self.dispatch(title, message)
+            except Exception as e:
+                logger.error(f"❌ 推送线程出错: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    @staticmethod
+    def merge(batch, dropped=0):
+        if len(batch) == 1:
+            title, message = batch[0]
+        else:
+            title = f"{batch[0][0]} 等 {len(batch)} 条通知"
+            message = "\n\n".join(f"【{t}】\n{m}" for t, m in batch)
+        if dropped:
+            message += f"\n(另有 {dropped} 条通知因积压被丢弃)"
+        return title, message
+
+    def dispatch(self, title, message):
+        channels = config.NOTIFICATION_CHANNELS
+        if isinstance(channels, str):
+            channels = [channels]
+
+        if 'bk' in channels and config.BARK_URL:
+            base_url = config.BARK_URL.rstrip('/')
+            url = f"{base_url}/{quote(title, safe='')}/{quote(message, safe='')}"
+            self.send_with_retry("Bark", lambda: self.session.get(url, timeout=self.timeout))
+
+        if 'tg' in channels and config.TELEGRAM_BOT_TOKEN and config.TELEGRAM_CHAT_ID:
+            tg_url = f"https://api.telegram.org/bot{config.TELEGRAM_BOT_TOKEN}/sendMessage"
+            payload = {
+                'chat_id': config.TELEGRAM_CHAT_ID,
+                'text': f"*{title}*\n{message}",
+                'parse_mode': 'Markdown'
+            }
+            self.send_with_retry("Telegram", lambda: self.session.post(tg_url, json=payload, timeout=self.timeout))
+
+    def send_with_retry(self, channel, request):
+        delay = self.backoff
+        for attempt in range(1, self.retries + 1):
+            try:
+                response = request()
+                if response.status_code < 400:
+                    self.sent += 1
+                    return True
+                if response.status_code < 500 and response.status_code != 429:
+                    # 请求本身有误 (如 token 错误)，重试无意义
+                    logger.error(f"❌ {channel} 推送被拒绝: HTTP {response.status_code}")
+                    return False
+                error = f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                error = e
+            if attempt < self.retries:
+                self.sleep(delay)
+                delay *= 2
+        logger.error(f"❌ {channel} 推送失败 (重试 {self.retries} 次): {error}")
+        return False
@@ -0,0 +1,193 @@
+# portfolio_backtester.py
+"""
+多交易对组合回测
+
+N 个交易对共用一个资金池，按统一的 5m 时钟推进:
+- 每个交易对单独计算指标，并用策略的向量化 generate_signals 一次性得到信号数组
+- 各交易对的 high/low/close/atr/信号对齐为 (bar, symbol) 二维数组，缺失的 bar 为 NaN / 无信号
+- 资金管理、SL/TP1/TP2、保本与日内风控 (MAX_TRADES_PER_DAY / MAX_DAILY_LOSS / MAX_CONSECUTIVE_LOSS)
+  直接复用 Backtester，MAX_OPEN_POSITIONS 与 POSITION_SIZE_PCT 作用于整个组合
+- 同一根 bar 上多个交易对同时出信号时，按交易对列表顺序依次尝试开仓
+
+只有一个交易对时，结果与单品种 numpy 引擎完全一致。
+
+用法:
+    python src/portfolio_backtester.py --start 2024-01-01 --end 2024-12-31 \
+        --symbols BTC/USDT,ETH/USDT,SOL/USDT
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import config
+import data_loader
+import sweep
+from backtester import Backtester, SIGNAL_SIDES
+
+
+class PortfolioBacktester(Backtester):
+    def __init__(self, frames, cfg=config):
+        """
+        frames: {symbol: prepare_strategy_data 格式的 DataFrame}，
+            或按顺序产出 (symbol, DataFrame) 的可迭代对象 (如 data_loader.iter_portfolio_data，逐个加载以节省内存)
+        """
+        super().__init__(None, cfg)
+        self.frames = frames
+        self.symbols = []
+
+    def align_symbols(self):
+        """
+        逐个交易对计算指标与信号，只保留回测需要的列，并对齐到所有交易对 bar 时间的并集
+        Returns: (clock, high, low, close, atr, signals)，二维数组形状为 (bar, symbol)
+        """
+        items = self.frames.items() if isinstance(self.frames, dict) else self.frames
+        columns = {}
+        for symbol, df in items:
+            df = self.strategy.calculate_indicators(df)
+            df.dropna(inplace=True)
+            if df.empty:
+                continue
+            columns[symbol] = (df[['high', 'low', 'close', 'atr']], self.signal_array(df))
+        self.frames = None  # 原始数据不再需要
+
+        self.symbols = list(columns)
+        if not columns:
+            return pd.DatetimeIndex([]), *(np.empty((0, 0)) for _ in range(4)), np.empty((0, 0), dtype=np.int8)
+
+        clock = columns[self.symbols[0]][0].index
+        for bars, _ in columns.values():
+            clock = clock.union(bars.index)
+
+        n, m = len(clock), len(self.symbols)
+        high, low, close, atr = (np.full((n, m), np.nan) for _ in range(4))
+        signals = np.zeros((n, m), dtype=np.int8)
+        for j, symbol in enumerate(self.symbols):
+            bars, symbol_signals = columns.pop(symbol)
+            pos = clock.get_indexer(bars.index)
+            high[pos, j] = bars['high'].to_numpy()
+            low[pos, j] = bars['low'].to_numpy()
+            close[pos, j] = bars['close'].to_numpy()
+            atr[pos, j] = bars['atr'].to_numpy()
+            signals[pos, j] = symbol_signals
+
+        return clock, high, low, close, atr, signals
+
+    def run(self, engine=None):
+        """
+        Returns: 权益曲线 DataFrame[time, equity, open_positions]
+        """
+        print(f"Starting Portfolio Backtest...")
+        clock, high, low, close, atr, signals = self.align_symbols()
+        n = len(clock)
+        print(f"Aligned {len(self.symbols)} symbols on {n} bars")
+
+        # 盯市价格: 没有 bar 的时刻沿用该交易对最近一次收盘价
+        mark = pd.DataFrame(close).ffill().to_numpy()
+        column = {symbol: j for j, symbol in enumerate(self.symbols)}
+        days = clock.normalize().asi8.tolist()
+
+        # 所有 (bar, symbol) 信号事件，按 bar、再按交易对顺序排列
+        signal_rows, signal_cols = np.nonzero(signals)
+        signal_rows, signal_cols = signal_rows.tolist(), signal_cols.tolist()
+        n_signals = len(signal_rows)
+        k = 0
+
+        equity = np.empty(n, dtype=np.float64)
+        open_positions = np.empty(n, dtype=np.int64)
+        current_day = None
+
+        for i in range(n):
+            if days[i] != current_day:
+                current_day = days[i]
+                self.check_daily_reset(clock[i])
+
+            # Record Equity
+            equity[i] = self.capital + self.mark_to_market_portfolio(mark[i], column)
+
+            # Check Risk Stops (Daily)
+            self.update_risk_stops()
+
+            # 按开仓顺序检查每笔持仓 (只用该交易对本根 bar 的 high/low)
+            for t in self.open_trades[:]:
+                j = column[t.symbol]
+                if not np.isnan(high[i, j]):
+                    self.manage_open_trades(high[i, j], low[i, j], clock[i], [t])
+
+            # --- Check Entry Signals ---
+            while k < n_signals and signal_rows[k] == i:
+                j = signal_cols[k]
+                if self.can_open_trade():
+                    self.open_trade(SIGNAL_SIDES[int(signals[i, j])], clock[i], close[i, j], atr[i, j],
+                                    symbol=self.symbols[j])
+                k += 1
+
+            open_positions[i] = len(self.open_trades)
+
+        print("Backtest Finished.")
+        return pd.DataFrame({'time': clock, 'equity': equity, 'open_positions': open_positions})
+
+    def mark_to_market_portfolio(self, prices, column):
+        unrealized_pnl = 0.0
+        for t in self.open_trades:
+            price = prices[column[t.symbol]]
+            if t.side == 'LONG':
+                unrealized_pnl += (price - t.entry_price) * t.size
+            else:
+                unrealized_pnl += (t.entry_price - price) * t.size
+        return unrealized_pnl
+
+    def symbol_stats(self):
+        """按交易对汇总已平仓交易"""
+        if not self.trades:
+            return pd.DataFrame(columns=['Trades', 'Win Rate', 'Total PnL'])
+        df_t = pd.DataFrame({'symbol': [t.symbol for t in self.trades], 'pnl': [t.pnl for t in self.trades]})
+        grouped = df_t.groupby('symbol', sort=False)['pnl']
+        stats = pd.DataFrame({
+            'Trades': grouped.size(),
+            'Win Rate': grouped.apply(lambda pnl: (pnl > 0).mean()),
+            'Total PnL': grouped.sum(),
+        })
+        return stats.sort_values('Total PnL', ascending=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qtrading Portfolio Backtest")
+    parser.add_argument('--start', type=str, default='2021-01-01', help='Start Date (YYYY-MM-DD)')
+    parser.add_argument('--end', type=str, default='2021-06-01', help='End Date (YYYY-MM-DD)')
+    parser.add_argument('--symbols', type=str, default=','.join(config.PORTFOLIO_SYMBOLS),
+                        help='Comma separated symbols, each read from its <base>_<quote>_1s table')
+    parser.add_argument('--output', type=str, default='portfolio_equity.csv', help='CSV file for the equity curve')
+    args = parser.parse_args()
+
+    symbols = [s.strip() for s in args.symbols.split(',') if s.strip()]
+
+    print(f"--- Qtrading Portfolio Backtest ---")
+    print(f"Strategy: {config.ACTIVE_STRATEGY}")
+    print(f"Period: {args.start} to {args.end}")
+    print(f"Symbols ({len(symbols)}): {', '.join(symbols)}")
+
+    bt = PortfolioBacktester(data_loader.iter_portfolio_data(symbols, args.start, args.end))
+    try:
+        equity_df = bt.run()
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        return
+
+    print("\n--- Results ---")
+    stats = bt.get_stats()
+    stats['Max Drawdown'] = f"{sweep.max_drawdown(equity_df) * 100:.2f}%"
+    for k, v in stats.items():
+        print(f"{k}: {v}")
+    if not equity_df.empty:
+        print(f"Max Open Positions: {equity_df['open_positions'].max()}")
+
+    print("\n--- Per Symbol ---")
+    print(bt.symbol_stats().to_string())
+
+    equity_df.to_csv(args.output, index=False)
+    print(f"✅ Equity curve saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 from abc import ABC, abstractmethod
 
+# 向量化信号编码 (generate_signals 返回值)
+SIGNAL_LONG = 1
+SIGNAL_SHORT = -1
+SIGNAL_NONE = 0
+
 class BaseStrategy(ABC):
     def __init__(self, config):
         self.config = config
@@ -19,6 +24,15 @@ class BaseStrategy(ABC):
         """
         pass
 
+    def generate_signals(self, df):
+        """
+        回测向量化信号 (可选): 在整张 DataFrame 上一次性计算所有 bar 的信号，
+        结果必须与逐行 check_signal(row, prev_row) 完全一致。
+        Returns: np.int8 数组 (SIGNAL_LONG / SIGNAL_SHORT / SIGNAL_NONE)，
+                 未实现时返回 None，回测引擎回退到逐行 check_signal
+        """
+        return None
+
     @abstractmethod
     def analyze_live(self, df_1h, df_15m, df_5m):
         """
@@ -1,5 +1,6 @@
-from .base import BaseStrategy
+from .base import BaseStrategy, SIGNAL_LONG, SIGNAL_SHORT, SIGNAL_NONE
 import indicators
+import numpy as np
 import pandas as pd
 
 class TrendMeanReversion(BaseStrategy):
@@ -13,6 +14,10 @@ class TrendMeanReversion(BaseStrategy):
         self.rsi_overbought = config.RSI_OVERBOUGHT
         self.rsi_oversold = config.RSI_OVERSOLD
 
+        # 实盘增量指标状态
+        self.live_last_ts = {'1h': None, '5m': None}
+        self.reset_live_state()
+
     def calculate_indicators(self, df):
         """回测指标计算"""
         df = df.copy()
@@ -65,18 +70,82 @@ class TrendMeanReversion(BaseStrategy):
         
         return None
 
+    def generate_signals(self, df):
+        """回测向量化信号 (与 check_signal 逻辑一致)"""
+        close = df['close'].to_numpy(dtype=np.float64)
+        open_ = df['open'].to_numpy(dtype=np.float64)
+        trend_close = df['1h_close'].to_numpy(dtype=np.float64)
+        trend_ema = df['1h_ema_trend'].to_numpy(dtype=np.float64)
+        rsi = df['rsi'].to_numpy(dtype=np.float64)
+
+        is_green = close > open_
+        is_red = close < open_
+
+        long_mask = (trend_close > trend_ema) & \
+                    (rsi < self.rsi_oversold) & \
+                    (df['low'].to_numpy(dtype=np.float64) <= df['bb_lower'].to_numpy(dtype=np.float64)) & \
+                    is_green
+
+        short_mask = (trend_close < trend_ema) & \
+                     (rsi > self.rsi_overbought) & \
+                     (df['high'].to_numpy(dtype=np.float64) >= df['bb_upper'].to_numpy(dtype=np.float64)) & \
+                     is_red
+
+        signals = np.where(long_mask, SIGNAL_LONG, np.where(short_mask, SIGNAL_SHORT, SIGNAL_NONE)).astype(np.int8)
+
+        # 与 check_signal 一致: 第一根 K 线没有 prev_row，不产生信号
+        if len(signals):
+            signals[0] = SIGNAL_NONE
+        return signals
+
+    def reset_live_state(self):
+        """清空实盘增量指标状态 (下次 analyze_live 会用传入的整段数据重新预热)"""
+        self._reset_live_1h()
+        self._reset_live_5m()
+
+    def _reset_live_1h(self):
+        self.live_ema_trend = indicators.StreamingEMA(self.trend_ema_period)
+        self.live_last_ts['1h'] = None
+
+    def _reset_live_5m(self):
+        self.live_rsi = indicators.StreamingRSI(self.rsi_period)
+        self.live_atr = indicators.StreamingATR(self.atr_period)
+        self.live_bb = indicators.StreamingBollingerBands(self.bb_period, self.bb_std)
+        self.live_last_ts['5m'] = None
+
+    def _new_closed_rows(self, timeframe, df, reset):
+        """
+        返回 df 中尚未喂入指标的已收盘 K 线 (最后一根视为未收盘，不写入状态)。
+        若上次喂入的 K 线已不在 df 中 (断档/首次运行)，先 reset 再用整段数据预热。
+        """
+        closed = df.iloc[:-1]
+        last_ts = self.live_last_ts[timeframe]
+        if last_ts is None or last_ts not in closed['timestamp'].values:
+            reset()
+            new_rows = closed
+        else:
+            new_rows = closed[closed['timestamp'] > last_ts]
+
+        if not new_rows.empty:
+            self.live_last_ts[timeframe] = new_rows['timestamp'].iloc[-1]
+        return new_rows
+
     def analyze_live(self, df_1h, df_15m, df_5m):
-        """实盘实时分析"""
-        # 1. Calculate Indicators on separate timeframes
+        """
+        实盘实时分析
+        指标状态跨周期保留 (增量指标 O(1) 更新)，每次只喂入新收盘的 K 线；
+        最后一根 K 线只试算 (peek)，不写入状态。
+        """
+        # 1. Update Indicators on separate timeframes
         # 1H
-        df_1h['ema_trend'] = indicators.calculate_ema(df_1h['close'], self.trend_ema_period)
-        
+        for r in self._new_closed_rows('1h', df_1h, self._reset_live_1h).itertuples(index=False):
+            self.live_ema_trend.update(r.close)
+
         # 5m
-        df_5m['rsi'] = indicators.calculate_rsi(df_5m['close'], period=self.rsi_period)
-        df_5m['atr'] = indicators.calculate_atr(df_5m, period=self.atr_period)
-        df_5m['bb_upper'], df_5m['bb_lower'] = indicators.calculate_bollinger_bands(
-            df_5m['close'], period=self.bb_period, std_dev=self.bb_std
-        )
+        for r in self._new_closed_rows('5m', df_5m, self._reset_live_5m).itertuples(index=False):
+            self.live_rsi.update(r.close)
+            self.live_atr.update(r.high, r.low, r.close)
+            self.live_bb.update(r.close)
 
         # 2. Get Latest Values
         # Note: In LiveBot, we usually check the *closed* candle for confirmation, 
@@ -86,7 +155,7 @@ class TrendMeanReversion(BaseStrategy):
         # Let's assume LiveBot passes data where iloc[-1] is the latest COMPLETED candle.
         
         # Trend (use previous closed 1h candle to be safe/stable)
-        trend_val = df_1h.iloc[-2]['ema_trend']
+        trend_val = self.live_ema_trend.value
         trend_price = df_1h.iloc[-2]['close']
         
         trend_up = trend_price > trend_val
@@ -99,10 +168,9 @@ class TrendMeanReversion(BaseStrategy):
         current_open = row['open']
         current_low = row['low']
         current_high = row['high']
-        rsi = row['rsi']
-        atr = row['atr']
-        bb_lower = row['bb_lower']
-        bb_upper = row['bb_upper']
+        rsi = self.live_rsi.peek(current_close)
+        atr = self.live_atr.peek(current_high, current_low, current_close)
+        bb_upper, bb_lower = self.live_bb.peek(current_close)
         
         is_green = current_close > current_open
         is_red = current_close < current_open
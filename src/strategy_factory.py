@@ -1,8 +1,8 @@
 from strategies.trend_mean_reversion import TrendMeanReversion
 import config
 
-def get_strategy(strategy_name):
+def get_strategy(strategy_name, cfg=config):
     if strategy_name == 'TrendMeanReversion':
-        return TrendMeanReversion(config)
+        return TrendMeanReversion(cfg)
     else:
         raise ValueError(f"Unknown strategy: {strategy_name}")
@@ -0,0 +1,169 @@
+# sweep.py
+"""
+参数扫描 (Grid Search)
+
+对 config 中的策略/风控参数做网格组合，使用 ProcessPoolExecutor 并行回测，
+行情数据只从 ClickHouse 加载一次，通过 fork 写时复制 (copy-on-write) 共享给所有子进程。
+每组参数使用独立的配置对象，不修改全局 config。
+
+用法:
+    python src/sweep.py --start 2024-01-01 --end 2024-03-01 \
+        --param RSI_OVERSOLD=30,35 --param TP2_RATIO=3.0,3.5,4.0
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import backtester
+import config
+import data_loader
+
+# 默认扫描网格 (未指定 --param 时使用)
+DEFAULT_GRID = {
+    'RSI_OVERSOLD': [30, 35],
+    'RSI_OVERBOUGHT': [65, 70],
+    'BB_STD': [2.0, 2.5],
+    'ATR_SL_MULTIPLIER': [1.5, 2.0],
+    'TP1_RATIO': [1.0, 1.5],
+    'TP2_RATIO': [3.0, 3.5],
+}
+
+# 子进程共享的行情数据 (fork 模式下由父进程设置后继承)
+_SHARED_DF = None
+
+
+def build_config(overrides=None):
+    """
+    基于全局 config 生成一份独立的配置对象，并应用参数覆盖
+    """
+    cfg = types.SimpleNamespace(**{k: getattr(config, k) for k in dir(config) if k.isupper()})
+    for key, value in (overrides or {}).items():
+        if not hasattr(cfg, key):
+            raise ValueError(f"Unknown config parameter: {key}")
+        setattr(cfg, key, value)
+    return cfg
+
+
+def expand_grid(grid):
+    """{'A': [1, 2], 'B': [3]} -> [{'A': 1, 'B': 3}, {'A': 2, 'B': 3}]"""
+    keys = list(grid.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def max_drawdown(equity_df):
+    if equity_df.empty:
+        return 0.0
+    equity = equity_df['equity']
+    return float(((equity - equity.cummax()) / equity.cummax()).min())
+
+
+def run_single(df, overrides, engine='kernel'):
+    """单组参数回测，返回一行结果 (参数 + get_stats)"""
+    cfg = build_config(overrides)
+    bt = backtester.Backtester(df, cfg)
+    equity_df = bt.run(engine=engine)
+
+    row = dict(overrides)
+    row.update(bt.get_stats())
+    row['Max Drawdown'] = max_drawdown(equity_df)
+    return row
+
+
+def _init_worker(df):
+    global _SHARED_DF
+    if df is not None:
+        _SHARED_DF = df
+
+
+def _run_shared(overrides, engine):
+    return run_single(_SHARED_DF, overrides, engine)
+
+
+def run_sweep(df, grid, engine='kernel', workers=None):
+    """
+    并行执行网格中的全部参数组合
+    Returns: 按 Final Capital 降序排列的结果表
+    """
+    global _SHARED_DF
+    combos = expand_grid(grid)
+    workers = workers or os.cpu_count() or 1
+
+    print(f"Sweeping {len(combos)} parameter sets with {workers} workers (engine: {engine})...")
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # fork: 子进程直接继承父进程内存中的 DataFrame (写时复制，无需序列化)
+        ctx = multiprocessing.get_context('fork')
+        _SHARED_DF = df
+        initargs = (None,)
+    else:
+        # spawn: 每个 worker 启动时反序列化一次，而不是每组参数都传一次
+        ctx = multiprocessing.get_context('spawn')
+        initargs = (df,)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=initargs) as pool:
+            rows = list(pool.map(_run_shared, combos, itertools.repeat(engine)))
+    finally:
+        _SHARED_DF = None
+
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results
+    results = results.sort_values('Final Capital', ascending=False).reset_index(drop=True)
+    results.index += 1
+    results.index.name = 'Rank'
+    return results
+
+
+def parse_param(text):
+    """'RSI_OVERSOLD=30,35' -> ('RSI_OVERSOLD', [30, 35])"""
+    key, _, values = text.partition('=')
+    key = key.strip()
+    if not values:
+        raise argparse.ArgumentTypeError(f"Invalid --param '{text}', expected NAME=v1,v2,...")
+    default = getattr(config, key, None)
+    cast = type(default) if isinstance(default, (int, float)) and not isinstance(default, bool) else float
+    return key, [cast(v) for v in values.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qtrading Parameter Sweep")
+    parser.add_argument('--start', type=str, default='2021-01-01', help='Start Date (YYYY-MM-DD)')
+    parser.add_argument('--end', type=str, default='2021-06-01', help='End Date (YYYY-MM-DD)')
+    parser.add_argument('--param', type=parse_param, action='append', default=[],
+                        help='Parameter grid, e.g. --param RSI_OVERSOLD=30,35 (repeatable)')
+    parser.add_argument('--engine', type=str, choices=['numpy', 'kernel', 'pandas'], default='kernel',
+                        help='Backtest engine for each run')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--output', type=str, default='sweep_results.csv', help='CSV file for the ranked table')
+    args = parser.parse_args()
+
+    grid = dict(args.param) if args.param else DEFAULT_GRID
+
+    print(f"--- Qtrading Parameter Sweep ---")
+    print(f"Period: {args.start} to {args.end}")
+    for key, values in grid.items():
+        print(f"  {key}: {values}")
+
+    try:
+        df = data_loader.prepare_strategy_data(args.start, args.end)
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        return
+
+    results = run_sweep(df, grid, engine=args.engine, workers=args.workers)
+
+    print("\n--- Ranked Results ---")
+    print(results.to_string())
+    results.to_csv(args.output)
+    print(f"✅ Results saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
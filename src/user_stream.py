@@ -0,0 +1,197 @@
+# user_stream.py
+"""
+账户推送 (币安合约 user data stream)
+
+UserDataStream: 申请 listenKey 并订阅 <ws>/ws/<listenKey>，定时续期；断线 / listenKey 过期后重新申请并重连
+OrderBook:      由推送维护的内存持仓/挂单簿 (ORDER_TRADE_UPDATE、ACCOUNT_UPDATE)，
+                格式与 LiveBot.get_position_data / get_open_orders_data 一致；
+                每次 (重新) 连接以及低频巡检时用 REST 快照覆盖，保证与交易所一致
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+
+import aiohttp
+import ccxt
+
+import config
+
+logger = logging.getLogger("Qtrading_Live")
+
+# 订单进入这些状态后不再挂在盘口
+CLOSED_STATUSES = {'FILLED', 'CANCELED', 'EXPIRED', 'EXPIRED_IN_MATCH', 'REJECTED'}
+
+
+class OrderBook:
+    def __init__(self):
+        self.positions = {}  # {market_id: {'contracts', 'entryPrice', 'updated'}}
+        self.orders = {}     # {market_id: {order_id: order}}
+        self._lock = threading.Lock()
+
+    def reset(self, market_id, position, orders, updated=None):
+        """用 REST 快照覆盖一个交易对的状态 (position / orders 为 get_position_data / get_open_orders_data 的返回值)"""
+        updated = int(time.time() * 1000) if updated is None else updated
+        with self._lock:
+            contracts = float(position['contracts']) if position else 0.0
+            # ccxt 统一格式的空仓 contracts 为正数，靠 side 区分方向
+            if position and position.get('side') == 'short' and contracts > 0:
+                contracts = -contracts
+            self.positions[market_id] = {
+                'contracts': contracts,
+                'entryPrice': float(position['entryPrice']) if position else 0.0,
+                'updated': updated,
+            }
+            self.orders[market_id] = {
+                str(o['id']): {'id': str(o['id']), 'type': o['type'].upper(), 'stopPrice': float(o.get('stopPrice') or 0)}
+                for o in orders
+            }
+
+    def snapshot(self, market_id):
+        """Returns: (position 或 None, open_orders)"""
+        with self._lock:
+            p = self.positions.get(market_id)
+            position = None
+            if p and p['contracts'] != 0:
+                position = {
+                    'contracts': p['contracts'],
+                    'entryPrice': p['entryPrice'],
+                    'side': 'long' if p['contracts'] > 0 else 'short'
+                }
+            orders = [dict(o) for o in self.orders.get(market_id, {}).values()]
+        return position, orders
+
+    def apply(self, event):
+        """
+        应用一条推送
+        Returns: 本次有成交的订单 (ORDER_TRADE_UPDATE 且 x=TRADE)，其它情况返回 None
+        """
+        kind = event.get('e')
+        with self._lock:
+            if kind == 'ACCOUNT_UPDATE':
+                self._apply_account_update(event)
+            elif kind == 'ORDER_TRADE_UPDATE':
+                return self._apply_order_update(event)
+        return None
+
+    def _apply_account_update(self, event):
+        for p in event['a'].get('P', []):
+            if p.get('ps', 'BOTH') != 'BOTH':
+                continue  # 只支持单向持仓模式
+            self.positions[p['s']] = {
+                'contracts': float(p['pa']),
+                'entryPrice': float(p['ep']),
+                'updated': event.get('T', event.get('E', 0)),
+            }
+
+    def _apply_order_update(self, event):
+        o = event['o']
+        market_id, order_id = o['s'], str(o['i'])
+        orders = self.orders.setdefault(market_id, {})
+        order = {
+            'id': order_id,
+            'type': o.get('ot') or o['o'],  # 条件单触发后 o 变为 MARKET，ot 保留原始类型
+            'stopPrice': float(o.get('sp') or 0),
+            'side': o['S'],
+            'reduceOnly': bool(o.get('R')),
+            'status': o['X'],
+            'filled': float(o.get('l') or 0),
+        }
+        if order['status'] in CLOSED_STATUSES:
+            orders.pop(order_id, None)
+        else:
+            orders[order_id] = {k: order[k] for k in ('id', 'type', 'stopPrice')}
+
+        if o.get('x') != 'TRADE':
+            return None
+
+        # 成交先于 ACCOUNT_UPDATE 到达时，按成交量先行推算持仓 (之后的 ACCOUNT_UPDATE 会覆盖为交易所的值)
+        trade_time = event.get('T', event.get('E', 0))
+        position = self.positions.get(market_id)
+        if position is not None and trade_time > position['updated']:
+            delta = order['filled'] if order['side'] == 'BUY' else -order['filled']
+            position['contracts'] = round(position['contracts'] + delta, 12)
+            position['updated'] = trade_time
+        return dict(order, symbol=market_id)
+
+
+class UserDataStream:
+    def __init__(self, exchange, on_event, on_connect=None, url=None, proxy=None, keepalive_interval=None,
+                 reconnect_delay=1.0, max_reconnect_delay=60.0, heartbeat=30.0):
+        """
+        on_event(event): 协程，每条账户推送调用一次
+        on_connect(reconnected): 协程，每次连接建立后调用 (用于 REST 对账)
+        """
+        self.exchange = exchange
+        self.url = (url or config.BINANCE_WS_URL).rstrip('/')
+        self.on_event = on_event
+        self.on_connect = on_connect
+        self.proxy = proxy or None
+        self.keepalive_interval = config.USER_STREAM_KEEPALIVE if keepalive_interval is None else keepalive_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.heartbeat = heartbeat
+        self.connections = 0
+        self.connected = False
+        self._ws = None
+        self._stopped = False
+
+    async def create_listen_key(self):
+        response = await asyncio.to_thread(self.exchange.fapiPrivatePostListenKey)
+        return response['listenKey']
+
+    async def keepalive(self):
+        """listenKey 60 分钟无续期即失效"""
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            try:
+                await asyncio.to_thread(self.exchange.fapiPrivatePutListenKey)
+            except Exception as e:
+                logger.warning(f"⚠️ listenKey 续期失败: {e}")
+
+    async def run(self):
+        delay = self.reconnect_delay
+        async with aiohttp.ClientSession() as session:
+            while not self._stopped:
+                keepalive = None
+                try:
+                    listen_key = await self.create_listen_key()
+                    async with session.ws_connect(f"{self.url}/ws/{listen_key}", proxy=self.proxy,
+                                                  heartbeat=self.heartbeat) as ws:
+                        self._ws = ws
+                        self.connections += 1
+                        self.connected = True
+                        delay = self.reconnect_delay
+                        logger.info(f"📡 账户推送已连接 ({self.connections})")
+                        keepalive = asyncio.create_task(self.keepalive())
+                        if self.on_connect:
+                            await self.on_connect(self.connections > 1)
+
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                event = json.loads(msg.data)
+                                if event.get('e') == 'listenKeyExpired':
+                                    logger.warning("⚠️ listenKey 已过期，重新申请")
+                                    break
+                                await self.on_event(event)
+                            elif msg.type == aiohttp.WSMsgType.ERROR:
+                                break
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ccxt.BaseError) as e:
+                    logger.warning(f"⚠️ 账户推送连接异常: {e}")
+                finally:
+                    self.connected = False
+                    self._ws = None
+                    if keepalive is not None:
+                        keepalive.cancel()
+
+                if self._stopped:
+                    break
+                logger.warning(f"⚠️ 账户推送已断开，{delay:.0f}秒后重连...")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def stop(self):
+        self._stopped = True
+        if self._ws is not None:
+            await self._ws.close()
@@ -1,11 +1,20 @@
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
+from datetime import datetime
+import argparse
+import gzip
+import json
 import os
+import queue
 import sys
+import threading
+import time
+import zlib
 
 # Ensure src is in path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from database import get_db
+import config
+from database import get_db, bucket_seconds, choose_bucket
 
 app = Flask(__name__, template_folder='templates')
 
@@ -13,33 +22,233 @@ app = Flask(__name__, template_folder='templates')
 def index():
     return render_template('dashboard.html')
 
+def make_etag(env, version, cursor_arg):
+    """ETag = 环境 + 数据版本 + 视图参数 (不含增量游标: 数据没变时任何游标的增量都是空的)"""
+    view = sorted((k, v) for k, v in request.args.items(multi=True) if k != cursor_arg)
+    return f"{env}-{version}-{zlib.crc32(repr(view).encode()):08x}"
+
+class CachedJSON:
+    """一个请求的 ETag 与响应体: 响应体首次需要时才生成，JSON 与 gzip 结果都只算一次"""
+
+    def __init__(self, etag, build):
+        self.etag = etag
+        self.build = build
+        self.body = None
+        self.gzipped = None
+        self._lock = threading.Lock()
+
+    def payload(self, compressed):
+        with self._lock:
+            if self.body is None:
+                self.body = json.dumps(self.build()).encode()
+            if compressed and self.gzipped is None:
+                self.gzipped = gzip.compress(self.body, compresslevel=5)
+        return self.gzipped if compressed else self.body
+
+    def response(self):
+        """If-None-Match 命中时直接返回 304，不查询数据、不序列化"""
+        if request.if_none_match.contains(self.etag):
+            response = app.response_class(status=304)
+        else:
+            # 小响应压缩收益不抵开销
+            compressed = 'gzip' in request.accept_encodings and len(self.payload(False)) >= config.WEB_GZIP_MIN_SIZE
+            response = app.response_class(self.payload(compressed), mimetype='application/json')
+            if compressed:
+                response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        response.set_etag(self.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+class ResponseCache:
+    """
+    短 TTL 响应缓存: 多个页面同时轮询时，TTL 内相同的请求只查一次数据库、只序列化/压缩一次
+    键包含数据库的 generation，SSE 推送新记录后页面的补拉请求不会拿到推送前的旧缓存
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = {}  # {key: (expires, CachedJSON)}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+        if item and item[0] > time.monotonic():
+            return item[1]
+        return None
+
+    def put(self, key, entry, ttl):
+        """并发未命中时保留先放入的那一份，响应体只生成一次"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item and item[0] > now:
+                return item[1]
+            self._entries[key] = (now + ttl, entry)
+            if len(self._entries) > self.max_entries:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                # 仍然超出: 按放入顺序淘汰最旧的
+                for k in list(self._entries)[:len(self._entries) - self.max_entries]:
+                    del self._entries[k]
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+response_cache = ResponseCache()
+
+def cached_json(env, db, cursor_arg, load):
+    """
+    load() -> (数据版本, build)；缓存键为路径 + 全部参数 (含游标)，TTL 内命中时不访问数据库
+    WEB_CACHE_TTL 为 0 时不缓存 (仍然支持 ETag / gzip)
+    """
+    key = (request.path, env, db.generation, tuple(sorted(request.args.items(multi=True))))
+    entry = response_cache.get(key)
+    if entry is None:
+        version, build = load()
+        entry = CachedJSON(make_etag(env, version, cursor_arg), build)
+        if config.WEB_CACHE_TTL > 0:
+            entry = response_cache.put(key, entry, config.WEB_CACHE_TTL)
+    return entry.response()
+
 @app.route('/api/equity')
 def api_equity():
+    """
+    权益曲线，参数 (均可选):
+    start / end: epoch 秒，默认为全部历史
+    bucket: '15m' / '1h' / '1d' 等；默认 auto (按区间长度选择，点数不超过 EQUITY_MAX_POINTS)；raw 为最近 1000 条原始记录
+    after: 增量游标 (上次响应的 last_ts)，只返回从该时刻所在时间桶开始的数据，客户端用它替换同一时刻及之后的点
+    """
     env = request.args.get('env', 'live')
     db = get_db(env)
     if not db:
         return jsonify({'error': 'Invalid environment'}), 400
-        
-    data = db.get_equity_history()
-    # Format for Plotly: x=times, y=values
-    return jsonify({
-        'x': [row[0] for row in data],
-        'y': [row[1] for row in data]
-    })
+
+    bucket = request.args.get('bucket', 'auto')
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+    after = request.args.get('after', type=int)
+
+    def load():
+        max_rowid, last_ts = db.get_equity_version()
+        return max_rowid, lambda: build(last_ts)
+
+    def build(last_ts):
+        if last_ts is None:
+            return {'x': [], 'y': [], 'min': [], 'max': [], 'bucket': None, 'last_ts': None}
+
+        if bucket == 'raw':
+            if after is None:
+                data = db.get_equity_history()
+            else:
+                data = db.get_equity_history(start=after)
+            # Format for Plotly: x=times, y=values
+            y = [row[1] for row in data]
+            return {'x': [row[0] for row in data], 'y': y, 'min': y, 'max': y, 'bucket': 'raw', 'last_ts': last_ts}
+
+        if bucket == 'auto':
+            first_ts, _ = db.get_equity_range()
+            size_name = choose_bucket(start or first_ts, end or last_ts + 1, config.EQUITY_MAX_POINTS)
+        else:
+            size_name = bucket
+        query_start = start
+        if after is not None:
+            # 游标所在的桶可能又有新快照 (最后值/最高/最低会变)，从该桶起重新聚合
+            size = bucket_seconds(size_name)
+            query_start = max(start or 0, after // size * size)
+        data = db.get_equity_history(query_start, end, bucket=size_name)
+        return {
+            'x': [datetime.fromtimestamp(row[0]).isoformat() for row in data],
+            'y': [row[3] for row in data],
+            'min': [row[1] for row in data],
+            'max': [row[2] for row in data],
+            'bucket': size_name,
+            'last_ts': last_ts
+        }
+
+    try:
+        return cached_json(env, db, 'after', load)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
 @app.route('/api/operations')
 def api_operations():
+    """
+    最近操作记录 (id 降序)
+    after_id: 增量游标 (客户端已有的最大 id)，只返回更新的记录
+    """
     env = request.args.get('env', 'live')
     db = get_db(env)
     if not db:
         return jsonify({'error': 'Invalid environment'}), 400
 
-    data = db.get_recent_operations()
-    return jsonify(data)
+    after_id = request.args.get('after_id', type=int)
+    return cached_json(env, db, 'after_id',
+                       lambda: (db.get_operations_version(), lambda: db.get_recent_operations(after_id=after_id)))
+
+@app.route('/api/stream')
+def api_stream():
+    """
+    Server-Sent Events: 新的权益快照 (event: equity) 与操作记录 (event: operation) 实时推送
+    数据库每个新记录只查询一次，再分发给所有连接，负载与事件数相关而与打开的页面数无关；
+    客户端积压过多时收到 event: reset，应重新全量加载
+    """
+    env = request.args.get('env', 'live')
+    db = get_db(env)
+    if not db:
+        return jsonify({'error': 'Invalid environment'}), 400
+
+    # 机器人在另一个进程写库: 由一个后台线程低频检查新记录 (同进程写入时由写入线程直接发布)
+    db.watch(config.SSE_POLL_INTERVAL)
+    subscription = db.subscribe()
+
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event, data = subscription.get(timeout=config.SSE_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'  # 防止代理断开空闲连接
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            db.events.unsubscribe(subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def run_server(host='0.0.0.0', port=5001, production=None, threads=None):
+    """
+    production: 使用 waitress 多线程 WSGI 服务 (默认取 WEB_SERVER_MODE)；否则为 Flask 开发服务器
+    每个打开 SSE 推送的页面会一直占用一个线程，threads 需大于同时打开的页面数
+    """
+    production = config.WEB_SERVER_MODE == 'production' if production is None else production
+    if not production:
+        # Run on 0.0.0.0 to be accessible externally if needed, port 5001
+        app.run(host=host, port=port, debug=False, threaded=True)
+        return
 
-def run_server():
-    # Run on 0.0.0.0 to be accessible externally if needed, port 5001
-    app.run(host='0.0.0.0', port=5001, debug=False)
+    try:
+        from waitress import serve
+    except ImportError:
+        print("❌ 生产模式需要 waitress: pip install waitress")
+        print("   或使用 gunicorn: gunicorn --chdir src -k gthread -w 1 --threads 128 -b 0.0.0.0:5001 web_server:app")
+        sys.exit(1)
+    threads = threads or config.WEB_THREADS
+    print(f"🌐 Web 面板 (waitress, {threads} 线程): http://{host}:{port}")
+    # 连接上限需容纳全部 SSE 长连接；channel_timeout 大于 SSE 保活间隔，空闲推送连接不会被断开
+    serve(app, host=host, port=port, threads=threads, connection_limit=max(threads * 2, 100),
+          channel_timeout=max(120, config.SSE_KEEPALIVE * 4), ident='Qtrading')
 
 if __name__ == '__main__':
-    run_server()
+    parser = argparse.ArgumentParser(description="Qtrading Web 面板")
+    parser.add_argument('--prod', action='store_true', default=None, help='使用 waitress 生产服务器')
+    parser.add_argument('--dev', action='store_false', dest='prod', help='使用 Flask 开发服务器')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--threads', type=int, default=None, help='生产模式工作线程数 (默认 WEB_THREADS)')
+    args = parser.parse_args()
+    run_server(args.host, args.port, args.prod, args.threads)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+离线测试用的合成行情 (不依赖 ClickHouse / 交易所)
+
+生成 5m K线随机游走，并按 data_loader.prepare_strategy_data 的方式
+合并 15m / 1h 周期列，得到与真实回测输入结构一致的 DataFrame。
+"""
+import numpy as np
+import pandas as pd
+
+
+def make_5m_bars(n_bars=20000, start='2024-01-01', seed=7, start_price=40000.0):
+    rng = np.random.default_rng(seed)
+
+    # 分段漂移 (制造 1H 多空趋势切换) + 波动
+    drift = np.repeat(rng.normal(0, 0.0004, n_bars // 500 + 1), 500)[:n_bars]
+    returns = drift + rng.normal(0, 0.003, n_bars)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[start_price], close[:-1]])
+
+    wick = np.abs(rng.normal(0, 0.002, (2, n_bars))) * close
+    high = np.maximum(open_, close) + wick[0]
+    low = np.minimum(open_, close) - wick[1]
+    volume = rng.uniform(10, 100, n_bars)
+
+    index = pd.date_range(start, periods=n_bars, freq='5min', name='timestamp')
+    return pd.DataFrame(
+        {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume},
+        index=index
+    )
+
+
+def resample_bars(df_5m, rule):
+    return df_5m.resample(rule, label='left', closed='left').agg({
+        'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
+    }).dropna()
+
+
+def make_strategy_frame(n_bars=20000, start='2024-01-01', seed=7):
+    """与 prepare_strategy_data 输出结构一致的合并表"""
+    df_5m = make_5m_bars(n_bars, start, seed)
+    df_15m = resample_bars(df_5m, '15min')
+    df_1h = resample_bars(df_5m, '1h')
+
+    df_15m.columns = [f"15m_{col}" for col in df_15m.columns]
+    df_1h.columns = [f"1h_{col}" for col in df_1h.columns]
+
+    merged = pd.merge_asof(df_5m.reset_index(), df_15m.reset_index(), on='timestamp', direction='backward')
+    merged = pd.merge_asof(merged, df_1h.reset_index(), on='timestamp', direction='backward')
+    merged.set_index('timestamp', inplace=True)
+    merged.dropna(inplace=True)
+    return merged
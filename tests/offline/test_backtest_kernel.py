@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+状态机内核测试: backtest_kernel 与 numpy 引擎逐项一致 (numba 编译版与纯 NumPy 版)
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+sys.path.append(os.path.dirname(__file__))
+
+import backtester
+import backtest_kernel
+from synthetic_data import make_strategy_frame
+
+
+def run_engine(df, engine):
+    bt = backtester.Backtester(df.copy())
+    equity_df = bt.run(engine=engine)
+    return bt, equity_df
+
+
+def assert_kernel_matches(df):
+    bt_ref, equity_ref = run_engine(df, 'numpy')
+    bt_kernel, equity_kernel = run_engine(df, 'kernel')
+
+    pd.testing.assert_frame_equal(equity_ref, equity_kernel, check_exact=True, check_names=False)
+    assert [vars(t) for t in bt_ref.trades] == [vars(t) for t in bt_kernel.trades]
+    assert [vars(t) for t in bt_ref.open_trades] == [vars(t) for t in bt_kernel.open_trades]
+    assert bt_ref.capital == bt_kernel.capital
+    assert bt_ref.get_stats() == bt_kernel.get_stats()
+
+
+def test_kernel_matches_numpy_engine():
+    assert_kernel_matches(make_strategy_frame(n_bars=20000, seed=7))
+
+
+def test_kernel_daily_limits(monkeypatch):
+    monkeypatch.setattr(backtester.config, 'MAX_TRADES_PER_DAY', 2)
+    monkeypatch.setattr(backtester.config, 'MAX_DAILY_LOSS', -0.5)
+    monkeypatch.setattr(backtester.config, 'MAX_CONSECUTIVE_LOSS', 1)
+    monkeypatch.setattr(backtester.config, 'MOVE_SL_TO_BE_AFTER_TP1', False)
+    assert_kernel_matches(make_strategy_frame(n_bars=15000, seed=11))
+
+
+def test_kernel_pure_numpy_fallback(monkeypatch):
+    # 无 numba 时内核以原始 Python 函数运行，结果必须一致
+    if backtest_kernel.NUMBA_AVAILABLE:
+        monkeypatch.setattr(backtest_kernel, '_simulate', backtest_kernel._simulate.py_func)
+    assert_kernel_matches(make_strategy_frame(n_bars=8000, seed=3))
+
+
+def test_kernel_fills_add_up():
+    bt = backtester.Backtester(make_strategy_frame(n_bars=20000, seed=7))
+    bt.df = bt.strategy.calculate_indicators(bt.df).dropna()
+    result = backtest_kernel.simulate_trades(bt.df, bt.signal_array())
+
+    fills = result['fills']
+    trades = result['trades']
+    assert set(fills['reason']) <= {'SL', 'TP1', 'TP2'}
+    # 每笔交易的 pnl = 其所有成交的净盈亏之和
+    per_trade = fills.groupby('trade_id')['pnl'].sum()
+    traded = trades.set_index('trade_id').loc[per_trade.index, 'pnl']
+    np.testing.assert_allclose(per_trade.to_numpy(), traded.to_numpy())
+    np.testing.assert_allclose(result['final_capital'], backtester.config.INITIAL_CAPITAL + fills['pnl'].sum())
+
+
+if __name__ == "__main__":
+    test_kernel_matches_numpy_engine()
+    print("✅ 状态机内核验证通过")
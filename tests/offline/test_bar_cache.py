@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+本地 K 线缓存测试: 只查询缺失月份、重复读取不访问 ClickHouse、可失效、不缓存未入库完整的月份
+"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+sys.path.append(os.path.dirname(__file__))
+
+import bar_cache
+import data_loader
+from synthetic_data import make_5m_bars, resample_bars
+
+BARS_5M = make_5m_bars(n_bars=60000, start='2024-01-01', seed=1)  # ~7 个月
+NOW = '2025-01-01'
+
+
+class FakeClickHouse:
+    """按 [start, end) / [start, end] 返回合成 K 线，并记录查询次数"""
+    def __init__(self, until=None):
+        self.calls = []
+        self.until = pd.Timestamp(until) if until else None  # 模拟只入库到该时刻
+
+    def bars(self, timeframe):
+        rule = {'5m': '5min', '15m': '15min', '1h': '1h'}[timeframe]
+        return BARS_5M if timeframe == '5m' else resample_bars(BARS_5M, rule)
+
+    def query(self, timeframe, start, end, include_end=True, table=None):
+        self.calls.append((timeframe, str(start), str(end)))
+        df = self.bars(timeframe)
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        mask = (df.index >= start) & ((df.index <= end) if include_end else (df.index < end))
+        if self.until is not None:
+            mask &= df.index < self.until
+        return df[mask]
+
+    def fetch_month(self, timeframe, month_start, month_end):
+        return self.query(timeframe, month_start, month_end, include_end=False)
+
+
+def test_only_missing_months_are_fetched(tmp_path):
+    ch = FakeClickHouse()
+
+    df = bar_cache.load_bars('5m', '2024-02-01', '2024-03-15', ch.fetch_month,
+                             table='t', cache_dir=str(tmp_path), now=NOW)
+    assert len(ch.calls) == 2
+    pd.testing.assert_frame_equal(df, ch.query('5m', '2024-02-01', '2024-03-15'), check_freq=False)
+
+    # 完全命中缓存
+    ch.calls.clear()
+    bar_cache.load_bars('5m', '2024-02-10', '2024-03-01', ch.fetch_month,
+                        table='t', cache_dir=str(tmp_path), now=NOW)
+    assert ch.calls == []
+
+    # 部分重叠: 只补 2024-04
+    df = bar_cache.load_bars('5m', '2024-03-01', '2024-04-20', ch.fetch_month,
+                             table='t', cache_dir=str(tmp_path), now=NOW)
+    assert [c[1][:7] for c in ch.calls] == ['2024-04']
+    pd.testing.assert_frame_equal(df, ch.query('5m', '2024-03-01', '2024-04-20'), check_freq=False)
+
+    assert bar_cache.info(table='t', cache_dir=str(tmp_path)) == {'5m': ['2024-02', '2024-03', '2024-04']}
+
+
+def test_incomplete_and_empty_months_are_not_cached(tmp_path):
+    ch = FakeClickHouse()
+    # 2024-03 尚未结束 (now = 2024-03-10)；2023-12 没有数据
+    bar_cache.load_bars('1h', '2023-12-01', '2024-03-05', ch.fetch_month,
+                        table='t', cache_dir=str(tmp_path), now='2024-03-10')
+    assert bar_cache.info(table='t', cache_dir=str(tmp_path)) == {'1h': ['2024-01', '2024-02']}
+
+
+def test_truncated_month_is_refetched(tmp_path):
+    # 2024-03 只入库到 15 日 (导入中断 / 日线脚本滞后)，月份本身已结束
+    ch = FakeClickHouse(until='2024-03-15')
+    df = bar_cache.load_bars('5m', '2024-02-01', '2024-03-31', ch.fetch_month,
+                             table='t', cache_dir=str(tmp_path), now=NOW)
+    assert df.index.max() < pd.Timestamp('2024-03-15')
+    assert bar_cache.info(table='t', cache_dir=str(tmp_path)) == {'5m': ['2024-02']}
+
+    # 补录完成后重新查询并缓存
+    ch.until, ch.calls = None, []
+    df = bar_cache.load_bars('5m', '2024-02-01', '2024-03-31', ch.fetch_month,
+                             table='t', cache_dir=str(tmp_path), now=NOW)
+    assert [c[1][:7] for c in ch.calls] == ['2024-03']
+    pd.testing.assert_frame_equal(df, ch.query('5m', '2024-02-01', '2024-03-31'), check_freq=False)
+    assert bar_cache.info(table='t', cache_dir=str(tmp_path)) == {'5m': ['2024-02', '2024-03']}
+
+    # 旧版本写入的截断文件: 读取时发现未到月末，重新查询并覆盖
+    truncated = ch.query('5m', '2024-04-01', '2024-04-10', include_end=False)
+    bar_cache.write_month(bar_cache.month_path('t', '5m', pd.Timestamp('2024-04-01'), str(tmp_path)), truncated)
+    ch.calls.clear()
+    df = bar_cache.load_bars('5m', '2024-04-01', '2024-04-30', ch.fetch_month,
+                             table='t', cache_dir=str(tmp_path), now=NOW)
+    assert [c[1][:7] for c in ch.calls] == ['2024-04'] and df.index.max() > pd.Timestamp('2024-04-29')
+
+
+def test_empty_range(tmp_path):
+    ch = FakeClickHouse()
+    for start, end in (('2024-03-10', '2024-02-01'), ('2030-01-01', '2030-01-02')):
+        df = bar_cache.load_bars('5m', start, end, ch.fetch_month, table='t', cache_dir=str(tmp_path), now=NOW)
+        assert df.empty and list(df.columns) == bar_cache.OHLCV_COLUMNS
+        assert isinstance(df.index, pd.DatetimeIndex) and df.index.name == 'timestamp'
+
+
+def test_clear_invalidates(tmp_path):
+    ch = FakeClickHouse()
+    bar_cache.load_bars('15m', '2024-01-01', '2024-02-28', ch.fetch_month,
+                        table='t', cache_dir=str(tmp_path), now=NOW)
+    assert bar_cache.clear(table='t', timeframe='15m', month='2024-01', cache_dir=str(tmp_path)) == 1
+
+    ch.calls.clear()
+    bar_cache.load_bars('15m', '2024-01-01', '2024-02-28', ch.fetch_month,
+                        table='t', cache_dir=str(tmp_path), now=NOW)
+    assert [c[1][:7] for c in ch.calls] == ['2024-01']
+
+    assert bar_cache.clear(table='t', cache_dir=str(tmp_path)) == 2
+    assert bar_cache.info(table='t', cache_dir=str(tmp_path)) == {}
+
+
+def test_prepare_strategy_data_uses_cache(tmp_path, monkeypatch):
+    ch = FakeClickHouse()
+    monkeypatch.setattr(data_loader, 'query_aggregated_data', ch.query)
+    monkeypatch.setattr(data_loader.config, 'BAR_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(data_loader.config, 'BAR_CACHE_ENABLED', True)
+
+    first = data_loader.prepare_strategy_data('2024-01-01', '2024-03-01')
+    assert len(ch.calls) == 3  # 只查询 5m, 3 个月
+
+    ch.calls.clear()
+    second = data_loader.prepare_strategy_data('2024-01-01', '2024-03-01')
+    assert ch.calls == []
+    pd.testing.assert_frame_equal(first, second)
+
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        test_only_missing_months_are_fetched(d)
+    print("✅ K 线缓存验证通过")
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+批量保护单测试 (模拟交易所): 开仓后 SL/TP1/TP2 一次 batchOrders 提交、单腿失败重试、止损失败回滚、
+批量请求报错后按客户端订单号确认各腿
+"""
+import os
+import sys
+import types
+
+import ccxt
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+
+import live_bot
+from market_metadata import MarketMetadata
+
+
+class FakeExchange:
+    def __init__(self, batch_errors=(), single_errors=(), batch_raises=False, batch_accepted=False,
+                 query_raises=False):
+        self.markets = {'BTC/USDT': {}}
+        self.batch_errors = set(batch_errors)     # 批量请求中被拒绝的订单类型
+        self.single_errors = set(single_errors)   # 单独下单也会被拒绝的订单类型
+        self.batch_raises = batch_raises
+        self.batch_accepted = batch_accepted      # 批量请求报错前交易所已接受全部腿 (如响应超时)
+        self.query_raises = query_raises
+        self.orders = {}                          # {clientOrderId: 订单} 交易所上的挂单
+        self.calls = []
+        self.next_id = 100
+
+    def amount_to_precision(self, symbol, amount):
+        return f"{amount:.3f}"
+
+    def price_to_precision(self, symbol, price):
+        return f"{price:.1f}"
+
+    def _accept(self, order):
+        self.next_id += 1
+        result = {'orderId': self.next_id, 'type': order['type'], 'avgPrice': '40010.0', 'status': 'NEW'}
+        if 'newClientOrderId' in order:
+            if order['newClientOrderId'] in self.orders:
+                raise Exception('Duplicate clientOrderId')
+            self.orders[order['newClientOrderId']] = result
+        return result
+
+    def _kind(self, order):
+        return 'SL' if order['type'] == 'STOP_MARKET' else order['type']
+
+    def fapiPrivatePostOrder(self, order):
+        self.calls.append(('order', dict(order)))
+        if self._kind(order) in self.single_errors:
+            raise Exception('Order would immediately trigger')
+        return self._accept(order)
+
+    def fapiPrivatePostBatchOrders(self, params):
+        self.calls.append(('batch', [dict(o) for o in params['batchOrders']]))
+        if self.batch_raises:
+            if self.batch_accepted:
+                for o in params['batchOrders']:
+                    self._accept(o)
+            raise Exception('Read timed out')
+        return [{'code': -2021, 'msg': 'Order would immediately trigger.'}
+                if self._kind(o) in self.batch_errors else self._accept(o)
+                for o in params['batchOrders']]
+
+    def fapiPrivateGetOrder(self, params):
+        self.calls.append(('query', dict(params)))
+        if self.query_raises:
+            raise Exception('Read timed out')
+        if params['origClientOrderId'] not in self.orders:
+            raise ccxt.OrderNotFound('Order does not exist.')
+        return self.orders[params['origClientOrderId']]
+
+    def fapiPrivateDeleteOrder(self, params):
+        self.calls.append(('cancel', dict(params)))
+        order = self.orders.pop(params['origClientOrderId'], None)
+        if order is None:
+            raise ccxt.OrderNotFound('Unknown order sent.')
+        return {'orderId': order['orderId'], 'status': 'CANCELED'}
+
+
+def make_bot(exchange):
+    bot = live_bot.LiveBot.__new__(live_bot.LiveBot)
+    bot.symbol = 'BTC/USDT'
+    bot.api_ready = True
+    bot.exchange = exchange
+    bot.market_meta = MarketMetadata(exchange)
+    bot.market_meta.table = {'BTC/USDT': {}}
+    bot.operations = []
+    bot.notifications = []
+    bot.db = types.SimpleNamespace(log_operation=lambda *args: bot.operations.append(args[2:5]))
+    bot.send_notification = lambda title, message: bot.notifications.append(title)
+    return bot
+
+
+def place(bot):
+    return bot.place_orders('LONG', 0.01, 40000.0, 39500.0, 40500.0, 41500.0)
+
+
+def test_protective_orders_in_one_batch():
+    exchange = FakeExchange()
+    result = place(make_bot(exchange))
+
+    assert result['success'] and result['avg_price'] == 40010.0
+    assert 'protect_latency_ms' in result
+    kinds = [kind for kind, _ in exchange.calls]
+    assert kinds == ['order', 'batch']   # 开仓 + 一次批量保护单
+    legs = exchange.calls[1][1]
+    assert [o['type'] for o in legs] == ['STOP_MARKET', 'LIMIT', 'LIMIT']
+    assert all(o['reduceOnly'] == 'true' and o['side'] == 'SELL' for o in legs)
+    assert legs[0]['stopPrice'] == '39500.0' and legs[0]['quantity'] == '0.010'
+    assert len({o['newClientOrderId'] for o in legs}) == 3
+    assert float(legs[1]['quantity']) + float(legs[2]['quantity']) == 0.01
+
+
+def test_failed_leg_is_retried_individually():
+    exchange = FakeExchange(batch_errors={'LIMIT'})
+    bot = make_bot(exchange)
+    result = place(bot)
+
+    assert result['success']
+    kinds = [kind for kind, _ in exchange.calls]
+    assert kinds == ['order', 'batch', 'order', 'order']
+    assert [op[0] for op in bot.operations] == ['ENTRY', 'STOP_LOSS_ORDER', 'TP1_ORDER', 'TP2_ORDER']
+    assert not bot.notifications
+
+
+def test_take_profit_failure_keeps_stop_loss():
+    exchange = FakeExchange(batch_errors={'LIMIT'}, single_errors={'LIMIT'})
+    bot = make_bot(exchange)
+    result = place(bot)
+
+    assert result['success']
+    assert not any(kind == 'cancel' for kind, _ in exchange.calls)
+    assert bot.notifications == ['⚠️ 止盈挂单失败']
+
+
+def test_stop_loss_failure_rolls_back():
+    exchange = FakeExchange(batch_errors={'SL'}, single_errors={'SL'})
+    bot = make_bot(exchange)
+    result = place(bot)
+
+    assert not result['success'] and result['rolled_back']
+    cancels = [params for kind, params in exchange.calls if kind == 'cancel']
+    assert len(cancels) == 2   # TP1 / TP2 撤单
+    assert not exchange.orders
+    close = exchange.calls[-1][1]
+    assert close['type'] == 'MARKET' and close['side'] == 'SELL' and close['reduceOnly'] == 'true'
+    assert close['quantity'] == '0.010'
+    assert 'ROLLBACK' in [op[0] for op in bot.operations]
+
+
+def test_batch_request_failure_falls_back_to_single_orders():
+    exchange = FakeExchange(batch_raises=True)
+    result = place(make_bot(exchange))
+
+    assert result['success']
+    kinds = [kind for kind, _ in exchange.calls]
+    assert kinds == ['order', 'batch', 'query', 'query', 'query', 'order', 'order', 'order']
+
+
+def test_batch_accepted_before_failure_is_not_resent():
+    exchange = FakeExchange(batch_raises=True, batch_accepted=True)
+    bot = make_bot(exchange)
+    result = place(bot)
+
+    assert result['success']
+    kinds = [kind for kind, _ in exchange.calls]
+    assert kinds == ['order', 'batch', 'query', 'query', 'query']   # 三腿均已存在，不重发
+    assert len(exchange.orders) == 3
+    assert [op[0] for op in bot.operations] == ['ENTRY', 'STOP_LOSS_ORDER', 'TP1_ORDER', 'TP2_ORDER']
+
+
+def test_unconfirmed_legs_are_cancelled_on_rollback():
+    # 批量请求已被接受但查询也失败: 重试因订单号重复被拒，回滚须按订单号撤掉交易所上的三条保护单
+    exchange = FakeExchange(batch_raises=True, batch_accepted=True, query_raises=True)
+    bot = make_bot(exchange)
+    result = place(bot)
+
+    assert not result['success'] and result['rolled_back']
+    cancels = [params for kind, params in exchange.calls if kind == 'cancel']
+    assert len(cancels) == 3 and all('origClientOrderId' in c for c in cancels)
+    assert not exchange.orders
+    assert exchange.calls[-1][1]['type'] == 'MARKET'
+
+
+if __name__ == "__main__":
+    test_protective_orders_in_one_batch()
+    test_failed_leg_is_retried_individually()
+    test_take_profit_failure_keeps_stop_loss()
+    test_stop_loss_failure_rolls_back()
+    test_batch_request_failure_falls_back_to_single_orders()
+    test_batch_accepted_before_failure_is_not_resent()
+    test_unconfirmed_legs_are_cancelled_on_rollback()
+    print("✅ Batch order tests passed")
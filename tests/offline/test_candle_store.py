@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+实盘 K 线环形缓存测试: 增量同步后的结果必须与每次全量拉取最近 N 根完全一致
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+
+from candle_store import CandleStore
+
+BAR_MS = 5 * 60 * 1000
+
+
+class FakeKlineFeed:
+    """模拟 /fapi/v1/klines: 最后一根 K 线未收盘，每次行情推进都会变化"""
+
+    def __init__(self, n_bars=500, seed=1):
+        rng = np.random.default_rng(seed)
+        self.close = 40000 + np.cumsum(rng.normal(0, 20, n_bars))
+        self.now = 150          # 当前未收盘 K 线的下标
+        self.tick = 0
+        self.calls = []
+
+    def kline(self, i):
+        close = self.close[i] + (self.tick if i == self.now else 0)
+        return [i * BAR_MS, str(close - 5), str(close + 10), str(close - 10), str(close), str(100 + i), i * BAR_MS + BAR_MS - 1]
+
+    def request(self, limit, start_time=None):
+        self.calls.append((limit, start_time))
+        if start_time is None:
+            first = max(0, self.now - limit + 1)
+        else:
+            first = start_time // BAR_MS
+        return [self.kline(i) for i in range(first, min(first + limit, self.now + 1))]
+
+    def advance(self, bars):
+        self.now += bars
+        self.tick += 1
+
+
+def test_incremental_sync_matches_full_fetch():
+    feed = FakeKlineFeed()
+    store = CandleStore(100)
+
+    assert store.sync(feed.request, incremental_limit=10) == 1
+    assert feed.calls[-1] == (100, None)
+
+    for step in [0, 1, 0, 2, 1, 3, 8, 1]:
+        feed.advance(step)
+        calls_before = len(feed.calls)
+        requests = store.sync(feed.request, incremental_limit=10)
+
+        expected = pd.DataFrame([feed.kline(i) for i in range(feed.now - 99, feed.now + 1)]).iloc[:, :6]
+        df = store.to_frame()
+        assert len(df) == 100
+        np.testing.assert_array_equal(df['timestamp'].values, expected[0].astype('int64').values)
+        np.testing.assert_allclose(df['close'].values, expected[4].astype(float).values)
+
+        # 增量请求: 只发一次，从最后一根已存 K 线开始
+        assert requests == 1
+        assert feed.calls[calls_before][0] == 10 and feed.calls[calls_before][1] is not None
+
+    assert list(df.columns) == ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'datetime']
+
+
+def test_gap_rewarms_buffer():
+    feed = FakeKlineFeed()
+    store = CandleStore(100)
+    store.sync(feed.request, incremental_limit=10)
+
+    feed.advance(50)
+    assert store.sync(feed.request, incremental_limit=10) == 2
+    assert feed.calls[-1] == (100, None)
+    assert store.last_open_time == feed.now * BAR_MS
+    assert store.to_frame()['timestamp'].is_monotonic_increasing
+
+
+if __name__ == "__main__":
+    test_incremental_sync_matches_full_fetch()
+    test_gap_rewarms_buffer()
+    print("✅ Candle store tests passed")
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+月度 K 线 CSV 流式读取测试: 按块切分不丢行/不重复、末行无换行符、单行超过块大小、
+微秒时间戳转换为毫秒、输出 schema 为 timestamp[ms]
+"""
+import io
+import os
+import sys
+
+import pyarrow as pa
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../scripts'))
+
+from month_download_s_to_clickhouse import read_csv_chunks
+
+START_MS = 1735689600000   # 2025-01-01
+
+
+def make_csv(n_rows, scale=1, trailing_newline=True):
+    """scale=1000 时时间戳为微秒 (2025 年起币安月度归档的格式)"""
+    lines = [f"{(START_MS + i * 1000) * scale},100.{i % 10},101.0,99.0,100.5,1.5,"
+             f"{(START_MS + i * 1000 + 999) * scale},150.0,3,0.7,70.0,0" for i in range(n_rows)]
+    text = '\n'.join(lines) + ('\n' if trailing_newline else '')
+    return io.BytesIO(text.encode())
+
+
+def read_all(csv_file, block_size):
+    return pa.concat_tables(read_csv_chunks(csv_file, block_size))
+
+
+def assert_open_times(table, n_rows):
+    assert table.column('open_time').cast(pa.int64()).to_pylist() == [START_MS + i * 1000 for i in range(n_rows)]
+    assert table.column('close_time').cast(pa.int64()).to_pylist() == [START_MS + i * 1000 + 999 for i in range(n_rows)]
+
+
+def test_blocks_keep_every_row():
+    chunks = list(read_csv_chunks(make_csv(1000), block_size=997))
+    assert len(chunks) > 10
+    table = pa.concat_tables(chunks)
+    assert table.num_rows == 1000
+    assert_open_times(table, 1000)
+    assert table.schema.field('open_time').type == pa.timestamp('ms')
+    assert table.schema.field('close_time').type == pa.timestamp('ms')
+    assert 'ignore' not in table.column_names
+
+
+def test_last_line_without_newline():
+    table = read_all(make_csv(1000, trailing_newline=False), block_size=997)
+    assert table.num_rows == 1000
+    assert_open_times(table, 1000)
+
+
+def test_line_longer_than_block():
+    table = read_all(make_csv(50), block_size=16)   # 每行约 90 字节
+    assert table.num_rows == 50
+    assert_open_times(table, 50)
+
+
+def test_microsecond_timestamps_are_converted():
+    table = read_all(make_csv(500, scale=1000), block_size=997)
+    assert table.num_rows == 500
+    assert table.schema.field('open_time').type == pa.timestamp('ms')
+    assert_open_times(table, 500)
+
+
+if __name__ == "__main__":
+    test_blocks_keep_every_row()
+    test_last_line_without_newline()
+    test_line_longer_than_block()
+    test_microsecond_timestamps_are_converted()
+    print("✅ CSV chunk reader tests passed")
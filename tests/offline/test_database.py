@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+实盘记录库测试 (临时 SQLite 文件): 多线程写入批量提交、连接复用、读接口格式不变
+"""
+import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+
+from database import DBManager, bucket_seconds, choose_bucket
+
+BASE = 1_700_000_000 // 86400 * 86400   # UTC 零点
+
+
+def insert_equity(db, points):
+    """points: [(epoch 秒, equity)]"""
+    with db.connection() as conn:
+        conn.executemany(
+            'INSERT INTO equity_snapshots (timestamp, total_equity, unrealized_pnl, ts) VALUES (?, ?, 0, ?)',
+            [(datetime.datetime.fromtimestamp(ts).isoformat(), equity, ts) for ts, equity in points])
+
+
+def test_concurrent_writes_are_batched():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager('test', db_file=os.path.join(tmp, 'test.db'), flush_interval=0.05)
+
+        def writer(k):
+            for i in range(100):
+                db.log_equity(1000.0 + i)
+                db.log_operation('BTC/USDT', 'LONG', 'ENTRY', 40000.0 + i, 0.01, details={'writer': k})
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=writer, args=(k,)) for k in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        enqueue_seconds = time.perf_counter() - started
+
+        assert db.flush(10)
+        assert enqueue_seconds < 1.0   # 调用方只入队，不等待磁盘
+        with db.connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM trade_operations').fetchone()[0] == 400
+            # 同一微秒的权益快照 (主键冲突) 覆盖旧值，不会让整批写入回滚
+            assert 0 < conn.execute('SELECT COUNT(*) FROM equity_snapshots').fetchone()[0] <= 400
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1   # NORMAL
+
+
+def test_reads_reuse_pooled_connections():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager('test', db_file=os.path.join(tmp, 'test.db'), flush_interval=0)
+        db.log_equity(1000.0)
+        time.sleep(0.001)
+        db.log_equity(1010.0)
+        db.log_operation('BTC/USDT', 'SHORT', 'ENTRY', 40000.0, 0.01)
+        db.flush(5)
+
+        opened = []
+        original = db.get_connection
+        db.get_connection = lambda: opened.append(1) or original()
+        for _ in range(20):
+            history = db.get_equity_history()
+            operations = db.get_recent_operations()
+        assert len(opened) == 0   # init_db 时建立的连接被复用
+
+        assert [row[1] for row in history] == [1000.0, 1010.0]
+        assert isinstance(history[0], tuple)
+        assert operations[0]['side'] == 'SHORT' and operations[0]['action'] == 'ENTRY'
+        # 游标级 row_factory 不影响池中连接
+        with db.connection() as conn:
+            assert isinstance(conn.execute('SELECT 1').fetchone(), tuple)
+
+
+def test_bucketed_equity_history():
+    assert bucket_seconds('15m') == 900 and bucket_seconds('1d') == 86400
+    assert choose_bucket(0, 3 * 86400) == '5m'
+    assert choose_bucket(0, 30 * 86400) == '1h'
+    assert choose_bucket(0, 365 * 86400, max_points=500) == '1d'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager('test', db_file=os.path.join(tmp, 'test.db'))
+        # 两天的 5 分钟快照: equity = 第几根
+        insert_equity(db, [(BASE + i * 300, float(i)) for i in range(576)])
+
+        hourly = db.get_equity_history(bucket='1h')
+        assert len(hourly) == 48
+        assert hourly[0] == (BASE, 0.0, 11.0, 11.0)
+        assert hourly[-1] == (BASE + 47 * 3600, 564.0, 575.0, 575.0)
+
+        daily = db.get_equity_history(BASE + 86400, BASE + 2 * 86400, bucket='1d')
+        assert daily == [(BASE + 86400, 288.0, 575.0, 575.0)]
+
+        raw = db.get_equity_history(BASE, BASE + 3600)
+        assert [row[1] for row in raw] == [float(i) for i in range(12)]
+        assert db.get_equity_range() == (BASE, BASE + 575 * 300)
+
+        with db.connection() as conn:
+            detail = ' '.join(str(row) for row in conn.execute(
+                'EXPLAIN QUERY PLAN SELECT total_equity FROM equity_snapshots WHERE ts >= ? AND ts < ?', (0, 1)))
+        assert 'idx_equity_snapshots_ts' in detail
+
+
+def test_legacy_table_is_migrated():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'legacy.db')
+        moment = datetime.datetime(2024, 3, 1, 12, 30, 15, 123456)
+        with sqlite3.connect(path) as conn:
+            conn.execute('CREATE TABLE equity_snapshots (timestamp TEXT PRIMARY KEY, total_equity REAL, unrealized_pnl REAL)')
+            conn.execute('INSERT INTO equity_snapshots VALUES (?, 1234.5, 0)', (moment.isoformat(),))
+
+        db = DBManager('test', db_file=path)
+        with db.connection() as conn:
+            ts = conn.execute('SELECT ts FROM equity_snapshots').fetchone()[0]
+        assert ts == int(moment.timestamp())   # 本地时间文本 -> epoch 秒
+        assert db.get_equity_history(bucket='1h')[0][3] == 1234.5
+
+
+def test_equity_api_downsamples():
+    import web_server
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager('test', db_file=os.path.join(tmp, 'test.db'))
+        # 90 天的 5 分钟快照
+        insert_equity(db, [(BASE + i * 300, 1000.0 + i % 100) for i in range(90 * 288)])
+        original = web_server.get_db
+        web_server.get_db = lambda env: db
+        try:
+            client = web_server.app.test_client()
+            body = client.get('/api/equity').get_json()
+            assert body['bucket'] == '4h' and len(body['x']) == 540
+            assert len(body['y']) == len(body['min']) == len(body['max'])
+
+            body = client.get(f'/api/equity?start={BASE + 89 * 86400}').get_json()
+            assert body['bucket'] == '5m' and len(body['x']) == 288
+
+            assert len(client.get('/api/equity?bucket=raw').get_json()['x']) == 1000
+            assert client.get('/api/equity?bucket=7x').status_code == 400
+        finally:
+            web_server.get_db = original
+
+
+if __name__ == "__main__":
+    test_concurrent_writes_are_batched()
+    test_reads_reuse_pooled_connections()
+    test_bucketed_equity_history()
+    test_legacy_table_is_migrated()
+    test_equity_api_downsamples()
+    print("✅ Database tests passed")
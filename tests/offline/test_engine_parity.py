@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+回测引擎一致性测试: numpy 数组引擎 vs pandas iterrows 参考引擎
+
+运行: python -m pytest -q tests/offline
+"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+sys.path.append(os.path.dirname(__file__))
+
+import backtester
+from synthetic_data import make_strategy_frame
+
+
+def run_engine(df, engine):
+    bt = backtester.Backtester(df.copy())
+    equity_df = bt.run(engine=engine)
+    return bt, equity_df
+
+
+def trade_records(bt):
+    return [vars(t) for t in bt.trades]
+
+
+def assert_same_result(df):
+    bt_ref, equity_ref = run_engine(df, 'pandas')
+    bt_fast, equity_fast = run_engine(df, 'numpy')
+
+    pd.testing.assert_frame_equal(equity_ref, equity_fast, check_exact=True)
+    assert trade_records(bt_ref) == trade_records(bt_fast)
+    assert [vars(t) for t in bt_ref.open_trades] == [vars(t) for t in bt_fast.open_trades]
+    assert bt_ref.capital == bt_fast.capital
+    assert bt_ref.get_stats() == bt_fast.get_stats()
+    return bt_ref
+
+
+def test_engine_parity_default_config():
+    bt = assert_same_result(make_strategy_frame(n_bars=20000, seed=7))
+    # 确保样本覆盖了各种出场路径
+    reasons = {t.exit_reason for t in bt.trades}
+    assert {'SL', 'TP2'} <= reasons
+
+
+def test_engine_parity_daily_limits(monkeypatch):
+    # 收紧日内风控，覆盖熔断 / 次数限制分支
+    monkeypatch.setattr(backtester.config, 'MAX_TRADES_PER_DAY', 2)
+    monkeypatch.setattr(backtester.config, 'MAX_DAILY_LOSS', -0.5)
+    monkeypatch.setattr(backtester.config, 'MAX_CONSECUTIVE_LOSS', 1)
+    assert_same_result(make_strategy_frame(n_bars=15000, seed=11))
+
+
+def test_engine_parity_fixed_sl(monkeypatch):
+    monkeypatch.setattr(backtester.config, 'USE_ATR_FOR_SL', False)
+    monkeypatch.setattr(backtester.config, 'MOVE_SL_TO_BE_AFTER_TP1', False)
+    assert_same_result(make_strategy_frame(n_bars=15000, seed=3))
+
+
+if __name__ == "__main__":
+    test_engine_parity_default_config()
+    print("✅ 回测引擎一致性验证通过")
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Web 面板实时推送测试: 进程内发布/订阅、另一进程写库时的后台检查、SSE 接口输出
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+
+import config
+import web_server
+from database import DBManager
+from event_bus import EventBus
+
+
+def drain(subscription, n, timeout=5):
+    return [subscription.get(timeout=timeout) for _ in range(n)]
+
+
+def test_slow_subscriber_gets_reset():
+    bus = EventBus(maxsize=3)
+    fast, slow = bus.subscribe(), bus.subscribe()
+    for i in range(3):
+        bus.publish('operation', {'id': i})
+        assert fast.get(timeout=1) == ('operation', {'id': i})
+    bus.publish('operation', {'id': 3})
+    assert slow.get(timeout=1) == ('reset', {})
+    assert slow.queue.empty()
+
+    bus.unsubscribe(slow)
+    assert len(bus) == 1
+
+
+def test_writer_publishes_committed_rows():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager('test', db_file=os.path.join(tmp, 'test.db'), flush_interval=0.01)
+        db.log_operation('BTC/USDT', 'LONG', 'OLD', 1.0, 1.0)
+        db.flush(5)
+
+        subscriptions = [db.subscribe() for _ in range(3)]
+        db.log_equity(1234.5)
+        db.log_operation('BTC/USDT', 'LONG', 'ENTRY', 40000.0, 0.01)
+        db.flush(5)
+
+        for subscription in subscriptions:
+            (e1, equity), (e2, operation) = drain(subscription, 2)
+            assert e1 == 'equity' and equity['equity'] == 1234.5 and isinstance(equity['ts'], int)
+            assert e2 == 'operation' and operation['action'] == 'ENTRY'   # 订阅前的记录不补发
+            assert subscription.queue.empty()
+
+
+def test_watch_picks_up_other_process_writes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'test.db')
+        bot_db = DBManager('test', db_file=path, flush_interval=0)   # 机器人进程
+        web_db = DBManager('test', db_file=path)                     # Web 进程
+        web_db.watch(0.05)
+        subscription = web_db.subscribe()
+
+        bot_db.log_operation('ETH/USDT', 'SHORT', 'ENTRY', 3000.0, 1.0)
+        bot_db.flush(5)
+        event, operation = subscription.get(timeout=5)
+        assert event == 'operation' and operation['symbol'] == 'ETH/USDT'
+
+        bot_db.log_equity(999.0)
+        bot_db.flush(5)
+        assert subscription.get(timeout=5)[1]['equity'] == 999.0
+        web_db.events.unsubscribe(subscription)
+
+
+def test_sse_endpoint():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager('test', db_file=os.path.join(tmp, 'test.db'), flush_interval=0)
+        original_db, original_keepalive = web_server.get_db, config.SSE_KEEPALIVE
+        web_server.get_db = lambda env: db
+        config.SSE_KEEPALIVE = 0.05
+        try:
+            response = web_server.app.test_client().get('/api/stream', buffered=False)
+            assert response.mimetype == 'text/event-stream'
+            chunks = iter(response.response)
+            assert next(chunks) == b'retry: 3000\n\n'
+            assert next(chunks) == b': keep-alive\n\n'
+            assert len(db.events) == 1
+
+            db.log_operation('BTC/USDT', 'LONG', 'TP1_ORDER', 41000.0, 0.005)
+            db.flush(5)
+            chunk = next(chunks).decode()
+            while chunk.startswith(':'):
+                chunk = next(chunks).decode()
+            event_line, data_line = chunk.strip().split('\n')
+            assert event_line == 'event: operation'
+            assert json.loads(data_line[len('data: '):])['action'] == 'TP1_ORDER'
+
+            response.close()
+            assert len(db.events) == 0
+        finally:
+            web_server.get_db, config.SSE_KEEPALIVE = original_db, original_keepalive
+
+
+if __name__ == "__main__":
+    test_slow_subscriber_gets_reset()
+    test_writer_publishes_committed_rows()
+    test_watch_picks_up_other_process_writes()
+    test_sse_endpoint()
+    print("✅ Event stream tests passed")
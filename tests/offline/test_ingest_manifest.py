@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+ClickHouse 导入断点续传测试 (模拟 ClickHouse 客户端与下载，不联网):
+已完成月份不再下载/写入、崩溃后从下一个分块续传、已在表中但未记入清单的分块不重复写入、
+归档变化时删除该月重新导入、日线脚本按天记录
+"""
+import calendar
+import hashlib
+import io
+import os
+import re
+import sys
+import zipfile
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../scripts'))
+
+import month_download_s_to_clickhouse as month_ingest
+from ingest_manifest import Manifest
+
+MONTH = datetime(2025, 1, 1)
+START_MS = calendar.timegm(MONTH.timetuple()) * 1000
+N_ROWS = 300
+CHUNK_BYTES = 2048   # 约 25 行一个分块
+
+
+class FakeClient:
+    """按 open_time (epoch ms) 保存行，支持脚本用到的 count / DELETE / insert_arrow"""
+    def __init__(self):
+        self.rows = []
+        self.commands = []
+        self.inserts = []
+
+    def command(self, sql):
+        self.commands.append(sql)
+        bounds = [int(v) for v in re.findall(r'toInt64\((\d+)\)', sql)]
+        if sql.startswith('SELECT count()'):
+            return sum(1 for ts in self.rows if bounds[0] <= ts <= bounds[1])
+        if sql.startswith('ALTER TABLE'):
+            self.rows = [ts for ts in self.rows if not bounds[0] <= ts < bounds[1]]
+        return None
+
+    def insert_arrow(self, table_name, table):
+        self.inserts.append(table.num_rows)
+        self.rows.extend(table.column('open_time').cast(pa.int64()).to_pylist())
+
+
+def make_archive(price=100.0):
+    lines = [f"{START_MS + i * 1000},{price},{price + 1},{price - 1},{price},1.5,"
+             f"{START_MS + i * 1000 + 999},150.0,3,0.7,70.0,0" for i in range(N_ROWS)]
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w') as z:
+        z.writestr(f"BTCUSDT-1s-{MONTH:%Y-%m}.csv", '\n'.join(lines) + '\n')
+    return data.getvalue()
+
+
+def ingest(client, manifest, archive, insert=month_ingest.insert_stage, force=False):
+    """跑一次完整流水线，返回 (stages, 下载次数)"""
+    downloads = []
+
+    def download_file(url, desc, on_chunk=None):
+        downloads.append(url)
+        return io.BytesIO(archive)
+
+    patched = {
+        'download_file': download_file,
+        'verify_checksum': lambda url, data: hashlib.sha256(data.getbuffer()).hexdigest(),
+        'thread_client': lambda: client,
+        'CHUNK_BYTES': CHUNK_BYTES,
+    }
+    original = {name: getattr(month_ingest, name) for name in patched}
+    for name, value in patched.items():
+        setattr(month_ingest, name, value)
+    try:
+        stages = month_ingest.run_pipeline([MONTH], 1, 1, 1, report_interval=60,
+                                           insert=insert, manifest=manifest, force=force)
+    finally:
+        for name, value in original.items():
+            setattr(month_ingest, name, value)
+    return stages, len(downloads)
+
+
+def crash_after(k, inserted_but_unrecorded=False):
+    """写入分块 0..k 后崩溃；inserted_but_unrecorded 时分块 k+1 已写入表中但未记入清单"""
+    def insert(chunk, stage):
+        if chunk['index'] <= k:
+            return month_ingest.insert_stage(chunk, stage)
+        if chunk['index'] == k + 1 and inserted_but_unrecorded:
+            month_ingest.thread_client().insert_arrow('t', chunk['table'])
+        raise RuntimeError('killed')
+    return insert
+
+
+def unit():
+    return month_ingest.month_task(MONTH)['unit']
+
+
+def test_complete_month_is_skipped(tmp_path):
+    client, manifest = FakeClient(), Manifest(os.path.join(str(tmp_path), 'manifest.json'))
+    stages, downloads = ingest(client, manifest, make_archive())
+    assert downloads == 1
+    assert sorted(client.rows) == [START_MS + i * 1000 for i in range(N_ROWS)]
+    entry = manifest.get(unit())
+    assert entry['status'] == 'complete' and entry['rows'] == N_ROWS
+    assert len(entry['chunks']) == len(client.inserts) > 3
+
+    # 重新运行: 不下载、不写入 (清单从磁盘重新加载)
+    client.inserts.clear()
+    manifest = Manifest(manifest.path)
+    stages, downloads = ingest(client, manifest, make_archive())
+    assert downloads == 0 and client.inserts == []
+    assert stages[0].skipped == 1
+
+
+def test_crash_resumes_at_next_chunk(tmp_path):
+    client, manifest = FakeClient(), Manifest(os.path.join(str(tmp_path), 'manifest.json'))
+    stages, _ = ingest(client, manifest, make_archive(), insert=crash_after(2))
+    assert stages[2].failed > 0
+    entry = manifest.get(unit())
+    assert entry['status'] == 'partial' and sorted(entry['chunks']) == ['0', '1', '2']
+    n_first = len(client.rows)
+
+    client.inserts.clear()
+    ingest(client, Manifest(manifest.path), make_archive())
+    assert sum(client.inserts) == N_ROWS - n_first   # 只写入分块 3 之后的部分
+    assert sorted(client.rows) == [START_MS + i * 1000 for i in range(N_ROWS)]
+    assert Manifest(manifest.path).is_complete(unit())
+
+
+def test_chunk_in_table_but_not_in_manifest_is_not_reinserted(tmp_path):
+    client, manifest = FakeClient(), Manifest(os.path.join(str(tmp_path), 'manifest.json'))
+    ingest(client, manifest, make_archive(), insert=crash_after(1, inserted_but_unrecorded=True))
+    assert sorted(manifest.get(unit())['chunks']) == ['0', '1']
+    n_first = len(client.rows)   # 分块 0..2 已在表中
+
+    client.inserts.clear()
+    ingest(client, Manifest(manifest.path), make_archive())
+    assert sum(client.inserts) == N_ROWS - n_first
+    assert sorted(client.rows) == [START_MS + i * 1000 for i in range(N_ROWS)]   # 无重复行
+    entry = Manifest(manifest.path).get(unit())
+    assert entry['status'] == 'complete' and entry['rows'] == N_ROWS
+
+
+def test_changed_checksum_reloads_month(tmp_path):
+    client, manifest = FakeClient(), Manifest(os.path.join(str(tmp_path), 'manifest.json'))
+    ingest(client, manifest, make_archive(), insert=crash_after(2))
+    old_checksum = manifest.get(unit())['checksum']
+
+    # 归档被重新发布 (内容不同): 删除该月已有的行，清单重置后完整重新导入
+    client.inserts.clear()
+    client.commands.clear()
+    ingest(client, Manifest(manifest.path), make_archive(price=200.0))
+    assert any(sql.startswith('ALTER TABLE') for sql in client.commands)
+    assert not any(sql.startswith('SELECT count()') for sql in client.commands)
+    assert sum(client.inserts) == N_ROWS
+    assert sorted(client.rows) == [START_MS + i * 1000 for i in range(N_ROWS)]
+    entry = Manifest(manifest.path).get(unit())
+    assert entry['status'] == 'complete' and entry['rows'] == N_ROWS and entry['checksum'] != old_checksum
+
+
+def test_daily_rows_are_recorded_per_day(tmp_path):
+    import day_download_s_to_clickhouse as day_ingest
+    manifest = Manifest(os.path.join(str(tmp_path), 'manifest.json'))
+    day = datetime(2026, 1, 6)
+    day_ms = int(day.timestamp() * 1000)
+    # 第一天最后 10 秒 + 第二天前 5 秒，抓取到第二天中途
+    rows = [[day_ms + (86390 + i) * 1000, 1, 1, 1, 1, 1] for i in range(15)]
+    day_ingest.record_days(manifest, rows, rows[-1][0], complete=True)
+
+    first = manifest.get(day_ingest.day_unit('2026-01-06'))
+    second = manifest.get(day_ingest.day_unit('2026-01-07'))
+    assert first['status'] == 'complete' and first['rows'] == 10
+    assert second['status'] == 'partial' and second['rows'] == 5
+
+    # 续传第二天剩余部分: 行数累加，校验和链式更新
+    next_day_ms = int((day + timedelta(days=1)).timestamp() * 1000)
+    more = [[next_day_ms + i * 1000, 1, 1, 1, 1, 1] for i in range(5, 86400)]
+    day_ingest.record_days(manifest, more, next_day_ms + 86400 * 1000, complete=True)
+    second_after = manifest.get(day_ingest.day_unit('2026-01-07'))
+    assert second_after['status'] == 'complete' and second_after['rows'] == 86400
+    assert second_after['checksum'] != second['checksum']
+
+
+if __name__ == "__main__":
+    import tempfile
+    for test in (test_complete_month_is_skipped, test_crash_resumes_at_next_chunk,
+                 test_chunk_in_table_but_not_in_manifest_is_not_reinserted,
+                 test_changed_checksum_reloads_month, test_daily_rows_are_recorded_per_day):
+        with tempfile.TemporaryDirectory() as d:
+            test(d)
+    print("✅ Ingest manifest tests passed")
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+月度导入流水线测试 (download -> parse -> insert 均为模拟函数): 多线程下每个任务都到达 insert、
+单个任务失败只计入 failed、生成器结果逐个转发、有界队列反压且不死锁
+"""
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../scripts'))
+
+from month_download_s_to_clickhouse import run_pipeline
+
+MONTHS = [datetime(2024 + i // 12, i % 12 + 1, 1) for i in range(20)]
+LABELS = {m.strftime('%Y-%m') for m in MONTHS}
+
+
+def passthrough(task, stage):
+    return task
+
+
+def run(timeout=10, **kwargs):
+    """在后台线程中运行流水线，超时视为死锁"""
+    result = {}
+    runner = threading.Thread(target=lambda: result.update(stages=run_pipeline(MONTHS, report_interval=60, **kwargs)),
+                              daemon=True)
+    runner.start()
+    runner.join(timeout)
+    assert not runner.is_alive(), "pipeline did not finish"
+    return result['stages']
+
+
+def test_every_task_reaches_insert():
+    inserted = []
+    lock = threading.Lock()
+
+    def insert(task, stage):
+        time.sleep(0.001)
+        with lock:
+            inserted.append(task['label'])
+        return task
+
+    stages = run(download_workers=3, parse_workers=2, insert_workers=3, queue_size=2,
+                 download=passthrough, parse=passthrough, insert=insert)
+    assert sorted(inserted) == sorted(LABELS)
+    assert [s.done for s in stages] == [len(MONTHS)] * 3
+    assert all(s.failed == 0 and s.skipped == 0 for s in stages)
+
+
+def test_failing_task_only_counts_as_failed():
+    inserted = []
+
+    def download(task, stage):
+        if task['label'] == '2024-05':
+            raise ConnectionError('reset by peer')
+        if task['label'] == '2024-06':
+            return None   # 尚未发布的归档
+        return task
+
+    stages = run(download_workers=2, parse_workers=2, insert_workers=2,
+                 download=download, parse=passthrough,
+                 insert=lambda task, stage: inserted.append(task['label']) or task)
+    assert stages[0].failed == 1 and stages[0].skipped == 1 and stages[0].done == len(MONTHS) - 2
+    assert sorted(inserted) == sorted(LABELS - {'2024-05', '2024-06'})
+
+
+def test_generator_items_are_forwarded_one_by_one():
+    first_inserted = threading.Event()
+    handed_on_early = []
+    inserted = []
+    lock = threading.Lock()
+
+    def parse(task, stage):
+        for index in range(5):
+            yield {'label': task['label'], 'index': index}
+            if index == 0 and task['label'] == '2024-01':
+                # 第一个分块在生成器结束前就应到达 insert
+                handed_on_early.append(first_inserted.wait(5))
+
+    def insert(chunk, stage):
+        with lock:
+            inserted.append((chunk['label'], chunk['index']))
+        if chunk['label'] == '2024-01' and chunk['index'] == 0:
+            first_inserted.set()
+        return chunk
+
+    stages = run(download_workers=1, parse_workers=1, insert_workers=1, queue_size=1,
+                 download=passthrough, parse=parse, insert=insert)
+    assert handed_on_early == [True]
+    assert len(inserted) == len(MONTHS) * 5
+    assert stages[1].done == len(MONTHS) and stages[2].done == len(MONTHS) * 5
+
+
+def test_bounded_queues_apply_backpressure():
+    lock = threading.Lock()
+    state = {'outstanding': 0, 'peak': 0}
+
+    def download(task, stage):
+        with lock:
+            state['outstanding'] += 1
+            state['peak'] = max(state['peak'], state['outstanding'])
+        return task
+
+    def insert(task, stage):
+        time.sleep(0.01)   # 最慢的一环
+        with lock:
+            state['outstanding'] -= 1
+        return task
+
+    stages = run(download_workers=1, parse_workers=1, insert_workers=1, queue_size=1,
+                 download=download, parse=passthrough, insert=insert)
+    # 已下载未写入的任务 <= 下载线程 1 + 队列 1 + 解析线程 1 + 队列 1 + 写入线程 1
+    assert state['peak'] <= 5
+    assert stages[2].done == len(MONTHS) and state['outstanding'] == 0
+
+
+if __name__ == "__main__":
+    test_every_task_reaches_insert()
+    test_failing_task_only_counts_as_failed()
+    test_generator_items_are_forwarded_one_by_one()
+    test_bounded_queues_apply_backpressure()
+    print("✅ Ingest pipeline tests passed")
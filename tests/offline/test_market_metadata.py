@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+交易对元数据缓存测试: 缓存文件 + TTL、ccxt 精度查表、请求失败时沿用过期缓存、后台刷新
+"""
+import os
+import sys
+import tempfile
+import time
+
+import ccxt
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+
+from market_metadata import MarketMetadata, decimal_places, parse_exchange_info
+
+
+def contract(symbol, base, tick, step, min_qty='0.001', status='TRADING', contract_type='PERPETUAL'):
+    return {
+        'symbol': symbol, 'status': status, 'contractType': contract_type,
+        'baseAsset': base, 'quoteAsset': 'USDT', 'marginAsset': 'USDT',
+        'filters': [
+            {'filterType': 'PRICE_FILTER', 'tickSize': tick, 'minPrice': '0.10', 'maxPrice': '1000000'},
+            {'filterType': 'LOT_SIZE', 'stepSize': step, 'minQty': min_qty, 'maxQty': '1000'},
+            {'filterType': 'MIN_NOTIONAL', 'notional': '100'},
+        ],
+    }
+
+
+EXCHANGE_INFO = {'symbols': [
+    contract('BTCUSDT', 'BTC', '0.10', '0.001'),
+    contract('DOGEUSDT', 'DOGE', '0.000010', '1', min_qty='1'),
+    contract('ETHUSDT_260626', 'ETH', '0.01', '0.001', contract_type='CURRENT_QUARTER'),
+    contract('OLDUSDT', 'OLD', '0.01', '1', status='SETTLING'),
+]}
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_exchange(fail=False):
+    exchange = ccxt.binance({'options': {'defaultType': 'future', 'fetchCurrencies': False}})
+    exchange.precisionMode = ccxt.DECIMAL_PLACES
+    exchange.requests = 0
+
+    def exchange_info():
+        exchange.requests += 1
+        if fail:
+            raise ccxt.NetworkError('timeout')
+        return EXCHANGE_INFO
+
+    exchange.fapiPublicGetExchangeInfo = exchange_info
+    return exchange
+
+
+def test_parse_exchange_info():
+    assert decimal_places('0.00100000') == 3
+    assert decimal_places('1') == 0
+    assert decimal_places('10') == 0
+
+    table = parse_exchange_info(EXCHANGE_INFO)
+    assert set(table) == {'BTC/USDT', 'DOGE/USDT'}   # 只保留可交易的永续合约
+    assert table['BTC/USDT']['price_precision'] == 1 and table['BTC/USDT']['amount_precision'] == 3
+    assert table['DOGE/USDT']['price_precision'] == 5 and table['DOGE/USDT']['amount_precision'] == 0
+    assert table['DOGE/USDT']['min_qty'] == 1.0 and table['BTC/USDT']['min_notional'] == 100.0
+
+
+def test_load_fetches_once_and_formats_from_memory():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'markets.json')
+        exchange = make_exchange()
+        meta = MarketMetadata(exchange, path=path, ttl=3600, clock=Clock())
+        assert meta.load()
+        assert exchange.requests == 1 and os.path.exists(path)
+
+        assert exchange.amount_to_precision('BTC/USDT', 0.0123456) == '0.012'
+        assert exchange.price_to_precision('BTC/USDT', 40000.1234) == '40000.1'
+        assert exchange.amount_to_precision('DOGE/USDT', 123.9) == '123'
+        assert exchange.market('BTC/USDT')['id'] == 'BTCUSDT'
+        # ccxt 的 load_markets 直接返回已注入的市场，不会再发请求
+        exchange.load_markets()
+        assert exchange.requests == 1
+
+
+def test_fresh_cache_skips_request():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'markets.json')
+        clock = Clock()
+        MarketMetadata(make_exchange(), path=path, ttl=3600, clock=clock).load()
+
+        clock.now += 1800
+        exchange = make_exchange()
+        meta = MarketMetadata(exchange, path=path, ttl=3600, clock=clock)
+        assert meta.load()
+        assert exchange.requests == 0
+        assert 'BTC/USDT' in meta and not meta.expired
+        assert exchange.price_to_precision('DOGE/USDT', 0.123456789) == '0.12346'
+
+
+def test_expired_cache_is_refreshed_or_reused_on_failure():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'markets.json')
+        clock = Clock()
+        MarketMetadata(make_exchange(), path=path, ttl=3600, clock=clock).load()
+        clock.now += 7200
+
+        exchange = make_exchange()
+        meta = MarketMetadata(exchange, path=path, ttl=3600, clock=clock)
+        assert meta.load() and exchange.requests == 1 and not meta.expired
+
+        clock.now += 7200
+        exchange = make_exchange(fail=True)
+        meta = MarketMetadata(exchange, path=path, ttl=3600, clock=clock)
+        assert meta.load()                   # 请求失败，沿用过期缓存
+        assert exchange.requests == 1 and meta.expired
+        assert exchange.amount_to_precision('BTC/USDT', 0.5004) == '0.5'
+
+        empty = MarketMetadata(make_exchange(fail=True), path=os.path.join(tmp, 'missing.json'), clock=clock)
+        assert not empty.load()
+
+
+def test_background_refresh():
+    with tempfile.TemporaryDirectory() as tmp:
+        exchange = make_exchange()
+        meta = MarketMetadata(exchange, path=os.path.join(tmp, 'markets.json'), ttl=0.05)
+        meta.load()
+        meta.start(retry_interval=0.01)
+        try:
+            deadline = time.time() + 5
+            while exchange.requests < 3 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            meta.stop()
+        assert exchange.requests >= 3
+
+
+if __name__ == "__main__":
+    test_parse_exchange_info()
+    test_load_fetches_once_and_formats_from_memory()
+    test_fresh_cache_skips_request()
+    test_expired_cache_is_refreshed_or_reused_on_failure()
+    test_background_refresh()
+    print("✅ Market metadata tests passed")
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+WebSocket 行情测试 (本地 aiohttp 模拟服务器，不连接币安):
+收盘推送立即回调、断线重连后 REST 补齐、推送断档时 REST 补齐、长时间无推送时 REST 兜底
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+
+from candle_store import CandleStore
+from market_stream import MarketDataFeed, TIMEFRAME_MS, parse_kline_message, stream_url
+
+BASE_TS = 1_700_000_400_000 // 3_600_000 * 3_600_000
+
+
+def kline_message(timeframe, open_time, close, closed):
+    return {
+        'stream': f"btcusdt@kline_{timeframe}",
+        'data': {
+            'e': 'kline', 's': 'BTCUSDT',
+            'k': {'t': open_time, 'T': open_time + TIMEFRAME_MS[timeframe] - 1, 'i': timeframe,
+                  'o': str(close - 1), 'h': str(close + 5), 'l': str(close - 5), 'c': str(close),
+                  'v': '12.5', 'x': closed}
+        }
+    }
+
+
+def rest_kline(timeframe, index):
+    open_time = BASE_TS + index * TIMEFRAME_MS[timeframe]
+    close = 40000 + index
+    return [open_time, str(close - 1), str(close + 5), str(close - 5), str(close), '10', open_time + 1]
+
+
+class FakeRest:
+    """模拟 LiveBot.fetch_candles: 每个周期返回前 n 根 K 线 (n 随时间推进)"""
+
+    def __init__(self, stores):
+        self.stores = stores
+        self.available = {'1h': 3, '15m': 10, '5m': 30}
+        self.calls = []
+
+    def sync(self, timeframe):
+        self.calls.append(timeframe)
+        store = self.stores.setdefault(timeframe, CandleStore(100))
+        n = self.available[timeframe]
+        store.sync(lambda limit, start_time=None: [rest_kline(timeframe, i) for i in range(max(0, n - limit), n)]
+                   if start_time is None else
+                   [rest_kline(timeframe, i) for i in range(n) if rest_kline(timeframe, i)[0] >= start_time][:limit])
+
+
+def test_stream_url_and_parse():
+    url = stream_url('wss://fstream.binance.com/', 'BTC/USDT', ['5m', '1h'])
+    assert url == 'wss://fstream.binance.com/stream?streams=btcusdt@kline_5m/btcusdt@kline_1h'
+
+    timeframe, row, closed = parse_kline_message(kline_message('5m', BASE_TS, 40100.0, True))
+    assert timeframe == '5m' and closed
+    assert row.tolist() == [BASE_TS, 40099.0, 40105.0, 40095.0, 40100.0, 12.5]
+    assert parse_kline_message({'result': None, 'id': 1}) is None
+
+
+def test_feed_with_mock_server():
+    asyncio.run(asyncio.wait_for(_run_mock_session(), timeout=20))
+
+
+async def _run_mock_session():
+    stores = {}
+    rest = FakeRest(stores)
+    closes = []
+    connections = []
+
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        connections.append(request.query['streams'])
+        t5 = lambda i: BASE_TS + i * TIMEFRAME_MS['5m']
+
+        if len(connections) == 1:
+            # 第 29 根 (REST 中最后一根，未收盘) 更新 -> 收盘，随后服务器断开
+            await ws.send_json(kline_message('5m', t5(29), 40050.0, False))
+            await ws.send_json(kline_message('5m', t5(29), 40060.0, True))
+            await ws.close()
+        else:
+            # 断线期间 REST 已推进到 33 根；随后推送跳过第 33 根 (漏消息) 直接到第 34 根
+            await ws.send_json(kline_message('5m', t5(33), 40070.0, True))
+            await ws.send_json(kline_message('5m', t5(35), 40080.0, True))
+            await ws.receive()  # 保持连接直到客户端关闭
+        return ws
+
+    app = web.Application()
+    app.router.add_get('/stream', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    def on_close(frames):
+        closes.append(frames)
+        # 模拟交易所继续出新 K 线 (第一次收盘后断线期间到 33，第二次收盘后到 35)
+        rest.available['5m'] = 34 if len(closes) == 1 else 36
+
+    feed = MarketDataFeed('BTC/USDT', stores, rest.sync, on_close,
+                          url=f"http://127.0.0.1:{port}", reconnect_delay=0.05, fallback_grace=600)
+    task = asyncio.create_task(feed.run())
+    for _ in range(200):
+        if len(closes) >= 3:
+            break
+        await asyncio.sleep(0.05)
+    await feed.stop()
+    await task
+    await runner.cleanup()
+
+    assert connections[0] == 'btcusdt@kline_1h/btcusdt@kline_15m/btcusdt@kline_5m'
+    assert feed.stream.connections == 2
+    assert len(closes) == 3
+
+    # 1. 第一次收盘: 最后一根为刚收盘的 K 线 (推送数据覆盖了 REST 的未收盘值)
+    first = closes[0]['5m']
+    assert len(first) == 30 and first['close'].iloc[-1] == 40060.0
+    assert len(closes[0]['1h']) == 3 and len(closes[0]['15m']) == 10
+
+    # 2. 重连后 REST 补齐 (30..33)，推送的第 33 根覆盖 REST 值
+    second = closes[1]['5m']
+    assert second['timestamp'].iloc[-1] == BASE_TS + 33 * TIMEFRAME_MS['5m']
+    assert second['close'].iloc[-1] == 40070.0
+
+    # 3. 推送跳过第 34 根 -> REST 补齐后再写入第 35 根，中间没有缺口
+    third = closes[2]['5m']
+    assert third['timestamp'].diff().dropna().eq(TIMEFRAME_MS['5m']).all()
+    assert third['timestamp'].iloc[-1] == BASE_TS + 35 * TIMEFRAME_MS['5m']
+    assert third['close'].iloc[-1] == 40080.0
+
+    # 首次连接 + 重连各补齐 3 个周期，断档补齐 1 次
+    assert rest.calls.count('5m') == 3 and rest.calls.count('1h') == 2
+
+
+def test_backfill_is_concurrent():
+    def slow_sync(timeframe):
+        time.sleep(0.3)
+
+    async def scenario():
+        feed = MarketDataFeed('BTC/USDT', {}, slow_sync, lambda frames: None)
+        started = time.perf_counter()
+        await feed.backfill(['1h', '15m', '5m'])
+        return time.perf_counter() - started
+
+    # 三个周期并发: 总耗时约为一次请求，而不是三次之和
+    assert asyncio.run(scenario()) < 0.6
+
+
+def test_watchdog_falls_back_to_rest():
+    async def scenario():
+        stores = {}
+        rest = FakeRest(stores)
+        closes = []
+        # 无法连接的地址: WebSocket 一直失败，只能靠 REST 兜底
+        feed = MarketDataFeed('BTC/USDT', stores, rest.sync, closes.append, url='http://127.0.0.1:9',
+                              reconnect_delay=0.05, check_interval=0.05,
+                              fallback_grace=0.2 - TIMEFRAME_MS['5m'] / 1000)  # 0.2 秒无推送即兜底
+        task = asyncio.create_task(feed.run())
+        for _ in range(100):
+            if closes:
+                break
+            await asyncio.sleep(0.05)
+        await feed.stop()
+        await task
+        return feed, closes
+
+    feed, closes = asyncio.run(asyncio.wait_for(scenario(), timeout=20))
+    assert feed.fallbacks >= 1
+    assert len(closes[0]['5m']) == 30
+
+
+if __name__ == "__main__":
+    test_stream_url_and_parse()
+    test_feed_with_mock_server()
+    test_backfill_is_concurrent()
+    test_watchdog_falls_back_to_rest()
+    print("✅ Market stream tests passed")
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+多交易对引擎测试 (模拟交易所，不联网):
+并发评估、每个交易对耗时记录、共享请求额度 (全部 REST 请求)、批量持仓/挂单分发、最大持仓数限制、
+快照刷新失败时不开仓
+"""
+import os
+import sys
+import threading
+import time
+import types
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import ccxt
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+
+import config
+from multi_symbol_bot import MultiSymbolBot
+from rate_limiter import WeightRateLimiter
+
+SYMBOLS = [f"C{i}/USDT" for i in range(12)]
+BAR_MS = {'1h': 3_600_000, '15m': 900_000, '5m': 300_000}
+LATENCY = 0.05
+
+
+class FakeExchange(ccxt.binance):
+    """走真实的 ccxt 签名与请求路径，只把 HTTP 请求替换为本地应答"""
+
+    def __init__(self):
+        super().__init__({'apiKey': 'key', 'secret': 'secret'})
+        self.kline_calls = 0
+        self.max_in_flight = 0
+        self.fail_account_state = False
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, url, method='GET', headers=None, body=None):
+        parsed = urllib.parse.urlparse(url)
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        if parsed.path == '/fapi/v1/klines':
+            return self.klines(params)
+        if parsed.path in ('/fapi/v2/positionRisk', '/fapi/v1/openOrders') and self.fail_account_state:
+            raise ccxt.RequestTimeout('Read timed out')
+        if parsed.path == '/fapi/v2/positionRisk':
+            return [
+                {'symbol': 'C1USDT', 'positionAmt': '0.5', 'entryPrice': '101'},
+                {'symbol': 'C2USDT', 'positionAmt': '-2', 'entryPrice': '102'},
+                {'symbol': 'C3USDT', 'positionAmt': '0', 'entryPrice': '0'},
+            ]
+        if parsed.path == '/fapi/v1/openOrders':
+            return [
+                {'symbol': 'C1USDT', 'orderId': 11, 'type': 'STOP_MARKET', 'stopPrice': '95'},
+                {'symbol': 'C1USDT', 'orderId': 12, 'type': 'LIMIT', 'stopPrice': '0'},
+            ]
+        if parsed.path == '/fapi/v2/account':
+            return {'assets': [{'asset': 'USDT', 'walletBalance': '1000'}]}
+        if parsed.path == '/fapi/v1/batchOrders':
+            return [{'orderId': 1}, {'orderId': 2}, {'orderId': 3}]
+        if parsed.path == '/fapi/v1/order':
+            return {'orderId': 4, 'status': 'CANCELED' if method == 'DELETE' else 'NEW'}
+        raise AssertionError(f"unexpected request {method} {url}")
+
+    def klines(self, params):
+        with self._lock:
+            self.kline_calls += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        time.sleep(LATENCY)
+        with self._lock:
+            self._in_flight -= 1
+        step = BAR_MS[params['interval']]
+        base = 100 + int(params['symbol'][1:-4])
+        return [[i * step, str(base), str(base + 1), str(base - 1), str(base + 0.5), '10', i * step + step - 1]
+                for i in range(int(params['limit']))]
+
+
+def make_bot():
+    account = types.SimpleNamespace(
+        exchange=FakeExchange(), api_ready=False, capital=1000.0,
+        db=types.SimpleNamespace(log_equity=lambda capital: None),
+        send_notification=lambda title, message: None,
+        update_balance=lambda: None,
+        market_meta=None,
+        notifier=None,
+        fetch_pool=ThreadPoolExecutor(max_workers=3),
+    )
+    return MultiSymbolBot(SYMBOLS, account=account)
+
+
+def test_cycle_is_concurrent_and_timed():
+    bot = make_bot()
+    exchange = bot.account.exchange
+    assert exchange.enableRateLimit is False  # 限流交给共享的 WeightRateLimiter
+
+    started = time.perf_counter()
+    results = bot.run_cycle()
+    elapsed = time.perf_counter() - started
+
+    assert set(results) == set(SYMBOLS)
+    assert all(data is not None for data in results.values())
+    assert exchange.kline_calls == len(SYMBOLS) * 3
+    # 串行需要 12 * 3 * 50ms = 1.8s
+    assert exchange.max_in_flight > 1
+    assert elapsed < len(SYMBOLS) * 3 * LATENCY / 2
+
+    # 每个交易对都记录了本周期耗时，且独立的策略实例 / K 线缓存
+    for trader in bot.traders.values():
+        assert trader.last_cycle_ms >= 3 * LATENCY * 1000
+        assert len(trader.candle_stores['5m']) == config.LIVE_KLINE_LIMIT
+    assert len({id(t.strategy) for t in bot.traders.values()}) == len(SYMBOLS)
+
+    # 预热请求 (limit=100, 权重 2) 计入共享额度
+    assert config.LIVE_KLINE_LIMIT == 100
+    assert bot.rate_limiter.used == len(SYMBOLS) * 3 * 2
+
+
+def test_account_state_is_distributed_per_symbol():
+    bot = make_bot()
+    bot.refresh_account_state()
+
+    assert bot.traders['C1/USDT'].position == {'symbol': 'C1/USDT', 'contracts': 0.5, 'entryPrice': 101.0, 'side': 'long'}
+    assert bot.traders['C2/USDT'].position['side'] == 'short'
+    assert bot.traders['C3/USDT'].position is None
+    assert [o['id'] for o in bot.traders['C1/USDT'].get_open_orders_data()] == ['11', '12']
+    assert bot.traders['C2/USDT'].get_open_orders_data() == []
+    assert bot.open_position_count() == 2
+    assert bot.rate_limiter.used == 5 + 40   # positionRisk + 不带 symbol 的 openOrders
+
+
+def test_trader_has_live_bot_state():
+    bot = make_bot()
+    trader, other = bot.traders['C1/USDT'], bot.traders['C2/USDT']
+    for name in ('symbol', 'strategy', 'candle_stores', 'fetch_timings', 'order_book', 'user_stream',
+                 'last_reconcile', 'risk_pct', 'sl_pct', 'exchange', 'db', 'notifier', 'fetch_pool'):
+        assert hasattr(trader, name), name
+    assert trader.order_book is not other.order_book
+    assert trader.fetch_pool is bot.account.fetch_pool
+    # LiveBot 的并行拉取路径可直接使用
+    trader.fetch_timeframes()
+    assert len(trader.candle_stores['5m']) > 0
+
+
+def test_signals_respect_max_open_positions():
+    bot = make_bot()
+    bot.refresh_account_state()   # C1 / C2 已有持仓
+    executed = []
+    for trader in bot.traders.values():
+        trader.execute_signal = lambda price, side, atr, symbol=trader.symbol: executed.append(symbol) or True
+
+    signal = {'signal': 'LONG', 'price': 100.0, 'atr': 1.0}
+    results = {symbol: dict(signal) for symbol in SYMBOLS}
+    bot.execute_signals(results)
+
+    assert 'C1/USDT' not in executed and 'C2/USDT' not in executed
+    assert len(executed) == config.MAX_OPEN_POSITIONS - 2
+
+
+def test_failed_entry_does_not_use_a_slot():
+    bot = make_bot()
+    bot.refresh_account_state()   # C1 / C2 已有持仓
+    executed = []
+    for trader in bot.traders.values():
+        # C0 下单失败，不占用持仓名额
+        trader.execute_signal = (lambda price, side, atr, symbol=trader.symbol:
+                                 executed.append(symbol) or symbol != 'C0/USDT')
+
+    results = {symbol: {'signal': 'LONG', 'price': 100.0, 'atr': 1.0} for symbol in SYMBOLS}
+    bot.execute_signals(results)
+
+    assert executed[0] == 'C0/USDT'
+    assert len(executed) == config.MAX_OPEN_POSITIONS - 2 + 1
+
+
+def test_stale_snapshot_skips_signals():
+    bot = make_bot()
+    bot.account.api_ready = True
+    bot.refresh_account_state()
+    bot.account.exchange.fail_account_state = True
+    signals = []
+    bot.execute_signals = lambda results: signals.append(results)
+
+    original = config.REAL_TRADING_ENABLED
+    config.REAL_TRADING_ENABLED = True
+    try:
+        results = bot.run_cycle()
+    finally:
+        config.REAL_TRADING_ENABLED = original
+
+    assert set(results) == set(SYMBOLS)
+    assert signals == []
+
+
+def test_every_request_draws_from_shared_budget():
+    bot = make_bot()
+    exchange = bot.account.exchange
+    exchange.fapiPrivateV2GetAccount()                                                # 余额
+    exchange.fapiPrivatePostBatchOrders({'batchOrders': [{'symbol': 'C1USDT'}] * 3})   # 保护单
+    exchange.fapiPrivateDeleteOrder({'symbol': 'C1USDT', 'orderId': 11})              # 推保本撤单
+    exchange.fapiPrivatePostOrder({'symbol': 'C1USDT', 'type': 'STOP_MARKET'})       # 推保本挂单
+    assert bot.rate_limiter.used == 5 + 5 + 1 + 4
+
+    bot.traders['C1/USDT'].fetch_candles('5m', limit=1000)
+    assert bot.rate_limiter.used == 15 + 5
+
+
+def test_rate_limiter_blocks_when_budget_is_spent():
+    now = [0.0]
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = WeightRateLimiter(60, clock=lambda: now[0], sleep=fake_sleep)  # 每秒恢复 1
+    assert limiter.acquire(60) == 0
+    assert limiter.acquire(5) == 5.0
+    assert sleeps == [5.0]
+
+
+if __name__ == "__main__":
+    test_cycle_is_concurrent_and_timed()
+    test_account_state_is_distributed_per_symbol()
+    test_trader_has_live_bot_state()
+    test_signals_respect_max_open_positions()
+    test_failed_entry_does_not_use_a_slot()
+    test_stale_snapshot_skips_signals()
+    test_every_request_draws_from_shared_budget()
+    test_rate_limiter_blocks_when_budget_is_spent()
+    print("✅ Multi-symbol bot tests passed")
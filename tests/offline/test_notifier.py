@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+异步推送测试 (模拟 HTTP 会话): 入队不阻塞、突发合并、队列溢出丢弃、失败重试
+"""
+import os
+import sys
+import threading
+import time
+import types
+
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+
+import config
+from notifier import Notifier
+
+
+class FakeSession:
+    def __init__(self, statuses=(), delay=0.0):
+        self.statuses = list(statuses)   # 依次返回的状态码 (用完后返回 200)；None 表示连接异常
+        self.delay = delay
+        self.urls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def get(self, url, timeout=None):
+        self.release.wait()
+        time.sleep(self.delay)
+        self.urls.append(url)
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status is None:
+            raise requests.ConnectionError('connection refused')
+        return types.SimpleNamespace(status_code=status)
+
+
+def bark_only(test):
+    def wrapper():
+        saved = config.NOTIFICATION_CHANNELS, config.BARK_URL
+        config.NOTIFICATION_CHANNELS, config.BARK_URL = ['bk'], 'http://bark.local/key/'
+        try:
+            test()
+        finally:
+            config.NOTIFICATION_CHANNELS, config.BARK_URL = saved
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+@bark_only
+def test_notify_does_not_block():
+    session = FakeSession(delay=0.5)
+    notifier = Notifier(session=session, coalesce_window=0).start()
+    started = time.perf_counter()
+    notifier.notify("策略更新", "止损已同步至保本位")
+    assert time.perf_counter() - started < 0.05
+    assert notifier.flush(5)
+    assert session.urls == ['http://bark.local/key/%E7%AD%96%E7%95%A5%E6%9B%B4%E6%96%B0/'
+                            '%E6%AD%A2%E6%8D%9F%E5%B7%B2%E5%90%8C%E6%AD%A5%E8%87%B3%E4%BF%9D%E6%9C%AC%E4%BD%8D']
+    notifier.close(1)
+
+
+@bark_only
+def test_burst_is_coalesced_and_overflow_dropped():
+    session = FakeSession()
+    session.release.clear()   # 第一条推送卡住，其余消息在队列中积压
+    notifier = Notifier(session=session, max_queue=3, coalesce_window=0).start()
+    notifier.notify("A", "first")
+    time.sleep(0.1)
+    for i in range(5):
+        notifier.notify(f"B{i}", f"burst {i}")
+    session.release.set()
+    assert notifier.flush(5)
+
+    assert len(session.urls) == 2   # 1 条单独发送 + 1 条合并推送
+    merged = requests.utils.unquote(session.urls[1])
+    assert "B2 等 3 条通知" in merged
+    assert "【B4】\nburst 4" in merged and "burst 1" not in merged
+    assert "另有 2 条通知因积压被丢弃" in merged
+    notifier.close(1)
+
+
+@bark_only
+def test_failed_push_is_retried_with_backoff():
+    sleeps = []
+    session = FakeSession(statuses=[None, 502])
+    notifier = Notifier(session=session, coalesce_window=0, backoff=0.5, sleep=sleeps.append).start()
+    notifier.notify("开仓", "BTC/USDT LONG")
+    assert notifier.flush(5)
+    assert len(session.urls) == 3 and notifier.sent == 1
+    assert sleeps == [0.5, 1.0]
+
+    # 4xx 不重试
+    session.statuses = [400]
+    notifier.notify("开仓", "ETH/USDT SHORT")
+    assert notifier.flush(5)
+    assert len(session.urls) == 4 and notifier.sent == 1
+    notifier.close(1)
+
+
+if __name__ == "__main__":
+    test_notify_does_not_block()
+    test_burst_is_coalesced_and_overflow_dropped()
+    test_failed_push_is_retried_with_backoff()
+    print("✅ Notifier tests passed")
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+组合回测测试: 单交易对时与 numpy 引擎完全一致；多交易对时共享资金池并遵守持仓数 / 日内限制
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+sys.path.append(os.path.dirname(__file__))
+
+import backtester
+import config
+from portfolio_backtester import PortfolioBacktester
+from synthetic_data import make_strategy_frame
+
+
+def test_single_symbol_matches_numpy_engine():
+    df = make_strategy_frame(n_bars=20000, seed=7)
+
+    bt_ref = backtester.Backtester(df.copy())
+    equity_ref = bt_ref.run(engine='numpy')
+
+    bt = PortfolioBacktester({'BTC/USDT': df.copy()})
+    equity = bt.run()
+
+    np.testing.assert_array_equal(equity['equity'].to_numpy(), equity_ref['equity'].to_numpy())
+    assert (equity['time'].to_numpy() == equity_ref['time'].to_numpy()).all()
+    strip = lambda trades: [{k: v for k, v in vars(t).items() if k != 'symbol'} for t in trades]
+    assert strip(bt.trades) == strip(bt_ref.trades)
+    assert bt.capital == bt_ref.capital
+    assert {t.symbol for t in bt.trades} == {'BTC/USDT'}
+
+
+def portfolio_frames():
+    frames = {f"S{seed}/USDT": make_strategy_frame(n_bars=12000, seed=seed) for seed in (3, 5, 7, 11)}
+    # 一个交易对晚上市 + 中间停牌一段，检验时钟对齐
+    late = frames['S11/USDT']
+    frames['S11/USDT'] = pd.concat([late.iloc[2000:5000], late.iloc[5500:]])
+    return frames
+
+
+def test_portfolio_shares_capital_and_limits(monkeypatch):
+    monkeypatch.setattr(config, 'MAX_OPEN_POSITIONS', 2)
+    monkeypatch.setattr(config, 'MAX_TRADES_PER_DAY', 3)
+
+    def generator():
+        # 逐个产出 (symbol, df)，与 data_loader.iter_portfolio_data 相同
+        yield from portfolio_frames().items()
+
+    bt = PortfolioBacktester(generator())
+    equity = bt.run()
+
+    assert bt.symbols == ['S3/USDT', 'S5/USDT', 'S7/USDT', 'S11/USDT']
+    assert equity['time'].is_monotonic_increasing and equity['time'].is_unique
+
+    # 组合级持仓数上限
+    assert equity['open_positions'].max() == 2
+
+    # 组合级每日开仓次数上限
+    trades = bt.trades + bt.open_trades
+    per_day = pd.Series([t.entry_time.date() for t in trades]).value_counts()
+    assert per_day.max() <= 3
+
+    # 多个交易对都有交易，且资金池只有一个: 期末资金 = 初始资金 + 全部交易盈亏
+    assert len({t.symbol for t in trades}) >= 3
+    assert np.isclose(bt.capital, config.INITIAL_CAPITAL + sum(t.pnl for t in trades))
+
+    stats = bt.symbol_stats()
+    assert stats['Trades'].sum() == len(bt.trades)
+
+
+if __name__ == "__main__":
+    test_single_symbol_matches_numpy_engine()
+    print("✅ Portfolio backtester tests passed")
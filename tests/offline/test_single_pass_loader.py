@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+单次扫描加载测试: 由 5m 本地合成 15m / 1h 的结果与 ClickHouse 分别聚合 1s 数据一致
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+
+import data_loader
+
+SECONDS = {'5m': 300, '15m': 900, '1h': 3600}
+
+
+def make_1s_bars(days=3, seed=2):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2024-01-01', periods=days * 86400, freq='1s')
+    # 制造缺口: 随机丢弃秒级数据，并整段丢掉一个小时
+    keep = rng.random(len(index)) > 0.2
+    keep[(index >= '2024-01-02 03:00') & (index < '2024-01-02 04:00')] = False
+    index = index[keep]
+
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.0002, len(index))))
+    open_ = close * (1 + rng.normal(0, 0.0001, len(index)))
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) * 1.0001,
+        'low': np.minimum(open_, close) * 0.9999,
+        'close': close,
+        'volume': rng.integers(1, 1000, len(index)) / 1000.0,
+    }, index=pd.Index(index, name='open_time'))
+
+
+BARS_1S = make_1s_bars()
+
+
+def clickhouse_aggregate(timeframe, start, end, include_end=True):
+    """模拟 ClickHouse: toStartOfInterval + argMin/max/min/argMax/sum"""
+    df = BARS_1S
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    mask = (df.index >= start) & ((df.index <= end) if include_end else (df.index < end))
+    df = df[mask]
+    bucket = df.index.floor(f"{SECONDS[timeframe]}s")
+    out = df.groupby(bucket).agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+    out.index.name = 'timestamp'
+    return out
+
+
+def test_resample_matches_direct_aggregation():
+    df_5m = clickhouse_aggregate('5m', '2024-01-01', '2024-01-03 12:00:00')
+    for tf in ('15m', '1h'):
+        expected = clickhouse_aggregate(tf, '2024-01-01', '2024-01-03 12:00:00')
+        actual = data_loader.resample_ohlcv(df_5m, tf)
+        pd.testing.assert_frame_equal(actual[['open', 'high', 'low', 'close']],
+                                      expected[['open', 'high', 'low', 'close']],
+                                      check_exact=True, check_freq=False)
+        # 成交量只存在浮点求和顺序差异
+        np.testing.assert_allclose(actual['volume'], expected['volume'], rtol=1e-12)
+
+
+def test_prepare_strategy_data_single_scan(monkeypatch):
+    calls = []
+
+    def fake_query(timeframe, start, end, include_end=True, table=None):
+        calls.append(timeframe)
+        return clickhouse_aggregate(timeframe, start, end, include_end)
+
+    monkeypatch.setattr(data_loader, 'query_aggregated_data', fake_query)
+    monkeypatch.setattr(data_loader.config, 'BAR_CACHE_ENABLED', False)
+
+    start, end = '2024-01-01 00:07:13', '2024-01-03'
+    actual = data_loader.prepare_strategy_data(start, end)
+    assert calls == ['5m']
+
+    expected = data_loader.merge_timeframes(
+        clickhouse_aggregate('1h', start, end),
+        clickhouse_aggregate('15m', start, end),
+        clickhouse_aggregate('5m', start, end),
+    )
+    volume_cols = ['15m_volume', '1h_volume']
+    pd.testing.assert_frame_equal(actual.drop(columns=volume_cols), expected.drop(columns=volume_cols),
+                                  check_exact=True)
+    np.testing.assert_allclose(actual[volume_cols], expected[volume_cols], rtol=1e-12)
+
+
+if __name__ == "__main__":
+    test_resample_matches_direct_aggregation()
+    print("✅ 单次扫描加载验证通过")
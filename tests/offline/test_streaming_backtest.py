@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+流式回测测试: 按月分块 + 预热的结果与一次性加载的 numpy 引擎一致
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+sys.path.append(os.path.dirname(__file__))
+
+import backtester
+import data_loader
+from synthetic_data import make_5m_bars, make_strategy_frame
+
+
+def monthly_chunks(df):
+    for _, chunk in df.groupby(df.index.to_period('M')):
+        yield chunk
+
+
+def test_stream_matches_in_memory():
+    df = make_strategy_frame(n_bars=40000, start='2024-01-01', seed=7)  # ~4.6 个月
+
+    bt_ref = backtester.Backtester(df.copy())
+    equity_ref = bt_ref.run(engine='numpy')
+
+    bt_stream = backtester.Backtester(None)
+    equity_stream = bt_stream.run_stream(monthly_chunks(df))
+
+    assert list(equity_stream['time']) == list(equity_ref['time'])
+    np.testing.assert_allclose(equity_stream['equity'], equity_ref['equity'], rtol=1e-9)
+    np.testing.assert_array_equal(equity_stream['close'], bt_ref.df['close'].to_numpy())
+
+    key = lambda t: (t.entry_time, t.side, t.exit_time, t.exit_reason, t.tp1_filled)
+    assert [key(t) for t in bt_stream.trades] == [key(t) for t in bt_ref.trades]
+    np.testing.assert_allclose([t.pnl for t in bt_stream.trades], [t.pnl for t in bt_ref.trades], rtol=1e-9)
+    assert len(bt_ref.trades) > 50
+
+
+def test_chunk_indicators_match_full_history():
+    df = make_strategy_frame(n_bars=20000, start='2024-01-01', seed=3)
+    bt = backtester.Backtester(None)
+    full = bt.strategy.calculate_indicators(df).dropna()
+
+    parts = list(bt.iter_indicator_chunks(monthly_chunks(df)))
+    streamed = pd.concat([p for p, _ in parts])
+    signals = np.concatenate([s for _, s in parts])
+
+    pd.testing.assert_index_equal(streamed.index, full.index)
+    pd.testing.assert_frame_equal(streamed, full, check_exact=False, rtol=1e-9, check_freq=False)
+    np.testing.assert_array_equal(signals, bt.strategy.generate_signals(full))
+
+
+def test_iter_strategy_data_matches_prepare(monkeypatch):
+    bars = make_5m_bars(n_bars=30000, start='2024-01-01', seed=4)
+
+    def fake_query(timeframe, start, end, include_end=True, table=None):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        return bars[(bars.index >= start) & ((bars.index <= end) if include_end else (bars.index < end))]
+
+    monkeypatch.setattr(data_loader, 'query_aggregated_data', fake_query)
+    monkeypatch.setattr(data_loader.config, 'BAR_CACHE_ENABLED', False)
+
+    full = data_loader.prepare_strategy_data('2024-01-10', '2024-03-20')
+    chunks = list(data_loader.iter_strategy_data('2024-01-10', '2024-03-20'))
+
+    assert len(chunks) == 3
+    pd.testing.assert_frame_equal(pd.concat(chunks), full, check_exact=True, check_freq=False)
+
+
+if __name__ == "__main__":
+    test_stream_matches_in_memory()
+    print("✅ 流式回测验证通过")
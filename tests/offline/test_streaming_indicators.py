@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+增量指标测试: Streaming* 指标必须与批量 calculate_* 结果一致，
+analyze_live 跨周期复用状态时的输出必须与全量历史上的批量指标一致
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+sys.path.append(os.path.dirname(__file__))
+
+import config
+import indicators
+from strategy_factory import get_strategy
+from synthetic_data import make_5m_bars, resample_bars
+
+
+def stream_values(indicator, *columns):
+    return np.array([indicator.update(*values) for values in zip(*columns)], dtype=float)
+
+
+def test_streaming_matches_batch():
+    df = make_5m_bars(n_bars=3000, seed=11)
+    # 插入一段横盘，覆盖 RSI 无涨跌 (loss == 0) 的分支
+    df.iloc[1000:1040, :4] = df['close'].iloc[999]
+    close = df['close']
+
+    np.testing.assert_allclose(
+        stream_values(indicators.StreamingEMA(50), close),
+        indicators.calculate_ema(close, 50).values, rtol=1e-9)
+
+    np.testing.assert_allclose(
+        stream_values(indicators.StreamingRSI(14), close),
+        indicators.calculate_rsi(close, 14).values, rtol=1e-9, atol=1e-9)
+
+    np.testing.assert_allclose(
+        stream_values(indicators.StreamingATR(14), df['high'], df['low'], close),
+        indicators.calculate_atr(df, 14).values, rtol=1e-9)
+
+    upper, lower = indicators.calculate_bollinger_bands(close, 20, 2.0)
+    bb = indicators.StreamingBollingerBands(20, 2.0)
+    bands = np.array([bb.update(x) for x in close], dtype=float)
+    np.testing.assert_allclose(bands[:, 0], upper.values, rtol=1e-9)
+    np.testing.assert_allclose(bands[:, 1], lower.values, rtol=1e-9)
+
+
+def test_peek_does_not_mutate_state():
+    ema = indicators.StreamingEMA(10)
+    for x in [1.0, 2.0, 3.0]:
+        ema.update(x)
+    before = ema.value
+    ema.peek(100.0)
+    assert ema.value == before
+
+
+def live_frame(df):
+    """LiveBot.fetch_candles 的输出结构 (timestamp 为毫秒整数列)"""
+    out = df.reset_index()
+    out['timestamp'] = out['timestamp'].astype('int64') // 10**6
+    return out
+
+
+def test_analyze_live_incremental_matches_batch():
+    strategy = get_strategy(config.ACTIVE_STRATEGY)
+    df_5m = make_5m_bars(n_bars=6000, seed=3)
+    df_1h = resample_bars(df_5m, '1h')
+
+    # 全量历史上的批量指标 (参考值)
+    ref_rsi = indicators.calculate_rsi(df_5m['close'], strategy.rsi_period)
+    ref_atr = indicators.calculate_atr(df_5m, strategy.atr_period)
+
+    live_5m = live_frame(df_5m)
+    live_1h = live_frame(df_1h)
+    ema_start = None
+
+    # 模拟 LiveBot: 每个周期拉取最近 100 根 K 线 (窗口滑动)
+    checked = 0
+    for end in range(2000, 6000, 37):
+        window_5m = live_5m.iloc[end - 100:end]
+        n_1h = int(np.searchsorted(live_1h['timestamp'].values, window_5m['timestamp'].iloc[-1], side='right'))
+        window_1h = live_1h.iloc[max(0, n_1h - 100):n_1h]
+        if ema_start is None:
+            # EMA 从第一次拉取的窗口起点开始预热，之后持续累积 (不再每次只看 100 根)
+            ema_start = max(0, n_1h - 100)
+            ref_ema = indicators.calculate_ema(df_1h['close'].iloc[ema_start:], strategy.trend_ema_period)
+
+        result = strategy.analyze_live(window_1h, None, window_5m)
+
+        np.testing.assert_allclose(result['indicators']['rsi'], ref_rsi.iloc[end - 1], rtol=1e-9)
+        np.testing.assert_allclose(result['atr'], ref_atr.iloc[end - 1], rtol=1e-9)
+        np.testing.assert_allclose(result['indicators']['trend_ema'], ref_ema.iloc[n_1h - 2 - ema_start], rtol=1e-9)
+        checked += 1
+
+    assert checked > 100
+
+
+def test_subclass_without_update_fails_on_creation():
+    class Incomplete(indicators.StreamingIndicator):
+        pass
+
+    try:
+        Incomplete()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("StreamingIndicator subclass without update() must not be instantiable")
+
+
+if __name__ == "__main__":
+    test_streaming_matches_batch()
+    test_peek_does_not_mutate_state()
+    test_subclass_without_update_fails_on_creation()
+    test_analyze_live_incremental_matches_batch()
+    print("✅ Streaming indicator tests passed")
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+参数扫描测试: 并行结果与逐组串行回测一致，且不修改全局 config
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+sys.path.append(os.path.dirname(__file__))
+
+import config
+import sweep
+from synthetic_data import make_strategy_frame
+
+GRID = {
+    'RSI_OVERSOLD': [30, 35],
+    'BB_STD': [2.0, 2.5],
+    'TP2_RATIO': [3.0, 3.5],
+}
+
+
+def test_build_config_is_isolated():
+    cfg = sweep.build_config({'RSI_OVERSOLD': 20})
+    assert cfg.RSI_OVERSOLD == 20
+    assert config.RSI_OVERSOLD != 20
+    assert cfg.INITIAL_CAPITAL == config.INITIAL_CAPITAL
+
+
+def test_build_config_rejects_unknown_parameter():
+    try:
+        sweep.build_config({'NOT_A_PARAM': 1})
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError")
+
+
+def test_parallel_sweep_matches_sequential_runs():
+    df = make_strategy_frame(n_bars=8000, seed=7)
+    snapshot = {k: getattr(config, k) for k in GRID}
+
+    results = sweep.run_sweep(df, GRID, engine='kernel', workers=2)
+
+    assert len(results) == len(sweep.expand_grid(GRID))
+    assert list(results['Final Capital']) == sorted(results['Final Capital'], reverse=True)
+    assert {k: getattr(config, k) for k in GRID} == snapshot
+
+    for row in results.to_dict('records'):
+        overrides = {k: row[k] for k in GRID}
+        expected = sweep.run_single(df, overrides, engine='numpy')
+        assert row['Final Capital'] == expected['Final Capital']
+        assert row['Total Trades'] == expected['Total Trades']
+        assert row['Max Drawdown'] == expected['Max Drawdown']
+
+
+if __name__ == "__main__":
+    test_parallel_sweep_matches_sequential_runs()
+    print("✅ 参数扫描验证通过")
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+账户推送测试: 持仓/挂单簿的增量更新、TP1 成交立即推保本 (不走 REST)、listenKey 过期后重连 (本地模拟服务器)
+"""
+import asyncio
+import os
+import sys
+import time
+import types
+
+from aiohttp import web
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+
+import config
+import live_bot
+from user_stream import OrderBook, UserDataStream
+
+
+def order_event(order_id, order_type, status, side='SELL', filled='0', execution='NEW', stop_price='0',
+                reduce_only=True, symbol='BTCUSDT', T=1000):
+    return {'e': 'ORDER_TRADE_UPDATE', 'E': T + 1, 'T': T, 'o': {
+        's': symbol, 'i': order_id, 'o': order_type, 'ot': order_type, 'S': side, 'X': status,
+        'x': execution, 'l': filled, 'sp': stop_price, 'R': reduce_only,
+    }}
+
+
+def account_event(amount, entry_price, symbol='BTCUSDT', T=1000):
+    return {'e': 'ACCOUNT_UPDATE', 'E': T + 1, 'T': T, 'a': {
+        'm': 'ORDER', 'B': [], 'P': [{'s': symbol, 'pa': amount, 'ep': entry_price, 'ps': 'BOTH'}],
+    }}
+
+
+def seeded_book():
+    book = OrderBook()
+    book.reset('BTCUSDT', {'contracts': 0.01, 'entryPrice': 40000.0, 'side': 'long'}, [
+        {'id': '1', 'type': 'STOP_MARKET', 'stopPrice': 39500.0},
+        {'id': '2', 'type': 'LIMIT', 'stopPrice': 0},
+        {'id': '3', 'type': 'LIMIT', 'stopPrice': 0},
+    ], updated=500)
+    return book
+
+
+def test_order_book_updates():
+    book = seeded_book()
+    position, orders = book.snapshot('BTCUSDT')
+    assert position == {'contracts': 0.01, 'entryPrice': 40000.0, 'side': 'long'}
+    assert [o['id'] for o in orders] == ['1', '2', '3']
+
+    # TP1 成交先于 ACCOUNT_UPDATE 到达: 按成交量推算剩余持仓
+    filled = book.apply(order_event(2, 'LIMIT', 'FILLED', filled='0.005', execution='TRADE', T=1000))
+    assert filled['id'] == '2' and filled['reduceOnly'] and filled['symbol'] == 'BTCUSDT'
+    position, orders = book.snapshot('BTCUSDT')
+    assert position['contracts'] == 0.005
+    assert [o['id'] for o in orders] == ['1', '3']
+
+    # 同一笔成交的 ACCOUNT_UPDATE (相同 T) 覆盖为交易所值，不会重复扣减
+    assert book.apply(account_event('0.005', '40000.0', T=1000)) is None
+    assert book.snapshot('BTCUSDT')[0]['contracts'] == 0.005
+
+    # 新挂单 / 撤单 / 条件单触发后 (o=MARKET, ot=STOP_MARKET) 按原始类型记录
+    book.apply(order_event(4, 'STOP_MARKET', 'NEW', stop_price='40000', T=1100))
+    book.apply(order_event(1, 'STOP_MARKET', 'CANCELED', T=1101))
+    position, orders = book.snapshot('BTCUSDT')
+    assert {o['id']: (o['type'], o['stopPrice']) for o in orders} == {'3': ('LIMIT', 0.0), '4': ('STOP_MARKET', 40000.0)}
+
+    # 平仓
+    book.apply(account_event('0', '0', T=1200))
+    assert book.snapshot('BTCUSDT')[0] is None
+
+    # ccxt 格式的空仓 (contracts 为正、side=short) 统一为负数
+    book.reset('ETHUSDT', {'contracts': 2.0, 'entryPrice': 3000.0, 'side': 'short'}, [])
+    assert book.snapshot('ETHUSDT')[0]['contracts'] == -2.0
+
+
+class NoRestExchange:
+    def __getattr__(self, name):
+        raise AssertionError(f"推送在线时不应调用 REST: {name}")
+
+
+def make_bot():
+    bot = live_bot.LiveBot.__new__(live_bot.LiveBot)
+    bot.symbol = 'BTC/USDT'
+    bot.api_ready = True
+    bot.exchange = NoRestExchange()
+    bot.order_book = seeded_book()
+    bot.user_stream = types.SimpleNamespace(connected=True)
+    bot.last_reconcile = time.time()
+    bot.be_calls = []
+    bot.cancel_and_place_be_sl = lambda side, entry, qty, old_id=None: bot.be_calls.append((side, entry, qty, old_id))
+    return bot
+
+
+def test_tp1_fill_moves_stop_to_break_even_immediately():
+    enabled = config.REAL_TRADING_ENABLED
+    config.REAL_TRADING_ENABLED = True
+    try:
+        bot = make_bot()
+        # 其它交易对 / 非减仓单的成交不触发巡检
+        assert not bot.on_user_event(order_event(9, 'LIMIT', 'FILLED', filled='1', execution='TRADE', symbol='ETHUSDT'))
+        assert not bot.on_user_event(order_event(3, 'LIMIT', 'NEW'))
+
+        assert bot.on_user_event(order_event(2, 'LIMIT', 'FILLED', filled='0.005', execution='TRADE'))
+        bot.monitor_positions()
+        assert bot.be_calls == [('LONG', 40000.0, 0.005, '1')]
+
+        # 保本损已挂出后再次巡检不重复操作
+        bot.on_user_event(order_event(1, 'STOP_MARKET', 'CANCELED', T=1001))
+        bot.on_user_event(order_event(5, 'STOP_MARKET', 'NEW', side='SELL', stop_price='40000', T=1002))
+        bot.monitor_positions()
+        assert len(bot.be_calls) == 1
+    finally:
+        config.REAL_TRADING_ENABLED = enabled
+
+
+class ListenKeyExchange:
+    def __init__(self):
+        self.keys = 0
+        self.keepalives = 0
+
+    def fapiPrivatePostListenKey(self):
+        self.keys += 1
+        return {'listenKey': f"key{self.keys}"}
+
+    def fapiPrivatePutListenKey(self):
+        self.keepalives += 1
+        return {}
+
+
+def test_user_stream_reconnects_after_listen_key_expired():
+    asyncio.run(asyncio.wait_for(_run_mock_session(), timeout=20))
+
+
+async def _run_mock_session():
+    paths = []
+    events = []
+    connects = []
+
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        paths.append(request.match_info['key'])
+        if len(paths) == 1:
+            await ws.send_json(account_event('0.01', '40000'))
+            await ws.send_json({'e': 'listenKeyExpired', 'E': 1})
+            await ws.receive()
+        else:
+            await ws.send_json(order_event(2, 'LIMIT', 'FILLED', filled='0.005', execution='TRADE'))
+            await ws.receive()
+        return ws
+
+    app = web.Application()
+    app.router.add_get('/ws/{key}', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    async def on_event(event):
+        events.append(event['e'])
+
+    async def on_connect(reconnected):
+        connects.append(reconnected)
+
+    exchange = ListenKeyExchange()
+    stream = UserDataStream(exchange, on_event, on_connect, url=f"http://127.0.0.1:{port}",
+                            keepalive_interval=0.05, reconnect_delay=0.05)
+    task = asyncio.create_task(stream.run())
+    for _ in range(200):
+        if len(events) >= 2 and exchange.keepalives >= 1:
+            break
+        await asyncio.sleep(0.05)
+    assert stream.connected
+    await stream.stop()
+    await task
+    await runner.cleanup()
+
+    assert paths == ['key1', 'key2']
+    assert events == ['ACCOUNT_UPDATE', 'ORDER_TRADE_UPDATE']   # listenKeyExpired 不转发
+    assert connects == [False, True]
+    assert exchange.keepalives >= 1 and not stream.connected
+
+
+if __name__ == "__main__":
+    test_order_book_updates()
+    test_tp1_fill_moves_stop_to_break_even_immediately()
+    test_user_stream_reconnects_after_listen_key_expired()
+    print("✅ User stream tests passed")
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+向量化信号测试: generate_signals 必须与逐行 check_signal 完全一致
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+sys.path.append(os.path.dirname(__file__))
+
+import config
+from strategy_factory import get_strategy
+from strategies.base import SIGNAL_LONG, SIGNAL_SHORT, SIGNAL_NONE
+from synthetic_data import make_strategy_frame
+
+SIDE_CODES = {'LONG': SIGNAL_LONG, 'SHORT': SIGNAL_SHORT, None: SIGNAL_NONE}
+
+
+def rowwise_signals(strategy, df):
+    codes = []
+    prev_row = None
+    for _, row in df.iterrows():
+        codes.append(SIDE_CODES[strategy.check_signal(row, prev_row)])
+        prev_row = row
+    return np.array(codes, dtype=np.int8)
+
+
+def test_generate_signals_matches_check_signal():
+    strategy = get_strategy(config.ACTIVE_STRATEGY)
+    df = strategy.calculate_indicators(make_strategy_frame(n_bars=8000, seed=5))
+    df.dropna(inplace=True)
+
+    signals = strategy.generate_signals(df)
+
+    assert signals.dtype == np.int8
+    assert len(signals) == len(df)
+    assert (signals == SIGNAL_LONG).any() and (signals == SIGNAL_SHORT).any()
+    np.testing.assert_array_equal(signals, rowwise_signals(strategy, df))
+
+
+if __name__ == "__main__":
+    test_generate_signals_matches_check_signal()
+    print("✅ 向量化信号验证通过")
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Web 面板增量接口测试 (Flask test client + 临时 SQLite): after / after_id 游标、ETag / 304、响应缓存与 gzip
+"""
+import datetime
+import gzip
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+
+import config
+import web_server
+from database import DBManager
+
+BASE = 1_700_000_000 // 86400 * 86400
+
+
+def insert_equity(db, points):
+    with db.connection() as conn:
+        conn.executemany(
+            'INSERT INTO equity_snapshots (timestamp, total_equity, unrealized_pnl, ts) VALUES (?, ?, 0, ?)',
+            [(datetime.datetime.fromtimestamp(ts).isoformat(), equity, ts) for ts, equity in points])
+
+
+def with_db(test, cache_ttl=0):
+    """默认关闭响应缓存: 增量测试写入后立即请求，需要拿到最新数据"""
+    def wrapper():
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DBManager('test', db_file=os.path.join(tmp, 'test.db'), flush_interval=0)
+            original, original_ttl = web_server.get_db, config.WEB_CACHE_TTL
+            web_server.get_db = lambda env: db if env in ('live', 'testnet') else None
+            config.WEB_CACHE_TTL = cache_ttl
+            web_server.response_cache.clear()
+            try:
+                test(db, web_server.app.test_client())
+            finally:
+                web_server.get_db, config.WEB_CACHE_TTL = original, original_ttl
+                web_server.response_cache.clear()
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+def with_cache(test):
+    return with_db(test, cache_ttl=60)
+
+
+@with_db
+def test_equity_delta_and_etag(db, client):
+    insert_equity(db, [(BASE + i * 300, 1000.0 + i) for i in range(24)])   # 2 小时
+
+    first = client.get('/api/equity?bucket=1h')
+    body = first.get_json()
+    assert body['bucket'] == '1h' and len(body['x']) == 2 and body['last_ts'] == BASE + 23 * 300
+    etag = first.headers['ETag']
+
+    # 数据没变: 带上 ETag 即 304，游标不影响命中
+    cursor = f"/api/equity?bucket=1h&after={body['last_ts']}"
+    response = client.get(cursor, headers={'If-None-Match': etag})
+    assert response.status_code == 304 and response.data == b''
+
+    # 新快照落在最后一个桶 + 新开一个桶: 只返回这两个桶
+    insert_equity(db, [(BASE + 24 * 300 - 60, 5000.0), (BASE + 24 * 300, 900.0)])
+    response = client.get(cursor, headers={'If-None-Match': etag})
+    delta = response.get_json()
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    assert delta['x'] == body['x'][1:] + [datetime.datetime.fromtimestamp(BASE + 7200).isoformat()]
+    assert delta['max'][0] == 5000.0 and delta['y'] == [5000.0, 900.0]
+    assert delta['last_ts'] == BASE + 7200
+
+    # 不同视图参数不共用 ETag
+    other = client.get('/api/equity?bucket=15m', headers={'If-None-Match': response.headers['ETag']})
+    assert other.status_code == 200
+
+
+@with_db
+def test_operations_after_id(db, client):
+    for i in range(3):
+        db.log_operation('BTC/USDT', 'LONG', f'STEP{i}', 40000.0, 0.01)
+    db.flush(5)
+
+    first = client.get('/api/operations')
+    rows = first.get_json()
+    assert [r['action'] for r in rows] == ['STEP2', 'STEP1', 'STEP0']
+    etag, last_id = first.headers['ETag'], rows[0]['id']
+
+    response = client.get(f'/api/operations?after_id={last_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+    db.log_operation('BTC/USDT', 'LONG', 'STEP3', 40100.0, 0.01)
+    db.flush(5)
+    response = client.get(f'/api/operations?after_id={last_id}', headers={'If-None-Match': etag})
+    assert [r['action'] for r in response.get_json()] == ['STEP3']
+
+    assert client.get('/api/operations?env=nope').status_code == 400
+
+
+@with_db
+def test_empty_database(db, client):
+    body = client.get('/api/equity').get_json()
+    assert body['x'] == [] and body['last_ts'] is None
+    assert client.get('/api/operations').get_json() == []
+
+
+@with_cache
+def test_cache_hit_skips_database(db, client):
+    insert_equity(db, [(BASE + i * 60, 1000.0 + i) for i in range(10)])
+    calls = []
+    version = db.get_equity_version
+    db.get_equity_version = lambda: calls.append(1) or version()
+
+    first = client.get('/api/equity?bucket=raw')
+    etag = first.headers['ETag']
+    assert client.get('/api/equity?bucket=raw').get_json() == first.get_json()
+    assert client.get('/api/equity?bucket=raw', headers={'If-None-Match': etag}).status_code == 304
+    assert len(calls) == 1
+
+    # 参数不同不共用缓存
+    client.get('/api/equity?bucket=1h')
+    assert len(calls) == 2
+
+    # TTL 内的新数据在推送 (generation 变化) 后立即可见
+    insert_equity(db, [(BASE + 600, 2000.0)])
+    assert client.get('/api/equity?bucket=raw').get_json()['y'][-1] == 1009.0
+    db.publish_changes()
+    db.publish_changes()  # 首次调用只初始化游标
+    insert_equity(db, [(BASE + 660, 2100.0)])
+    db.publish_changes()
+    response = client.get('/api/equity?bucket=raw', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.get_json()['y'][-1] == 2100.0
+    assert len(calls) == 3
+
+
+@with_cache
+def test_gzip(db, client):
+    insert_equity(db, [(BASE + i * 60, 1000.0 + i) for i in range(200)])
+
+    plain = client.get('/api/equity?bucket=raw')
+    assert 'Content-Encoding' not in plain.headers and 'Accept-Encoding' in plain.headers['Vary']
+
+    compressed = client.get('/api/equity?bucket=raw', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert len(compressed.data) < len(plain.data) / 3
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+    assert compressed.headers['ETag'] == plain.headers['ETag']
+
+    # 小响应不压缩
+    small = client.get('/api/operations', headers={'Accept-Encoding': 'gzip'})
+    assert small.get_json() == [] and 'Content-Encoding' not in small.headers
+
+    assert client.get('/api/equity?bucket=bogus').status_code == 400
+
+
+if __name__ == "__main__":
+    test_equity_delta_and_etag()
+    test_operations_after_id()
+    test_empty_database()
+    test_cache_hit_skips_database()
+    test_gzip()
+    print("✅ Web API tests passed")